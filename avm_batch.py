@@ -0,0 +1,409 @@
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union
+import pandas as pd
+import numpy as np
+from datetime import datetime
+
+try:
+    from .hedonic_model import hedonic_cache
+    from .comps_store import ComparablesStore, as_comps_store
+    from .repeat_sales import RepeatSalesBuilder, resolve_market_trend
+except ImportError:
+    from hedonic_model import hedonic_cache
+    from comps_store import ComparablesStore, as_comps_store
+    from repeat_sales import RepeatSalesBuilder, resolve_market_trend
+
+
+# Same constants as the scalar avm_engine tool (tools.py)
+CONDITION_MULTIPLIERS = {
+    "Excellent": 1.1,
+    "Good": 1.0,
+    "Fair": 0.9,
+    "Poor": 0.8
+}
+METHOD_WEIGHTS = (0.4, 0.3, 0.3)  # price_per_sqft, regression_analysis, adjusted_comparables
+
+SUBJECT_COLUMNS = ["property_sqft", "bedrooms", "bathrooms", "lot_size", "year_built", "condition"]
+
+
+def comparable_arrays(
+    comparable_sales: Union[ComparablesStore, List[Dict[str, Any]]],
+    now: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """
+    Read the comp columns used by the batch valuation (zero-copy for a store).
+
+    Args:
+        comparable_sales: ComparablesStore or list of comparable sales data (as in avm_engine)
+        now: Reference date for days-since-sale (defaults to datetime.now())
+
+    Returns:
+        Dictionary of per-comp arrays plus the shared avg_price_per_sqft and avg_days_since_sale
+    """
+    now = now or datetime.now()
+    current_year = now.year
+    comps = as_comps_store(comparable_sales)
+    weights = comps.comp_weights()
+    price_per_sqft = np.asarray(comps["price_per_sqft"])
+    has_price_per_sqft = ~np.isnan(price_per_sqft)
+    days_since_sale = comps.days_since_sale(now)
+
+    return {
+        "store": comps,
+        "sale_price": comps.filled("sale_price"),
+        "sqft": comps.filled("sqft"),
+        "bedrooms": comps.filled("bedrooms"),
+        "bathrooms": comps.filled("bathrooms"),
+        "lot_size": comps.filled("lot_size"),
+        "age": current_year - comps.filled("year_built", current_year),
+        "days_since_sale": days_since_sale,
+        "weights": weights,
+        "avg_price_per_sqft": float(np.average(
+            price_per_sqft[has_price_per_sqft],
+            weights=None if weights is None else weights[has_price_per_sqft]
+        )) if has_price_per_sqft.any() else None,
+        "avg_days_since_sale": float(np.average(days_since_sale, weights=weights)),
+        "count": len(comps),
+    }
+
+
+def _subject_frame(subjects: Union[pd.DataFrame, List[Dict[str, Any]], Dict[str, Sequence]]) -> pd.DataFrame:
+    """Normalize subjects (DataFrame, list of dicts or dict of columns) to a DataFrame."""
+    frame = subjects if isinstance(subjects, pd.DataFrame) else pd.DataFrame(subjects)
+    missing = [col for col in SUBJECT_COLUMNS if col not in frame.columns]
+    if missing:
+        raise ValueError(f"Missing subject columns: {missing}")
+    return frame
+
+
+def resolve_trends(
+    frame: pd.DataFrame,
+    market_trend: Union[None, float, Sequence[Optional[float]]],
+    trend_index: Optional[RepeatSalesBuilder] = None,
+) -> Tuple[np.ndarray, List[str]]:
+    """Per-subject market trends and their sources, resolved with the avm_engine rule."""
+    if market_trend is None or np.isscalar(market_trend):
+        given = [market_trend] * len(frame)
+    else:
+        given = list(market_trend)
+    addresses = frame["property_address"].tolist() if "property_address" in frame.columns else [None] * len(frame)
+    resolved: Dict[Any, Any] = {}
+    for value, address in zip(given, addresses):
+        if (value, address) not in resolved:
+            resolved[(value, address)] = resolve_market_trend(value, address, trend_index)
+    pairs = [resolved[(value, address)] for value, address in zip(given, addresses)]
+    return np.array([trend for trend, _ in pairs], dtype=float), [source for _, source in pairs]
+
+
+def avm_engine_batch(
+    subjects: Union[pd.DataFrame, List[Dict[str, Any]], Dict[str, Sequence]],
+    comparable_sales: Union[ComparablesStore, List[Dict[str, Any]]],
+    market_trend: Union[None, float, Sequence[Optional[float]]] = None,
+    market_segment: Optional[str] = None,
+    now: Optional[datetime] = None,
+    include_adjusted_prices: bool = False,
+    trend_index: Optional[RepeatSalesBuilder] = None,
+    bootstrap_resamples: int = 0,
+    seed: Optional[int] = None,
+    bootstrap_workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Value N subject properties against a shared comparable set with array operations.
+
+    Each subject gets exactly the numbers avm_engine would return for it; values are
+    left unrounded (use subject_result to get the avm_engine-shaped dict for one subject).
+
+    Args:
+        subjects: Subject properties with columns property_sqft, bedrooms, bathrooms,
+            lot_size, year_built, condition (optional: property_address)
+        comparable_sales: ComparablesStore (or list of comparable sales data) shared by all subjects
+        market_trend: Market appreciation rate, scalar or one value per subject; None (or a None
+            entry) resolves like avm_engine: repeat-sales appreciation of property_address, else 0.02
+        market_segment: Market segment key for the cached regression fit (as in avm_engine)
+        now: Reference date for ages and days-since-sale (defaults to datetime.now())
+        include_adjusted_prices: Also return the subjects x comps adjusted price matrix
+        trend_index: Repeat-sales indexes used to resolve missing trends (defaults to the process-wide one)
+        bootstrap_resamples: If > 0, resample the comps this many times for per-subject P10/P50/P90 bands
+        seed: Random seed of the bootstrap (for reproducible bands)
+        bootstrap_workers: Worker processes of the bootstrap (see avm_bootstrap.bootstrap_valuation_bands)
+
+    Returns:
+        Dictionary of per-subject arrays for each method, final value, confidence score
+        and, with bootstrap_resamples, the confidence_interval bands
+    """
+    if not comparable_sales:
+        return {"error": "No comparable sales data provided"}
+
+    now = now or datetime.now()
+    current_year = now.year
+
+    try:
+        comps = comparable_arrays(comparable_sales, now)
+    except Exception as e:
+        return {"error": f"Error processing comparable sales data: {str(e)}"}
+    if comps["avg_price_per_sqft"] is None:
+        return {"error": "No valid price per square foot data available"}
+
+    frame = _subject_frame(subjects)
+    sqft = frame["property_sqft"].to_numpy(dtype=float)
+    bedrooms = frame["bedrooms"].to_numpy(dtype=float)
+    bathrooms = frame["bathrooms"].to_numpy(dtype=float)
+    lot_size = frame["lot_size"].to_numpy(dtype=float)
+    age = current_year - frame["year_built"].to_numpy(dtype=float)
+    trend, trend_source = resolve_trends(frame, market_trend, trend_index)
+    avg_price_per_sqft = comps["avg_price_per_sqft"]
+    avg_days_since_sale = comps["avg_days_since_sale"]
+
+    # Method 1: Price per Square Foot
+    condition_adj = frame["condition"].map(CONDITION_MULTIPLIERS).fillna(1.0).to_numpy(dtype=float)
+    age_adj = np.maximum(0.85, 1.0 - (age * 0.005))
+    market_adj = (1 + trend) ** (avg_days_since_sale / 365)
+    price_per_sqft_valuation = sqft * avg_price_per_sqft * condition_adj * age_adj * market_adj
+
+    # Method 2: Regression Analysis (same cached fit as avm_engine)
+    regression_fit = hedonic_cache.get(comps["store"], segment_key=market_segment, current_year=current_year)
+    regression_total = np.zeros_like(sqft)
+    for coef, feature in zip(regression_fit["coefficients"], [sqft, bedrooms, bathrooms, lot_size, age]):
+        regression_total = regression_total + coef * feature
+    regression_valuation = regression_fit["intercept"] + regression_total
+
+    # Method 3: Comparable Sales Adjustment (subjects x comps)
+    adjusted_prices = (
+        comps["sale_price"][None, :]
+        + (sqft[:, None] - comps["sqft"][None, :]) * avg_price_per_sqft
+        + (bedrooms[:, None] - comps["bedrooms"][None, :]) * 5000
+        + (bathrooms[:, None] - comps["bathrooms"][None, :]) * 10000
+        + (lot_size[:, None] - comps["lot_size"][None, :]) * 20000
+        + (age[:, None] - comps["age"][None, :]) * -500
+    )
+    adjusted_sales_valuation = np.average(adjusted_prices, axis=1, weights=comps["weights"])
+
+    w_ppsf, w_regression, w_adjusted = METHOD_WEIGHTS
+    final_valuation = (
+        price_per_sqft_valuation * w_ppsf +
+        regression_valuation * w_regression +
+        adjusted_sales_valuation * w_adjusted
+    )
+
+    # Confidence score based on data quality
+    close_sqft = (np.abs(comps["sqft"][None, :] - sqft[:, None]) / sqft[:, None] < 0.2).sum(axis=1)
+    same_bedrooms = (comps["bedrooms"][None, :] == bedrooms[:, None]).sum(axis=1)
+    confidence_score = np.zeros_like(sqft)
+    if comps["count"] >= 3:
+        confidence_score = confidence_score + 0.3
+    if avg_days_since_sale < 180:
+        confidence_score = confidence_score + 0.2
+    confidence_score = np.where(close_sqft >= 2, confidence_score + 0.3, confidence_score)
+    confidence_score = np.where(same_bedrooms >= 1, confidence_score + 0.2, confidence_score)
+
+    result = {
+        "subjects": frame,
+        "price_per_sqft": {
+            "value": price_per_sqft_valuation,
+            "price_per_sqft": avg_price_per_sqft,
+            "adjustments": {
+                "condition": condition_adj,
+                "age": age_adj,
+                "market_trend": market_adj
+            }
+        },
+        "regression_analysis": {
+            "value": regression_valuation,
+            "coefficients": regression_fit["coefficients"],
+            "intercept": regression_fit["intercept"],
+            "sample_size": regression_fit["sample_size"],
+            "segment": market_segment
+        },
+        "adjusted_comparables": {
+            "value": adjusted_sales_valuation
+        },
+        "final_valuation": {
+            "value": final_valuation,
+            "confidence_score": confidence_score
+        },
+        "market_conditions": {
+            "trend": trend,
+            "trend_source": trend_source,
+            "avg_days_since_sale": avg_days_since_sale,
+            "comparable_count": comps["count"],
+            "comparable_weighting": "equal" if comps["weights"] is None else "similarity"
+        },
+        "valuation_date": now.isoformat()
+    }
+    if include_adjusted_prices:
+        result["adjusted_comparables"]["adjusted_prices"] = adjusted_prices
+    if bootstrap_resamples > 0:
+        # Imported here: avm_bootstrap builds on this module's constants
+        try:
+            from .avm_bootstrap import bootstrap_valuation_bands
+        except ImportError:
+            from avm_bootstrap import bootstrap_valuation_bands
+        bands = bootstrap_valuation_bands(
+            frame, comps["store"], bootstrap_resamples, trend, seed=seed, max_workers=bootstrap_workers, now=now
+        )
+        if "error" not in bands:
+            result["final_valuation"]["confidence_interval"] = {**bands, "seed": seed}
+    return result
+
+
+def subject_result(batch: Dict[str, Any], index: int) -> Dict[str, Any]:
+    """
+    Format one subject of an avm_engine_batch result like the avm_engine tool output.
+
+    Args:
+        batch: Result of avm_engine_batch
+        index: Row position of the subject
+
+    Returns:
+        Dictionary shaped (and rounded) like avm_engine's return value
+    """
+    row = batch["subjects"].iloc[[index]].to_dict("records")[0]
+    ppsf = batch["price_per_sqft"]
+    regression = batch["regression_analysis"]
+    adjusted = batch["adjusted_comparables"]
+    final = batch["final_valuation"]
+    market = batch["market_conditions"]
+
+    result = {
+        "subject_property": {
+            "address": row.get("property_address"),
+            "sqft": row["property_sqft"],
+            "bedrooms": row["bedrooms"],
+            "bathrooms": row["bathrooms"],
+            "lot_size": row["lot_size"],
+            "year_built": row["year_built"],
+            "condition": row["condition"]
+        },
+        "valuation_methods": {
+            "price_per_sqft": {
+                "value": round(float(ppsf["value"][index]), 2),
+                "price_per_sqft": round(ppsf["price_per_sqft"], 2),
+                "adjustments": {
+                    "condition": float(ppsf["adjustments"]["condition"][index]),
+                    "age": float(ppsf["adjustments"]["age"][index]),
+                    "market_trend": float(ppsf["adjustments"]["market_trend"][index])
+                }
+            },
+            "regression_analysis": {
+                "value": round(float(regression["value"][index]), 2),
+                "coefficients": [round(coef, 4) for coef in regression["coefficients"]],
+                "intercept": round(regression["intercept"], 2),
+                "sample_size": regression["sample_size"],
+                "segment": regression["segment"]
+            },
+            "adjusted_comparables": {
+                "value": round(float(adjusted["value"][index]), 2)
+            }
+        },
+        "final_valuation": {
+            "value": round(float(final["value"][index]), 2),
+            "confidence_score": round(float(final["confidence_score"][index]), 2),
+            "valuation_date": batch["valuation_date"],
+            "methodology": "Weighted average of three methods"
+        },
+        "market_conditions": {
+            "trend": float(market["trend"][index]),
+            "trend_source": market["trend_source"][index],
+            "avg_days_since_sale": round(market["avg_days_since_sale"], 1),
+            "comparable_count": market["comparable_count"],
+            "comparable_weighting": market["comparable_weighting"]
+        }
+    }
+    if "confidence_interval" in final:
+        bands = final["confidence_interval"]
+        result["final_valuation"]["confidence_interval"] = {
+            "p10": round(float(bands["p10"][index]), 2),
+            "p50": round(float(bands["p50"][index]), 2),
+            "p90": round(float(bands["p90"][index]), 2),
+            "resamples": bands["resamples"],
+            "seed": bands["seed"]
+        }
+    if "adjusted_prices" in adjusted:
+        result["valuation_methods"]["adjusted_comparables"]["adjusted_prices"] = [
+            round(float(price), 2) for price in adjusted["adjusted_prices"][index]
+        ]
+    return result
+
+
+def avm_engine_sweep(
+    subject: Dict[str, Any],
+    comparable_sales: Union[ComparablesStore, List[Dict[str, Any]]],
+    conditions: Optional[Sequence[str]] = None,
+    market_trends: Optional[Sequence[float]] = None,
+    method_weights: Optional[Sequence[Sequence[float]]] = None,
+    market_segment: Optional[str] = None,
+    now: Optional[datetime] = None,
+    trend_index: Optional[RepeatSalesBuilder] = None,
+) -> Dict[str, Any]:
+    """
+    What-if valuation surface for one subject over condition x market_trend x method weights.
+
+    Comps are parsed and the regression and adjusted-comparables values computed once;
+    only the price-per-sqft adjustments and the weighted blend vary across the grid.
+    Each grid point equals the avm_engine value for those inputs.
+
+    Args:
+        subject: Subject with property_sqft, bedrooms, bathrooms, lot_size, year_built, condition
+        comparable_sales: ComparablesStore or list of comparable sales data
+        conditions: Condition values to sweep (defaults to the subject's condition)
+        market_trends: Market appreciation rates to sweep (None or empty: the single trend avm_engine
+            would use, i.e. repeat-sales appreciation of property_address, else 0.02)
+        method_weights: (price_per_sqft, regression, adjusted_comparables) weight triples
+            (defaults to METHOD_WEIGHTS)
+        market_segment: Market segment key for the cached regression fit
+        now: Reference date (defaults to datetime.now())
+        trend_index: Repeat-sales indexes used when market_trends is omitted
+
+    Returns:
+        Dictionary with the grid axes, the method values shared by all points, the
+        price-per-sqft surface (conditions x trends) and the final value surface
+        (conditions x trends x weights)
+    """
+    conditions = list(conditions or [subject["condition"]])
+    trend_source = "provided"
+    if market_trends is None or not len(market_trends):
+        # Omitted or empty: the single trend avm_engine would use
+        trend, trend_source = resolve_market_trend(None, subject.get("property_address"), trend_index)
+        market_trends = [trend]
+    market_trends = np.asarray(market_trends, dtype=float)
+    weights = np.asarray(method_weights if method_weights is not None else [METHOD_WEIGHTS], dtype=float)
+    if weights.ndim != 2 or weights.shape[1] != 3:
+        return {"error": "method_weights must be a list of [price_per_sqft, regression, adjusted_comparables] triples"}
+
+    base = avm_engine_batch(
+        [subject], comparable_sales, market_trends[0], market_segment=market_segment, now=now
+    )
+    if "error" in base:
+        return base
+
+    sqft = float(subject["property_sqft"])
+    avg_price_per_sqft = base["price_per_sqft"]["price_per_sqft"]
+    age_adj = float(base["price_per_sqft"]["adjustments"]["age"][0])
+    avg_days_since_sale = base["market_conditions"]["avg_days_since_sale"]
+    regression_valuation = float(base["regression_analysis"]["value"][0])
+    adjusted_sales_valuation = float(base["adjusted_comparables"]["value"][0])
+
+    condition_adj = np.array([CONDITION_MULTIPLIERS.get(condition, 1.0) for condition in conditions])
+    market_adj = (1 + market_trends) ** (avg_days_since_sale / 365)
+    price_per_sqft_surface = sqft * avg_price_per_sqft * condition_adj[:, None] * age_adj * market_adj[None, :]
+
+    final_surface = (
+        price_per_sqft_surface[:, :, None] * weights[None, None, :, 0] +
+        regression_valuation * weights[None, None, :, 1] +
+        adjusted_sales_valuation * weights[None, None, :, 2]
+    )
+
+    return {
+        "axes": {
+            "condition": conditions,
+            "market_trend": market_trends,
+            "method_weights": weights,
+        },
+        "price_per_sqft": avg_price_per_sqft,
+        "regression_value": regression_valuation,
+        "adjusted_comparables_value": adjusted_sales_valuation,
+        "confidence_score": float(base["final_valuation"]["confidence_score"][0]),
+        "price_per_sqft_surface": price_per_sqft_surface,
+        "final_value_surface": final_surface,
+        "trend_source": trend_source,
+        "valuation_date": base["valuation_date"],
+    }
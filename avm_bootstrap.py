@@ -0,0 +1,279 @@
+from typing import Dict, Any, List, Optional, Sequence, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import multiprocessing
+import os
+import pandas as pd
+import numpy as np
+from datetime import datetime
+
+try:
+    from .avm_batch import CONDITION_MULTIPLIERS, METHOD_WEIGHTS, _subject_frame
+    from .comps_store import ComparablesStore, as_comps_store
+    from .hedonic_model import PRIOR_COEFFICIENTS, PRIOR_INTERCEPT
+except ImportError:
+    from avm_batch import CONDITION_MULTIPLIERS, METHOD_WEIGHTS, _subject_frame
+    from comps_store import ComparablesStore, as_comps_store
+    from hedonic_model import PRIOR_COEFFICIENTS, PRIOR_INTERCEPT
+
+
+PERCENTILES = (10, 50, 90)
+
+# Resamples are drawn in fixed-size blocks, each from its own child seed, so the
+# result for a given seed does not depend on how many workers share the work
+BLOCK_SIZE = 250
+SUBJECT_CHUNK = 2048
+# Worker processes of a large bootstrap, and the size (comps x resamples) from which the
+# pool start-up is worth it; smaller bootstraps run in-process
+BOOTSTRAP_WORKERS = int(os.getenv("AVM_BOOTSTRAP_WORKERS", str(os.cpu_count() or 1)))
+PARALLEL_MIN_WORK = int(os.getenv("AVM_BOOTSTRAP_PARALLEL_MIN_WORK", "50000000"))
+
+# Column layout of the per-comp statistics matrix (resample counts @ matrix = per-resample sums)
+_WEIGHT, _PPSF_WEIGHT, _PPSF, _DAYS, _SQFT, _BASE = range(6)
+_XTX = slice(6, 42)
+_XTY = slice(42, 48)
+_N = 48
+
+
+def comparable_statistics(comps: ComparablesStore, current_year: int, now: datetime) -> np.ndarray:
+    """
+    Per-comp terms whose resample-weighted sums give every avm_engine input.
+
+    Columns: weight, weight with ppsf, weight * ppsf, weight * days since sale,
+    weight * sqft, weight * (sale price - fixed feature adjustments), then the
+    hedonic X'X (36) and X'y (6) terms and the hedonic row indicator.
+    """
+    weights = comps.comp_weights()
+    weights = np.ones(len(comps)) if weights is None else np.asarray(weights, dtype=float)
+    ppsf = np.asarray(comps["price_per_sqft"])
+    has_ppsf = ~np.isnan(ppsf)
+    sale_price = comps.filled("sale_price")
+    sqft = comps.filled("sqft")
+    bedrooms = comps.filled("bedrooms")
+    bathrooms = comps.filled("bathrooms")
+    lot_size = comps.filled("lot_size")
+    age = current_year - comps.filled("year_built", current_year)
+
+    # Hedonic design rows [1, sqft, bedrooms, bathrooms, lot_size, age] (sales with a price only)
+    in_fit = (sale_price != 0).astype(float)
+    features = np.column_stack([np.ones(len(comps)), sqft, bedrooms, bathrooms, lot_size, age]) * in_fit[:, None]
+
+    statistics = np.empty((len(comps), 49))
+    statistics[:, _WEIGHT] = weights
+    statistics[:, _PPSF_WEIGHT] = weights * has_ppsf
+    statistics[:, _PPSF] = weights * np.where(has_ppsf, ppsf, 0.0)
+    statistics[:, _DAYS] = weights * comps.days_since_sale(now)
+    statistics[:, _SQFT] = weights * sqft
+    statistics[:, _BASE] = weights * (sale_price - bedrooms * 5000 - bathrooms * 10000 - lot_size * 20000 + age * 500)
+    statistics[:, _XTX] = (features[:, :, None] * features[:, None, :]).reshape(len(comps), 36)
+    statistics[:, _XTY] = features * sale_price[:, None]
+    statistics[:, _N] = in_fit
+    return statistics
+
+
+def _block_sums(statistics: np.ndarray, seed_sequence: np.random.SeedSequence, size: int) -> np.ndarray:
+    """Sums of the comp statistics for one block of bootstrap resamples."""
+    rng = np.random.default_rng(seed_sequence)
+    n = len(statistics)
+    counts = rng.multinomial(n, np.full(n, 1.0 / n), size=size).astype(float)
+    return counts @ statistics
+
+
+def _shared_block_sums(shm_name: str, shape: Tuple[int, int], seed_sequence: np.random.SeedSequence, size: int) -> np.ndarray:
+    """Worker entry point: attach the shared comp statistics and sum one block."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        statistics = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        return _block_sums(statistics, seed_sequence, size)
+    finally:
+        shm.close()
+
+
+def _ridge_solve_batch(xtx: np.ndarray, xty: np.ndarray, n: np.ndarray, prior_strength: float) -> np.ndarray:
+    """Batched version of HedonicSegmentModel._solve (ridge towards the prior coefficients)."""
+    prior = np.array([PRIOR_INTERCEPT] + PRIOR_COEFFICIENTS, dtype=float)
+    safe_n = np.where(n > 0, n, 1.0)
+    penalty = np.zeros(xty.shape)
+    penalty[:, 1:] = prior_strength * np.maximum(np.diagonal(xtx, axis1=1, axis2=2)[:, 1:] / safe_n[:, None], 1e-9)
+    a = xtx + penalty[:, :, None] * np.eye(6)[None, :, :]
+    b = xty + penalty * prior
+    beta = np.einsum("bij,bj->bi", np.linalg.pinv(a), b)
+    unusable = (n <= 0) | ~np.all(np.isfinite(beta), axis=1)
+    beta[unusable] = prior
+    return beta
+
+
+def resample_parameters(sums: np.ndarray, prior_strength: float = 3.0) -> Dict[str, np.ndarray]:
+    """
+    Turn per-resample sums into the quantities avm_engine derives from the comps.
+
+    Resamples with no price-per-sqft data are dropped (avm_engine would return an error).
+    """
+    usable = sums[:, _PPSF_WEIGHT] > 0
+    sums = sums[usable]
+    weight = sums[:, _WEIGHT]
+    return {
+        "avg_price_per_sqft": sums[:, _PPSF] / sums[:, _PPSF_WEIGHT],
+        "avg_days_since_sale": sums[:, _DAYS] / weight,
+        "avg_sqft": sums[:, _SQFT] / weight,
+        "avg_base": sums[:, _BASE] / weight,
+        "beta": _ridge_solve_batch(sums[:, _XTX].reshape(-1, 6, 6), sums[:, _XTY], sums[:, _N], prior_strength),
+    }
+
+
+def subject_bands(
+    subjects: Dict[str, np.ndarray],
+    params: Dict[str, np.ndarray],
+    percentiles: Sequence[float] = PERCENTILES,
+) -> np.ndarray:
+    """
+    Final valuation of each subject under every resample, reduced to percentiles.
+
+    Args:
+        subjects: Arrays sqft, bedrooms, bathrooms, lot_size, age, condition_adj, market_trend
+        params: Result of resample_parameters
+        percentiles: Percentiles to report
+
+    Returns:
+        subjects x percentiles array
+    """
+    sqft = subjects["sqft"]
+    age = subjects["age"]
+    avg_price_per_sqft = params["avg_price_per_sqft"][None, :]
+
+    # Market adjustment once per distinct trend rather than per subject
+    trends, trend_index = np.unique(subjects["market_trend"], return_inverse=True)
+    market_adj = ((1 + trends[:, None]) ** (params["avg_days_since_sale"][None, :] / 365))[trend_index]
+    age_adj = np.maximum(0.85, 1.0 - (age * 0.005))
+    price_per_sqft_valuation = (sqft * subjects["condition_adj"] * age_adj)[:, None] * avg_price_per_sqft * market_adj
+
+    features = np.column_stack([
+        np.ones(len(sqft)), sqft, subjects["bedrooms"], subjects["bathrooms"], subjects["lot_size"], age,
+    ])
+    regression_valuation = features @ params["beta"].T
+
+    subject_terms = subjects["bedrooms"] * 5000 + subjects["bathrooms"] * 10000 + subjects["lot_size"] * 20000 - age * 500
+    adjusted_sales_valuation = (
+        (params["avg_base"] - params["avg_sqft"] * params["avg_price_per_sqft"])[None, :]
+        + sqft[:, None] * avg_price_per_sqft
+        + subject_terms[:, None]
+    )
+
+    w_ppsf, w_regression, w_adjusted = METHOD_WEIGHTS
+    final_valuation = (
+        price_per_sqft_valuation * w_ppsf +
+        regression_valuation * w_regression +
+        adjusted_sales_valuation * w_adjusted
+    )
+    return np.percentile(final_valuation, percentiles, axis=1).T
+
+
+def bootstrap_valuation_bands(
+    subjects: Union[pd.DataFrame, List[Dict[str, Any]], Dict[str, Any]],
+    comparable_sales: Union[ComparablesStore, List[Dict[str, Any]]],
+    n_resamples: int = 2000,
+    market_trend: Union[float, Sequence[float]] = 0.02,
+    seed: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    prior_strength: float = 3.0,
+    now: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """
+    Bootstrap P10/P50/P90 bands of the avm_engine final valuation.
+
+    The comparable set is resampled with replacement n_resamples times; every
+    resample re-derives the average price per sqft, days since sale, hedonic fit
+    and adjusted-comparables mean, and each subject is valued under all of them.
+    Resample sums are one matrix product per block; with max_workers > 1 blocks
+    and subject chunks are spread over a process pool that reads the comp
+    statistics from shared memory. Results depend only on the seed.
+
+    Args:
+        subjects: One subject dict, a list of them or a DataFrame (property_sqft, bedrooms,
+            bathrooms, lot_size, year_built, condition)
+        comparable_sales: ComparablesStore or list of comparable sales data
+        n_resamples: Number of bootstrap resamples
+        market_trend: Market appreciation rate, scalar or one value per subject
+        seed: Random seed (None draws fresh entropy)
+        max_workers: Worker processes (1 computes in-process; None uses BOOTSTRAP_WORKERS
+            from PARALLEL_MIN_WORK comps x resamples, in-process below)
+        prior_strength: Ridge prior strength of the hedonic fit (as in hedonic_cache)
+        now: Reference date for ages and days-since-sale (defaults to datetime.now())
+
+    Returns:
+        Dictionary with per-subject p10/p50/p90 arrays, the usable resample count and the seed
+    """
+    if not comparable_sales:
+        return {"error": "No comparable sales data provided"}
+    if n_resamples < 1:
+        return {"error": "n_resamples must be at least 1"}
+
+    now = now or datetime.now()
+    current_year = now.year
+    comps = as_comps_store(comparable_sales)
+    if isinstance(subjects, dict) and not isinstance(next(iter(subjects.values()), None), (list, tuple, np.ndarray)):
+        subjects = [subjects]
+    frame = _subject_frame(subjects)
+
+    sqft = frame["property_sqft"].to_numpy(dtype=float)
+    subject_arrays = {
+        "sqft": sqft,
+        "bedrooms": frame["bedrooms"].to_numpy(dtype=float),
+        "bathrooms": frame["bathrooms"].to_numpy(dtype=float),
+        "lot_size": frame["lot_size"].to_numpy(dtype=float),
+        "age": current_year - frame["year_built"].to_numpy(dtype=float),
+        "condition_adj": frame["condition"].map(CONDITION_MULTIPLIERS).fillna(1.0).to_numpy(dtype=float),
+        "market_trend": np.broadcast_to(np.asarray(market_trend, dtype=float), sqft.shape).copy(),
+    }
+
+    statistics = comparable_statistics(comps, current_year, now)
+    seed_sequence = np.random.SeedSequence(seed)
+    block_sizes = [min(BLOCK_SIZE, n_resamples - start) for start in range(0, n_resamples, BLOCK_SIZE)]
+    block_seeds = seed_sequence.spawn(len(block_sizes))
+    chunks = [slice(start, start + SUBJECT_CHUNK) for start in range(0, len(frame), SUBJECT_CHUNK)]
+
+    def chunk_arrays(rows: slice) -> Dict[str, np.ndarray]:
+        return {name: values[rows] for name, values in subject_arrays.items()}
+
+    if max_workers is None:
+        max_workers = BOOTSTRAP_WORKERS if len(comps) * n_resamples >= PARALLEL_MIN_WORK else 1
+
+    if max_workers == 1:
+        sums = np.vstack([_block_sums(statistics, block_seed, size) for block_seed, size in zip(block_seeds, block_sizes)])
+        params = resample_parameters(sums, prior_strength)
+        if not len(params["beta"]):
+            return {"error": "No valid price per square foot data available"}
+        bands = np.vstack([subject_bands(chunk_arrays(rows), params) for rows in chunks])
+    else:
+        shm = shared_memory.SharedMemory(create=True, size=max(statistics.nbytes, 1))
+        try:
+            np.ndarray(statistics.shape, dtype=np.float64, buffer=shm.buf)[:] = statistics
+            # "spawn": called from the multi-threaded Streamlit server, where a fork could
+            # inherit a lock held by another thread
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+                sums = np.vstack(list(executor.map(
+                    _shared_block_sums,
+                    [shm.name] * len(block_sizes),
+                    [statistics.shape] * len(block_sizes),
+                    block_seeds,
+                    block_sizes,
+                )))
+                params = resample_parameters(sums, prior_strength)
+                if not len(params["beta"]):
+                    return {"error": "No valid price per square foot data available"}
+                bands = np.vstack(list(executor.map(
+                    subject_bands,
+                    [chunk_arrays(rows) for rows in chunks],
+                    [params] * len(chunks),
+                )))
+        finally:
+            shm.close()
+            shm.unlink()
+
+    return {
+        "p10": bands[:, 0],
+        "p50": bands[:, 1],
+        "p90": bands[:, 2],
+        "resamples": len(params["beta"]),
+        "seed": seed,
+    }
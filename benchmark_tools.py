@@ -0,0 +1,256 @@
+"""
+Benchmarks for the tools.py valuation tools on seeded synthetic comparables.
+
+Each tool's underlying function is called directly (bypassing the @tool wrapper)
+on 10^2 .. 10^6 comparables; wall time, throughput and peak traced memory are
+written to a JSON baseline. Comparing against a previous baseline flags any
+benchmark that got slower than the tolerance.
+
+    python benchmark_tools.py --output benchmarks_baseline.json
+    python benchmark_tools.py --sizes 100 10000 --compare benchmarks_baseline.json
+"""
+from typing import Dict, Any, List, Callable, Optional
+from unittest import mock
+import argparse
+import inspect
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+import numpy as np
+
+try:
+    from . import tools
+    from .create_comps import generate_comps
+    from .comps_store import ComparablesStore
+    from .hedonic_model import hedonic_cache
+except ImportError:
+    import tools
+    from create_comps import generate_comps
+    from comps_store import ComparablesStore
+    from hedonic_model import hedonic_cache
+
+
+DEFAULT_SIZES = [10 ** 2, 10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6]
+# market_trend_analyzer scales with months, not comps (100 years max)
+MAX_TREND_MONTHS = 1200
+
+SUBJECT = {
+    "property_address": "100 Benchmark Ave",
+    "property_sqft": 2100,
+    "bedrooms": 3,
+    "bathrooms": 2.0,
+    "lot_size": 0.25,
+    "year_built": 2005,
+    "condition": "Good",
+}
+
+
+def underlying(tool_function: Any) -> Callable:
+    """The plain Python function behind an agno @tool (no argument validation, no response cache)."""
+    entrypoint = getattr(tool_function, "entrypoint", tool_function)
+    # Through the validation and response-cache wrappers
+    return inspect.unwrap(entrypoint)
+
+
+def clear_caches() -> None:
+    """Drop fitted regressions so each timed run includes the fit."""
+    hedonic_cache.segments.clear()
+    hedonic_cache.fitted.clear()
+
+
+def measure(call: Callable[[], Any], setup: Optional[Callable[[], None]] = None, repeat: int = 3) -> Dict[str, float]:
+    """
+    Best wall time over `repeat` runs (after one warm-up), then peak traced memory of one more run.
+
+    Args:
+        call: Zero-argument callable to time
+        setup: Untimed callable run before every call
+        repeat: Number of timed runs
+
+    Returns:
+        Dictionary with seconds and peak_mb
+    """
+    if setup:
+        setup()
+    call()
+    timings = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        call()
+        timings.append(time.perf_counter() - start)
+
+    # Memory is traced in a separate run: tracemalloc slows the timed code down
+    if setup:
+        setup()
+    tracemalloc.start()
+    try:
+        call()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(timings), "peak_mb": peak / 2 ** 20}
+
+
+def tool_benchmarks(store: ComparablesStore, records: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Benchmark name -> call, optional setup and the input size it scales with."""
+    n = len(store)
+    center = {"latitude": float(np.nanmean(store["latitude"])), "longitude": float(np.nanmean(store["longitude"]))}
+    subject_property = {
+        "sqft": SUBJECT["property_sqft"],
+        "bedrooms": SUBJECT["bedrooms"],
+        "bathrooms": SUBJECT["bathrooms"],
+        "lot_size": SUBJECT["lot_size"],
+        "year_built": SUBJECT["year_built"],
+        "condition": SUBJECT["condition"],
+    }
+    trend_months = min(n, MAX_TREND_MONTHS)
+
+    def run_mls_integration():
+        with mock.patch.object(tools, "get_mls_store", return_value=store):
+            return underlying(tools.mls_integration)(
+                SUBJECT["property_address"], search_radius=0.5, days_back=365,
+                latitude=center["latitude"], longitude=center["longitude"],
+            )
+
+    return {
+        "mls_integration": {"call": run_mls_integration, "rows": n},
+        "avm_engine": {
+            "call": lambda: underlying(tools.avm_engine)(**SUBJECT, comparable_sales=store),
+            "setup": clear_caches,
+            "rows": n,
+        },
+        "avm_engine_records": {
+            "call": lambda: underlying(tools.avm_engine)(**SUBJECT, comparable_sales=records),
+            "setup": clear_caches,
+            "rows": n,
+        },
+        "comps_analyzer": {
+            "call": lambda: underlying(tools.comps_analyzer)(subject_property, store),
+            "rows": n,
+        },
+        "market_trend_analyzer": {
+            "call": lambda: underlying(tools.market_trend_analyzer)("Sample City, ST", analysis_period=trend_months),
+            "rows": trend_months,
+        },
+    }
+
+
+def run_benchmarks(
+    sizes: List[int],
+    seed: int = 0,
+    repeat: int = 3,
+    only: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """
+    Run every benchmark at every size.
+
+    Args:
+        sizes: Numbers of synthetic comparables
+        seed: Seed of the synthetic data
+        repeat: Timed runs per benchmark (best is kept)
+        only: Restrict to these benchmark names
+
+    Returns:
+        Baseline dictionary (environment + one result per benchmark and size)
+    """
+    results = []
+    for n in sizes:
+        start = time.perf_counter()
+        frame = generate_comps(n, seed=seed)
+        generate_seconds = time.perf_counter() - start
+        store = ComparablesStore.from_frame(frame)
+        records = frame.to_dict("records")
+        results.append({
+            "benchmark": "generate_comps",
+            "size": n,
+            "rows": n,
+            "seconds": generate_seconds,
+            "throughput_rows_per_s": n / generate_seconds,
+            "peak_mb": None,
+        })
+
+        for name, spec in tool_benchmarks(store, records).items():
+            if only and name not in only:
+                continue
+            stats = measure(spec["call"], spec.get("setup"), repeat)
+            results.append({
+                "benchmark": name,
+                "size": n,
+                "rows": spec["rows"],
+                "seconds": stats["seconds"],
+                "throughput_rows_per_s": spec["rows"] / stats["seconds"] if stats["seconds"] else None,
+                "peak_mb": stats["peak_mb"],
+            })
+            print(f"{name:<24} n={n:<8} {stats['seconds'] * 1000:10.2f} ms {stats['peak_mb']:10.1f} MB", file=sys.stderr)
+
+    return {
+        "created": datetime.now().isoformat(),
+        "seed": seed,
+        "repeat": repeat,
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+        },
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float = 0.25) -> List[Dict[str, Any]]:
+    """
+    Benchmarks slower than the baseline by more than `tolerance` (0.25 = 25%).
+
+    Args:
+        current: Result of run_benchmarks
+        baseline: A previously saved result
+        tolerance: Allowed relative slowdown
+
+    Returns:
+        List of regressions with both timings and the ratio
+    """
+    previous = {(r["benchmark"], r["size"]): r for r in baseline.get("results", [])}
+    regressions = []
+    for result in current["results"]:
+        before = previous.get((result["benchmark"], result["size"]))
+        if not before or not before["seconds"]:
+            continue
+        ratio = result["seconds"] / before["seconds"]
+        if ratio > 1 + tolerance:
+            regressions.append({
+                "benchmark": result["benchmark"],
+                "size": result["size"],
+                "baseline_seconds": before["seconds"],
+                "seconds": result["seconds"],
+                "ratio": round(ratio, 2),
+            })
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the valuation tools on synthetic comparables")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", nargs="+", help="Benchmark names to run")
+    parser.add_argument("--output", default="benchmarks_baseline.json", help="Where to write the results")
+    parser.add_argument("--compare", help="Baseline JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    current = run_benchmarks(args.sizes, seed=args.seed, repeat=args.repeat, only=args.only)
+    with open(args.output, "w") as f:
+        json.dump(current, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(current, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression['benchmark']} n={regression['size']}: "
+                  f"{regression['baseline_seconds']:.4f}s -> {regression['seconds']:.4f}s (x{regression['ratio']})")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,172 @@
+from typing import Dict, Any, List, Optional, Union
+import pandas as pd
+import numpy as np
+from datetime import datetime
+
+try:
+    from .comps_store import ComparablesStore, CONDITION_NAMES, as_comps_store
+except ImportError:
+    from comps_store import ComparablesStore, CONDITION_NAMES, as_comps_store
+
+
+ADJUSTMENT_KEYS = ["sqft", "bedrooms", "bathrooms", "lot_size", "age", "condition"]
+
+DEFAULT_CONDITION_FACTORS = {"Excellent": 0.1, "Good": 0.0, "Fair": -0.1, "Poor": -0.2}
+
+# Default adjustment factors of comps_analyzer
+DEFAULT_ADJUSTMENT_FACTORS = {
+    "sqft": 150,  # per sqft
+    "bedroom": 5000,  # per bedroom
+    "bathroom": 10000,  # per bathroom
+    "lot_size": 20000,  # per acre
+    "age": -500,  # per year
+    "condition": DEFAULT_CONDITION_FACTORS,
+    "garage": 5000,  # per garage space
+    "pool": 15000,  # pool presence
+    "view": 10000,  # view premium
+}
+
+SubjectsInput = Union[Dict[str, Any], List[Dict[str, Any]], pd.DataFrame]
+
+
+def factor_vector(factors: Dict[str, Any]) -> np.ndarray:
+    """Per-unit factors for [sqft, bedrooms, bathrooms, lot_size, age], with comps_analyzer's fallbacks."""
+    return np.array([
+        factors.get("sqft", 150),
+        factors.get("bedroom", factors.get("bedrooms", 5000)),
+        factors.get("bathroom", 10000),
+        factors.get("lot_size", 20000),
+        factors.get("age", -500),
+    ], dtype=float)
+
+
+def _subject_column(frame: pd.DataFrame, key: str) -> np.ndarray:
+    """Subject column as floats, NaN where the subject lacks the field."""
+    if key not in frame.columns:
+        return np.full(len(frame), np.nan)
+    return pd.to_numeric(frame[key], errors="coerce").to_numpy(dtype=float)
+
+
+def comp_condition_names(comps: ComparablesStore) -> List[Optional[str]]:
+    """Condition label per comp (original strings when built from dicts, so custom labels survive)."""
+    if comps.records is not None:
+        return [comp.get("condition") for comp in comps.records]
+    return [CONDITION_NAMES.get(code) for code in np.asarray(comps["condition"]).tolist()]
+
+
+def adjustment_tensor(
+    subjects: SubjectsInput,
+    comparable_sales: Union[ComparablesStore, List[Dict[str, Any]]],
+    adjustment_factors: Optional[Dict[str, Any]] = None,
+    now: Optional[datetime] = None,
+) -> Dict[str, Any]:
+    """
+    Adjustment grid for many subjects at once: a subjects x comps x factors tensor.
+
+    Entries are NaN where the subject or the comp lacks the field (no adjustment),
+    matching comps_analyzer's per-key presence checks.
+
+    Args:
+        subjects: One subject dict, a list of them or a DataFrame (sqft, bedrooms,
+            bathrooms, lot_size, year_built, condition)
+        comparable_sales: ComparablesStore or list of comparable sales data
+        adjustment_factors: Custom adjustment factors (defaults to DEFAULT_ADJUSTMENT_FACTORS)
+        now: Reference date for ages (defaults to datetime.now())
+
+    Returns:
+        Dictionary with the tensor, factor keys, comp sale prices and the comps store
+    """
+    factors = adjustment_factors or DEFAULT_ADJUSTMENT_FACTORS
+    current_year = (now or datetime.now()).year
+    comps = as_comps_store(comparable_sales)
+    if isinstance(subjects, dict):
+        subjects = [subjects]
+    frame = subjects if isinstance(subjects, pd.DataFrame) else pd.DataFrame(subjects)
+    sale_prices = comps.filled("sale_price")
+
+    # subjects x 5 and comps x 5 feature matrices (age = current year - year built)
+    subject_features = np.column_stack([
+        _subject_column(frame, "sqft"),
+        _subject_column(frame, "bedrooms"),
+        _subject_column(frame, "bathrooms"),
+        _subject_column(frame, "lot_size"),
+        current_year - _subject_column(frame, "year_built"),
+    ])
+    comp_features = np.column_stack([
+        comps["sqft"],
+        comps["bedrooms"],
+        comps["bathrooms"],
+        comps["lot_size"],
+        current_year - np.asarray(comps["year_built"]),
+    ])
+    numeric = (subject_features[:, None, :] - comp_features[None, :, :]) * factor_vector(factors)
+
+    # Condition adjustment: factor difference times the comp's sale price
+    condition_factors = factors.get("condition", DEFAULT_CONDITION_FACTORS)
+    subject_conditions = frame["condition"].tolist() if "condition" in frame.columns else [None] * len(frame)
+    subject_cond = np.array([condition_factors.get(cond, np.nan) for cond in subject_conditions], dtype=float)
+    comp_cond = np.array([condition_factors.get(cond, np.nan) for cond in comp_condition_names(comps)], dtype=float)
+    condition = (subject_cond[:, None] - comp_cond[None, :]) * sale_prices[None, :]
+
+    return {
+        "adjustments": np.concatenate([numeric, condition[:, :, None]], axis=2),
+        "keys": ADJUSTMENT_KEYS,
+        "sale_prices": sale_prices,
+        "comps": comps,
+        "subjects": frame,
+        "factors": factors,
+    }
+
+
+def summarize_adjustments(grid: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Adjusted prices and the valuation statistics of comps_analyzer, per subject, from the tensor.
+
+    Args:
+        grid: Result of adjustment_tensor
+
+    Returns:
+        Dictionary of subjects x comps matrices (total adjustment, adjusted price, percentage)
+        and per-subject arrays (final valuation, range, std, CV, confidence score)
+    """
+    adjustments = grid["adjustments"]
+    sale_prices = grid["sale_prices"]
+    comp_count = adjustments.shape[1]
+
+    total_adjustment = np.nansum(adjustments, axis=2)
+    adjusted_prices = sale_prices[None, :] + total_adjustment
+    with np.errstate(divide="ignore", invalid="ignore"):
+        adjustment_percentage = total_adjustment / sale_prices[None, :] * 100
+
+    final_valuation = adjusted_prices.mean(axis=1)
+    price_std = adjusted_prices.std(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        coefficient_of_variation = price_std / final_valuation
+
+    # Quality assessment
+    sufficient = np.full(len(final_valuation), comp_count >= 3)
+    low_variance = coefficient_of_variation < 0.1
+    reasonable = np.all(np.abs(adjustment_percentage) < 20, axis=1)
+    confidence_score = (sufficient.astype(int) + low_variance + reasonable) / 3
+
+    return {
+        "total_adjustment": total_adjustment,
+        "adjusted_prices": adjusted_prices,
+        "adjustment_percentage": adjustment_percentage,
+        "final_valuation": final_valuation,
+        "min": adjusted_prices.min(axis=1),
+        "max": adjusted_prices.max(axis=1),
+        "median": np.median(adjusted_prices, axis=1),
+        "std_deviation": price_std,
+        "coefficient_of_variation": coefficient_of_variation,
+        "quality": {
+            "Sufficient comparables": sufficient,
+            "Low price variance": low_variance,
+            "Reasonable adjustments": reasonable,
+        },
+        "confidence_score": confidence_score,
+    }
+
+
+def confidence_label(confidence_score: float) -> str:
+    return "High confidence" if confidence_score > 0.7 else "Medium confidence" if confidence_score > 0.4 else "Low confidence"
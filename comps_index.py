@@ -0,0 +1,415 @@
+from typing import Dict, Any, Optional, Tuple
+from datetime import datetime
+import pandas as pd
+import numpy as np
+import os
+
+try:
+    from .comps_store import ComparablesStore, CONDITION_CODES, save_array_atomic
+except ImportError:
+    from comps_store import ComparablesStore, CONDITION_CODES, save_array_atomic
+
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LAT = 69.05
+
+# Weights of each normalized difference in the comp distance score
+DEFAULT_SIMILARITY_WEIGHTS = {
+    "sqft": 1.0,  # relative to subject sqft
+    "bedrooms": 0.5,  # per bedroom
+    "bathrooms": 0.5,  # per bathroom
+    "lot_size": 0.3,  # relative to subject lot (min 0.1 acre)
+    "age": 0.5,  # per decade
+    "condition": 0.5,  # per condition grade
+    "distance": 1.0,  # per mile
+    "recency": 0.5,  # per year since sale
+}
+MISSING_PENALTY = 1.0  # normalized difference used when a comp lacks the field
+
+
+def haversine_miles(lat: float, lon: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Great-circle distance in miles from one point to arrays of points."""
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GeoGridIndex:
+    """
+    Fixed-size lat/lon grid over a comps store, rows sorted by (cell, sale date).
+
+    A radius query only visits the cells overlapping the search circle, and the
+    days_back cut is a bisection inside each cell, so cost depends on the number
+    of nearby recent sales rather than the size of the history.
+    """
+
+    FILES = ("geo_order", "geo_keys")
+
+    def __init__(self, order: np.ndarray, keys: np.ndarray, cell_deg: float):
+        self.order = order  # store row positions sorted by key
+        self.keys = keys  # (cell id << 32) | sale-date ordinal, sorted
+        self.cell_deg = cell_deg
+        self.n_lon = int(np.ceil(360 / cell_deg))
+
+    def _cells(self, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+        lat_idx = np.floor((lats + 90) / self.cell_deg).astype(np.int64)
+        lon_idx = np.floor((lons + 180) / self.cell_deg).astype(np.int64)
+        return lat_idx * self.n_lon + lon_idx
+
+    @classmethod
+    def build(cls, store: ComparablesStore, cell_deg: float = 0.02) -> "GeoGridIndex":
+        """
+        Build the grid for every row with coordinates.
+
+        Args:
+            store: Comparable sales store with latitude/longitude columns
+            cell_deg: Cell size in degrees (0.02 ~ 1.4 miles of latitude)
+
+        Returns:
+            GeoGridIndex
+        """
+        index = cls(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), cell_deg)
+        lats, lons = np.asarray(store["latitude"]), np.asarray(store["longitude"])
+        located = np.flatnonzero(~np.isnan(lats) & ~np.isnan(lons))
+        keys = (index._cells(lats[located], lons[located]) << 32) | np.asarray(store["sale_date"])[located].astype(np.int64)
+        sort = np.argsort(keys, kind="stable")
+        index.order = located[sort]
+        index.keys = keys[sort]
+        return index
+
+    def save(self, path: str) -> None:
+        # Other workers may be writing or mapping the same files: each one is replaced atomically
+        save_array_atomic(os.path.join(path, "geo_order.npy"), self.order)
+        save_array_atomic(os.path.join(path, "geo_keys.npy"), self.keys)
+        save_array_atomic(os.path.join(path, "geo_cell_deg.npy"), np.array([self.cell_deg]))
+
+    @classmethod
+    def open(cls, path: str) -> Optional["GeoGridIndex"]:
+        if not all(os.path.exists(os.path.join(path, f"{name}.npy")) for name in cls.FILES):
+            return None
+        return cls(
+            np.load(os.path.join(path, "geo_order.npy"), mmap_mode="r"),
+            np.load(os.path.join(path, "geo_keys.npy"), mmap_mode="r"),
+            float(np.load(os.path.join(path, "geo_cell_deg.npy"))[0]),
+        )
+
+    def query(
+        self,
+        store: ComparablesStore,
+        latitude: float,
+        longitude: float,
+        radius_miles: float,
+        min_sale_ordinal: int = 0,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Rows within radius_miles of a point and sold on/after min_sale_ordinal.
+
+        Args:
+            store: The store the index was built on
+            latitude: Subject latitude
+            longitude: Subject longitude
+            radius_miles: Search radius in miles
+            min_sale_ordinal: Earliest sale-date ordinal to keep (0 keeps all)
+
+        Returns:
+            Dictionary with matching store rows (sorted) and their distances in miles
+        """
+        lat_span = radius_miles / MILES_PER_DEGREE_LAT
+        lon_span = radius_miles / (MILES_PER_DEGREE_LAT * max(np.cos(np.radians(latitude)), 1e-6))
+        lat_cells = np.arange(
+            int(np.floor((latitude - lat_span + 90) / self.cell_deg)),
+            int(np.floor((latitude + lat_span + 90) / self.cell_deg)) + 1,
+        )
+        lon_cells = np.arange(
+            int(np.floor((longitude - lon_span + 180) / self.cell_deg)),
+            int(np.floor((longitude + lon_span + 180) / self.cell_deg)) + 1,
+        )
+        cells = (lat_cells[:, None] * self.n_lon + lon_cells[None, :]).ravel().astype(np.int64)
+
+        # Per cell: [first row sold on/after min date, first row of next cell)
+        starts = np.searchsorted(self.keys, (cells << 32) | max(min_sale_ordinal, 0))
+        ends = np.searchsorted(self.keys, (cells + 1) << 32)
+        lengths = ends - starts
+        if not lengths.sum():
+            return {"rows": np.empty(0, dtype=np.int64), "distance_miles": np.empty(0)}
+        positions = np.repeat(starts - np.concatenate(([0], np.cumsum(lengths)[:-1])), lengths) + np.arange(lengths.sum())
+        candidates = np.asarray(self.order[positions])
+
+        distances = haversine_miles(latitude, longitude, store["latitude"][candidates], store["longitude"][candidates])
+        inside = distances <= radius_miles
+        rows, distances = candidates[inside], distances[inside]
+        sort = np.argsort(rows)
+        return {"rows": rows[sort], "distance_miles": distances[sort]}
+
+
+def get_geo_index(store: ComparablesStore) -> GeoGridIndex:
+    """
+    Geo index of a store, built once and kept on the store (and on disk for saved stores).
+
+    Args:
+        store: Comparable sales store
+
+    Returns:
+        GeoGridIndex
+    """
+    index = store.indexes.get("geo")
+    if index is None:
+        index = GeoGridIndex.open(store.path) if store.path else None
+        if index is None:
+            index = GeoGridIndex.build(store)
+            if store.path and os.access(store.path, os.W_OK):
+                index.save(store.path)
+        store.indexes["geo"] = index
+    return index
+
+
+class RangeIndex:
+    """
+    Sorted index over one column: a [low, high] range is two bisections and
+    yields a contiguous slice of row positions.
+    """
+
+    def __init__(self, column: str, order: np.ndarray, values: np.ndarray):
+        self.column = column
+        self.order = order  # store row positions sorted by value (NaN last)
+        self.values = values  # column values in that order
+
+    @classmethod
+    def build(cls, store: ComparablesStore, column: str) -> "RangeIndex":
+        order = np.argsort(np.asarray(store[column]), kind="stable")
+        return cls(column, order, np.asarray(store[column])[order])
+
+    def save(self, path: str) -> None:
+        save_array_atomic(os.path.join(path, f"range_{self.column}_order.npy"), self.order)
+        save_array_atomic(os.path.join(path, f"range_{self.column}_values.npy"), self.values)
+
+    @classmethod
+    def open(cls, path: str, column: str) -> Optional["RangeIndex"]:
+        order_file = os.path.join(path, f"range_{column}_order.npy")
+        values_file = os.path.join(path, f"range_{column}_values.npy")
+        if not (os.path.exists(order_file) and os.path.exists(values_file)):
+            return None
+        return cls(column, np.load(order_file, mmap_mode="r"), np.load(values_file, mmap_mode="r"))
+
+    def bounds(self, low: float, high: float) -> Tuple[int, int]:
+        """Positions [start, end) of the sorted values within [low, high]."""
+        return (
+            int(np.searchsorted(self.values, low, side="left")),
+            int(np.searchsorted(self.values, high, side="right")),
+        )
+
+
+def get_range_index(store: ComparablesStore, column: str) -> RangeIndex:
+    """
+    Range index of one store column, built once and kept on the store (and on disk for saved stores).
+
+    Args:
+        store: Comparable sales store
+        column: Column to index (e.g. sqft, bedrooms, sale_date, property_type)
+
+    Returns:
+        RangeIndex
+    """
+    key = f"range_{column}"
+    index = store.indexes.get(key)
+    if index is None:
+        index = RangeIndex.open(store.path, column) if store.path else None
+        if index is None:
+            index = RangeIndex.build(store, column)
+            if store.path and os.access(store.path, os.W_OK):
+                index.save(store.path)
+        store.indexes[key] = index
+    return index
+
+
+def count_in_range(store: ComparablesStore, column: str, low: float, high: float) -> int:
+    """Number of rows whose column value lies in [low, high] (two bisections on the range index)."""
+    start, end = get_range_index(store, column).bounds(low, high)
+    return end - start
+
+
+def select_rows(
+    store: ComparablesStore,
+    ranges: Dict[str, Tuple[float, float]],
+    candidates: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Rows satisfying every [low, high] column range, optionally within a candidate set.
+
+    Each range is bisected on its index; the most selective slice (or the candidate
+    rows, if fewer) drives the scan and the other ranges are checked on those rows only.
+
+    Args:
+        store: Comparable sales store
+        ranges: Column -> (low, high), inclusive
+        candidates: Sorted row positions to restrict to (e.g. geo query hits)
+
+    Returns:
+        Sorted row positions
+    """
+    if not ranges:
+        return np.arange(len(store)) if candidates is None else candidates
+
+    slices = []
+    for column, (low, high) in ranges.items():
+        index = get_range_index(store, column)
+        start, end = index.bounds(low, high)
+        slices.append((end - start, column, index, start, end))
+    slices.sort(key=lambda item: item[0])
+
+    size, driver, index, start, end = slices[0]
+    if candidates is not None and len(candidates) <= size:
+        rows = candidates
+        remaining = ranges
+    else:
+        rows = np.sort(np.asarray(index.order[start:end]))
+        if candidates is not None:
+            rows = np.intersect1d(rows, candidates, assume_unique=True)
+        remaining = {column: bounds for column, bounds in ranges.items() if column != driver}
+
+    mask = np.ones(len(rows), dtype=bool)
+    for column, (low, high) in remaining.items():
+        values = store[column][rows]
+        mask &= (values >= low) & (values <= high)
+    return rows[mask]
+
+
+class AddressIndex:
+    """
+    Hashed address -> store rows map: the rows of one address are a slice of the
+    row positions grouped by address, found with one hash lookup.
+    """
+
+    def __init__(self, addresses: pd.Index, order: np.ndarray, starts: np.ndarray):
+        self.addresses = addresses  # distinct addresses (unique pandas Index, hashed lookups)
+        self.order = order  # store row positions grouped by address
+        self.starts = starts  # start of each address group in order (plus the end)
+
+    @classmethod
+    def build(cls, store: ComparablesStore) -> "AddressIndex":
+        codes, addresses = pd.factorize(pd.Series(np.asarray(store["address"])))
+        order = np.argsort(codes, kind="stable")
+        starts = np.searchsorted(codes[order], np.arange(len(addresses) + 1))
+        return cls(pd.Index(addresses), order, starts)
+
+    def rows(self, address: str) -> np.ndarray:
+        """Sorted row positions of an address (exact match after stripping), empty if unknown."""
+        code = self.addresses.get_indexer([address.strip()])[0]
+        if code < 0:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(self.order[self.starts[code]:self.starts[code + 1]])
+
+
+def get_address_index(store: ComparablesStore) -> AddressIndex:
+    """
+    Address index of a store, built once and kept on the store (so once per published version).
+
+    Args:
+        store: Comparable sales store
+
+    Returns:
+        AddressIndex
+    """
+    index = store.indexes.get("address")
+    if index is None:
+        index = AddressIndex.build(store)
+        store.indexes["address"] = index
+    return index
+
+
+def locate_subject(store: ComparablesStore, property_address: str) -> Optional[Dict[str, float]]:
+    """
+    Coordinates of an address already present in the store (exact match).
+
+    Args:
+        store: Comparable sales store
+        property_address: Subject address
+
+    Returns:
+        Dictionary with latitude/longitude, or None if unknown
+    """
+    for row in get_address_index(store).rows(property_address).tolist():
+        latitude, longitude = float(store["latitude"][row]), float(store["longitude"][row])
+        if not (np.isnan(latitude) or np.isnan(longitude)):
+            return {"latitude": latitude, "longitude": longitude}
+    return None
+
+
+def data_as_of(store: ComparablesStore) -> datetime:
+    """Most recent sale date in the store (today if the store has no dates)."""
+    ordinals = np.asarray(store["sale_date"])
+    latest = int(ordinals.max()) if len(ordinals) else 0
+    return datetime.fromordinal(latest) if latest > 0 else datetime.now()
+
+
+def top_k_similar(
+    store: ComparablesStore,
+    subject: Dict[str, Any],
+    k: int = 10,
+    weights: Optional[Dict[str, float]] = None,
+    candidates: Optional[np.ndarray] = None,
+    as_of: Optional[datetime] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    The k comps closest to a subject under a weighted distance, with similarity weights.
+
+    Each field contributes weight * normalized |difference| (MISSING_PENALTY when the
+    comp lacks it; skipped when the subject lacks it). Selection is an argpartition,
+    so only the k winners are sorted.
+
+    Args:
+        store: Comparable sales store
+        subject: Subject fields (sqft, bedrooms, bathrooms, lot_size, year_built,
+            condition, latitude, longitude)
+        k: Number of comps to return
+        weights: Per-field weights (defaults to DEFAULT_SIMILARITY_WEIGHTS)
+        candidates: Row positions to choose from (defaults to the whole store)
+        as_of: Reference date for recency and ages (defaults to the latest sale in the store)
+
+    Returns:
+        Dictionary with rows (most similar first), distance scores, similarity (1 / (1 + score))
+        and weights (similarities normalized to sum to 1)
+    """
+    weights = {**DEFAULT_SIMILARITY_WEIGHTS, **(weights or {})}
+    as_of = as_of or data_as_of(store)
+    rows = np.arange(len(store)) if candidates is None else np.asarray(candidates)
+    score = np.zeros(len(rows))
+
+    def add(field: str, difference: np.ndarray) -> None:
+        score[:] += weights[field] * np.where(np.isnan(difference), MISSING_PENALTY, np.abs(difference))
+
+    if subject.get("sqft"):
+        add("sqft", (store["sqft"][rows] - subject["sqft"]) / subject["sqft"])
+    if subject.get("bedrooms") is not None:
+        add("bedrooms", store["bedrooms"][rows] - subject["bedrooms"])
+    if subject.get("bathrooms") is not None:
+        add("bathrooms", store["bathrooms"][rows] - subject["bathrooms"])
+    if subject.get("lot_size") is not None:
+        add("lot_size", (store["lot_size"][rows] - subject["lot_size"]) / max(subject["lot_size"], 0.1))
+    if subject.get("year_built"):
+        add("age", (store["year_built"][rows] - subject["year_built"]) / 10)
+    if subject.get("condition") in CONDITION_CODES:
+        codes = np.asarray(store["condition"][rows], dtype=float)
+        codes[codes == 0] = np.nan
+        add("condition", codes - CONDITION_CODES[subject["condition"]])
+    if subject.get("latitude") is not None and subject.get("longitude") is not None:
+        add("distance", haversine_miles(subject["latitude"], subject["longitude"],
+                                        store["latitude"][rows], store["longitude"][rows]))
+    ordinals = np.asarray(store["sale_date"][rows], dtype=float)
+    ordinals[ordinals == 0] = np.nan
+    add("recency", (as_of.toordinal() - ordinals) / 365)
+
+    k = min(k, len(rows))
+    if k <= 0:
+        empty = np.empty(0)
+        return {"rows": np.empty(0, dtype=np.int64), "score": empty, "similarity": empty, "weight": empty}
+    best = np.argpartition(score, k - 1)[:k] if k < len(rows) else np.arange(len(rows))
+    best = best[np.argsort(score[best], kind="stable")]
+    similarity = 1.0 / (1.0 + score[best])
+    return {
+        "rows": rows[best],
+        "score": score[best],
+        "similarity": similarity,
+        "weight": similarity / similarity.sum(),
+    }
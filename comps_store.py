@@ -0,0 +1,396 @@
+from typing import Dict, Any, List, Optional, Union, Sequence, Tuple
+from functools import lru_cache
+from datetime import datetime, date
+import pandas as pd
+import numpy as np
+import json
+import os
+import shutil
+import time
+import uuid
+
+
+# Column name -> dtype. Numeric measures are float64 with NaN for "missing",
+# sale_date is a proleptic Gregorian ordinal (0 = missing), condition and property_type are codes (0 = unknown).
+COLUMNS = {
+    "sale_price": np.float64,
+    "sqft": np.float64,
+    "bedrooms": np.float64,
+    "bathrooms": np.float64,
+    "lot_size": np.float64,
+    "year_built": np.float64,
+    "sale_date": np.int32,
+    "condition": np.int8,
+    "property_type": np.int8,
+    "days_on_market": np.float64,
+    "price_per_sqft": np.float64,
+    "latitude": np.float64,
+    "longitude": np.float64,
+    "similarity_weight": np.float64,
+}
+ADDRESS_WIDTH = 96
+
+CONDITION_CODES = {"Excellent": 1, "Good": 2, "Fair": 3, "Poor": 4}
+CONDITION_NAMES = {code: name for name, code in CONDITION_CODES.items()}
+
+PROPERTY_TYPE_CODES = {"residential": 1, "commercial": 2, "land": 3}
+PROPERTY_TYPE_NAMES = {code: name for name, code in PROPERTY_TYPE_CODES.items()}
+
+# Columns emitted as floats even when the value is integral
+FLOAT_COLUMNS = {"lot_size", "price_per_sqft", "latitude", "longitude", "similarity_weight"}
+
+# Pointer file naming the published version directory of a saved store
+CURRENT_FILE = "CURRENT"
+DEFAULT_STORE_PATH = os.getenv("COMPS_STORE_PATH", os.path.join(os.path.dirname(__file__), "data", "comps_store"))
+
+
+def _date_ordinal(sale_date: Any) -> int:
+    """Ordinal of a sale date (YYYY-MM-DD or MM/DD/YYYY string, date/datetime); 0 if missing or invalid."""
+    if not sale_date:
+        return 0
+    if isinstance(sale_date, (datetime, date)):
+        return sale_date.toordinal()
+    for fmt in ("%Y-%m-%d", "%m/%d/%Y"):
+        try:
+            return datetime.strptime(str(sale_date), fmt).toordinal()
+        except ValueError:
+            continue
+    return 0
+
+
+class ComparablesStore:
+    """
+    Columnar comparable-sales store: one typed NumPy array per field.
+
+    Stores opened from disk are memory-mapped read-only, so several worker
+    processes share the same pages and column reads/slices are zero-copy.
+    """
+
+    def __init__(
+        self,
+        columns: Dict[str, np.ndarray],
+        records: Optional[List[Dict[str, Any]]] = None,
+        path: Optional[str] = None,
+        version: Optional[str] = None,
+    ):
+        self.columns = columns
+        # Original dicts when built from a list, returned as-is by to_records
+        self.records = records
+        # Directory the store was opened from (indexes are persisted next to the columns)
+        self.path = path
+        # Published version read from that directory (None for in-memory stores)
+        self.version = version
+        # Lazily built indexes (see comps_index)
+        self.indexes: Dict[str, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self.columns["sale_price"])
+
+    @property
+    def version_key(self) -> Optional[Tuple[str, str]]:
+        """
+        (directory, version) of a store opened from disk, None for an in-memory store.
+
+        Published versions are never modified, so per-store caches (fits, sketches,
+        indexes) key on this instead of the object id.
+        """
+        if self.path is None or self.version is None:
+            return None
+        return self.path, self.version
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        return self.columns[name]
+
+    def filled(self, name: str, default: float = 0.0) -> np.ndarray:
+        """Column with missing values replaced by a default (like comp.get(name, default))."""
+        values = self.columns[name]
+        return np.where(np.isnan(values), default, values)
+
+    @classmethod
+    def from_records(cls, comparable_sales: List[Dict[str, Any]]) -> "ComparablesStore":
+        """
+        Build an in-memory store from the list-of-dicts format used by the tools.
+
+        Args:
+            comparable_sales: List of comparable sales data
+
+        Returns:
+            ComparablesStore holding one array per column
+        """
+        def numeric(key: str) -> np.ndarray:
+            return np.array(
+                [comp[key] if comp.get(key) is not None else np.nan for comp in comparable_sales],
+                dtype=np.float64,
+            )
+
+        columns = {key: numeric(key) for key in ("sale_price", "sqft", "bedrooms", "bathrooms", "lot_size",
+                                                  "year_built", "days_on_market", "latitude", "longitude",
+                                                  "similarity_weight")}
+        columns["sale_date"] = np.array([_date_ordinal(comp.get("sale_date")) for comp in comparable_sales], dtype=np.int32)
+        columns["condition"] = np.array([CONDITION_CODES.get(comp.get("condition"), 0) for comp in comparable_sales], dtype=np.int8)
+        columns["property_type"] = np.array(
+            [PROPERTY_TYPE_CODES.get(str(comp.get("property_type") or "").lower(), 0) for comp in comparable_sales],
+            dtype=np.int8,
+        )
+
+        # Provided ppsf when truthy, otherwise sale_price / sqft when both are truthy
+        ppsf = numeric("price_per_sqft")
+        ppsf[ppsf == 0] = np.nan
+        computable = np.isnan(ppsf) & (np.nan_to_num(columns["sale_price"]) != 0) & (np.nan_to_num(columns["sqft"]) != 0)
+        ppsf[computable] = columns["sale_price"][computable] / columns["sqft"][computable]
+        columns["price_per_sqft"] = ppsf
+
+        columns["address"] = np.array([str(comp.get("address") or "") for comp in comparable_sales], dtype=f"U{ADDRESS_WIDTH}")
+        return cls(columns, records=list(comparable_sales))
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> "ComparablesStore":
+        """
+        Build a store from a DataFrame (e.g. comparables.csv) with column operations only.
+
+        Args:
+            frame: One row per comparable, columns named as in the comparable dicts
+
+        Returns:
+            ComparablesStore holding one array per column (to_records rebuilds the dicts)
+        """
+        def numeric(key: str) -> np.ndarray:
+            if key not in frame.columns:
+                return np.full(len(frame), np.nan)
+            return pd.to_numeric(frame[key], errors="coerce").to_numpy(dtype=np.float64, copy=True)
+
+        columns = {key: numeric(key) for key in ("sale_price", "sqft", "bedrooms", "bathrooms", "lot_size",
+                                                  "year_built", "days_on_market", "latitude", "longitude",
+                                                  "similarity_weight")}
+        if "sale_date" in frame.columns:
+            dates = pd.to_datetime(frame["sale_date"], errors="coerce")
+            epoch_days = (dates - pd.Timestamp("1970-01-01")).dt.days
+            columns["sale_date"] = (epoch_days + date(1970, 1, 1).toordinal()).fillna(0).to_numpy(dtype=np.int32)
+        else:
+            columns["sale_date"] = np.zeros(len(frame), dtype=np.int32)
+        columns["condition"] = (
+            frame["condition"].map(CONDITION_CODES).fillna(0).to_numpy(dtype=np.int8)
+            if "condition" in frame.columns else np.zeros(len(frame), dtype=np.int8)
+        )
+        columns["property_type"] = (
+            frame["property_type"].astype(str).str.lower().map(PROPERTY_TYPE_CODES).fillna(0).to_numpy(dtype=np.int8)
+            if "property_type" in frame.columns else np.zeros(len(frame), dtype=np.int8)
+        )
+
+        # Same rule as from_records: provided ppsf when truthy, else sale_price / sqft
+        ppsf = numeric("price_per_sqft")
+        ppsf[ppsf == 0] = np.nan
+        computable = np.isnan(ppsf) & (np.nan_to_num(columns["sale_price"]) != 0) & (np.nan_to_num(columns["sqft"]) != 0)
+        ppsf[computable] = columns["sale_price"][computable] / columns["sqft"][computable]
+        columns["price_per_sqft"] = ppsf
+
+        addresses = frame["address"].fillna("").astype(str) if "address" in frame.columns else pd.Series([""] * len(frame))
+        columns["address"] = addresses.to_numpy(dtype=f"U{ADDRESS_WIDTH}")
+        return cls(columns)
+
+    def take(self, rows: Union[slice, Sequence[int], np.ndarray]) -> "ComparablesStore":
+        """
+        Select rows; a slice is a zero-copy view of every column.
+
+        Args:
+            rows: Slice, integer positions or boolean mask
+
+        Returns:
+            ComparablesStore over the selected rows
+        """
+        records = None
+        if self.records is not None:
+            positions = np.arange(len(self))[rows]
+            records = [self.records[i] for i in positions]
+        return ComparablesStore({name: values[rows] for name, values in self.columns.items()}, records=records)
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        """
+        Convert rows back to the list-of-dicts format returned by the tools (missing fields omitted).
+
+        Returns:
+            List of comparable sale dictionaries
+        """
+        if self.records is not None:
+            return list(self.records)
+        names = [name for name in COLUMNS if name in self.columns and name not in ("sale_date", "condition", "property_type")]
+        lists = {name: self.columns[name].tolist() for name in names}
+        addresses = self.columns["address"].tolist()
+        ordinals = self.columns["sale_date"].tolist()
+        conditions = self.columns["condition"].tolist()
+        property_types = self.columns["property_type"].tolist() if "property_type" in self.columns else [0] * len(self)
+
+        records = []
+        for i in range(len(self)):
+            comp: Dict[str, Any] = {"address": addresses[i]}
+            for name in names:
+                value = lists[name][i]
+                if value != value:  # NaN
+                    continue
+                if name == "price_per_sqft":
+                    value = round(value, 2)
+                elif name not in FLOAT_COLUMNS and float(value).is_integer():
+                    value = int(value)
+                comp[name] = value
+            if ordinals[i]:
+                comp["sale_date"] = date.fromordinal(ordinals[i]).isoformat()
+            if conditions[i]:
+                comp["condition"] = CONDITION_NAMES[conditions[i]]
+            if property_types[i]:
+                comp["property_type"] = PROPERTY_TYPE_NAMES[property_types[i]]
+            records.append(comp)
+        return records
+
+    def price_per_sqft_values(self) -> np.ndarray:
+        """Valid price-per-sqft values (the Method 1 input of avm_engine)."""
+        ppsf = self.columns["price_per_sqft"]
+        return ppsf[~np.isnan(ppsf)]
+
+    def comp_weights(self) -> Optional[np.ndarray]:
+        """Similarity weights when every comp carries one (see comps_index.top_k_similar), else None."""
+        if "similarity_weight" not in self.columns:
+            return None
+        weights = np.asarray(self.columns["similarity_weight"])
+        if not len(weights) or np.isnan(weights).any() or weights.sum() <= 0:
+            return None
+        return weights
+
+    def days_since_sale(self, now: Optional[datetime] = None) -> np.ndarray:
+        """Days between each sale and now; missing dates count as sold today."""
+        today = (now or datetime.now()).toordinal()
+        ordinals = self.columns["sale_date"]
+        return np.where(ordinals > 0, today - ordinals, 0)
+
+    def save(self, path: str) -> str:
+        """
+        Publish the store as a new version: one .npy file per column plus a meta.json.
+
+        Each save writes a fresh version directory and then atomically repoints
+        CURRENT to it, so processes that memory-mapped the previous version keep
+        valid maps (files are never rewritten in place). Older versions but the
+        previous one are removed.
+
+        Args:
+            path: Store directory
+
+        Returns:
+            The version directory written
+        """
+        os.makedirs(path, exist_ok=True)
+        version = f"v{time.time_ns()}"
+        version_path = os.path.join(path, version)
+        os.makedirs(version_path)
+        for name, values in self.columns.items():
+            np.save(os.path.join(version_path, f"{name}.npy"), np.ascontiguousarray(values))
+        with open(os.path.join(version_path, "meta.json"), "w") as f:
+            json.dump({"rows": len(self), "columns": sorted(self.columns), "saved_at": datetime.now().isoformat()}, f)
+
+        previous = current_version(path)
+        write_atomic(os.path.join(path, CURRENT_FILE), version.encode())
+        for name in os.listdir(path):
+            if name.startswith("v") and name not in (version, previous) and os.path.isdir(os.path.join(path, name)):
+                # Unlinking keeps pages of still-mapped files alive until their maps are closed
+                shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+        return version_path
+
+    @classmethod
+    def open(cls, path: str) -> "ComparablesStore":
+        """
+        Open the current version of a saved store with every column memory-mapped read-only.
+
+        Args:
+            path: Store directory written by save() (or a directory holding meta.json directly)
+
+        Returns:
+            ComparablesStore backed by the on-disk files
+        """
+        version = current_version(path)
+        if version is not None:
+            path = os.path.join(path, version)
+        else:
+            # Store saved without versions: the meta.json mtime identifies its content
+            version = store_mtime_version(path)
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in meta["columns"]}
+        return cls(columns, path=path, version=version)
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    """Write a file through a private temporary name and os.replace, so readers never see it partial."""
+    temporary = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            f.write(data)
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def save_array_atomic(path: str, values: np.ndarray) -> None:
+    """np.save through a private temporary file and os.replace (safe with concurrent writers and open maps)."""
+    temporary = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            np.save(f, values)
+        os.replace(temporary, path)
+    finally:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def current_version(path: str) -> Optional[str]:
+    """Version directory name CURRENT points to, or None (no store, or a store saved without versions)."""
+    try:
+        with open(os.path.join(path, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def store_mtime_version(path: str) -> Optional[str]:
+    """Version label of a store saved without versions (meta.json mtime), or None without a store."""
+    try:
+        return f"mtime:{os.stat(os.path.join(path, 'meta.json')).st_mtime_ns}"
+    except OSError:
+        return None
+
+
+def same_store(a: Optional["ComparablesStore"], b: Optional["ComparablesStore"]) -> bool:
+    """
+    Whether two stores hold the same sales: the same published version, or the same
+    in-memory object (callers keep a reference, so the identity cannot be reused).
+    """
+    if a is None or b is None:
+        return False
+    return a is b or (a.version_key is not None and a.version_key == b.version_key)
+
+
+def as_comps_store(comparable_sales: Union["ComparablesStore", List[Dict[str, Any]]]) -> ComparablesStore:
+    """Accept either a ComparablesStore or a list of comparable dicts."""
+    if isinstance(comparable_sales, ComparablesStore):
+        return comparable_sales
+    return ComparablesStore.from_records(comparable_sales)
+
+
+@lru_cache(maxsize=8)
+def _open_store_version(path: str, version: str) -> ComparablesStore:
+    # version only keys the cache (open() resolves CURRENT itself)
+    return ComparablesStore.open(path)
+
+
+def open_shared_store(path: str = DEFAULT_STORE_PATH) -> Optional[ComparablesStore]:
+    """
+    Open (once per process and per published version) the memory-mapped store shared by the Streamlit workers.
+
+    Args:
+        path: Store directory
+
+    Returns:
+        ComparablesStore of the current version, or None if no store has been saved at that path
+    """
+    version = current_version(path) or store_mtime_version(path)
+    if version is None:
+        return None
+    return _open_store_version(path, version)
@@ -1,5 +1,14 @@
+import argparse
 import pandas as pd
-# Créer des comparables simulés
+import numpy as np
+
+# Colonnes de comparables.csv
+COMPS_COLUMNS = ["address", "sqft", "bedrooms", "bathrooms", "lot_size", "year_built", "condition", "sale_price"]
+
+# Colonnes supplémentaires lues par les outils (mls_integration, avm_engine, ...)
+EXTENDED_COLUMNS = ["sale_date", "property_type", "days_on_market", "price_per_sqft", "latitude", "longitude"]
+
+# Comparables simulés
 comps_data = {
     "address": [
         "123 Main St",
@@ -15,11 +24,97 @@ comps_data = {
     "sale_price": [400000, 450000, 420000]
 }
 
-# Créer un DataFrame pandas
-comps_df = pd.DataFrame(comps_data)
+STREETS = np.array(["Main St", "Oak Ave", "Pine Rd", "Maple Dr", "Cedar Ln", "Elm St", "Park Ave", "Lake Rd",
+                    "Hill St", "River Rd", "Spruce Ct", "Walnut St"])
+CONDITIONS = np.array(["Excellent", "Good", "Fair", "Poor"])
+CONDITION_PROBABILITIES = [0.15, 0.5, 0.25, 0.1]
+CONDITION_PREMIUMS = np.array([1.1, 1.0, 0.9, 0.8])
+
+
+def generate_comps(
+    n: int,
+    seed: int = 0,
+    extended: bool = True,
+    center: tuple = (40.0152, -75.1321),
+    radius_miles: float = 5.0,
+    end_date: str = "2024-06-30",
+    days_span: int = 730,
+) -> pd.DataFrame:
+    """
+    Génère n comparables synthétiques reproductibles au schéma de comparables.csv.
+
+    Args:
+        n: Nombre de lignes (10^2 à 10^6 et au-delà)
+        seed: Graine du générateur aléatoire (même graine = mêmes données)
+        extended: Ajoute sale_date, property_type, days_on_market, price_per_sqft, latitude, longitude
+        center: Centre (latitude, longitude) du marché simulé
+        radius_miles: Rayon approximatif de dispersion des biens autour du centre
+        end_date: Date de la vente la plus récente (YYYY-MM-DD)
+        days_span: Étendue des dates de vente en jours avant end_date
+
+    Returns:
+        DataFrame avec les colonnes COMPS_COLUMNS (+ EXTENDED_COLUMNS si extended)
+    """
+    rng = np.random.default_rng(seed)
+
+    sqft = np.clip(rng.lognormal(np.log(2000), 0.3, n), 500, 12000).round()
+    bedrooms = np.clip(np.round(sqft / 650 + rng.normal(0, 0.7, n)), 1, 8)
+    bathrooms = np.clip(np.round((bedrooms * 0.75 + rng.normal(0, 0.5, n)) * 2) / 2, 1, 6)
+    lot_size = np.clip(rng.gamma(2.0, 0.12, n), 0.05, 5).round(2)
+    year_built = rng.integers(1900, 2024, n)
+    condition_codes = rng.choice(len(CONDITIONS), size=n, p=CONDITION_PROBABILITIES)
+
+    # Prix: ppsf de base x état x dépréciation + terrain, bruit multiplicatif
+    age = 2024 - year_built
+    ppsf = 200 * CONDITION_PREMIUMS[condition_codes] * np.maximum(0.85, 1 - age * 0.003)
+    sale_price = np.round((sqft * ppsf + lot_size * 20000) * rng.lognormal(0, 0.08, n), -2)
+
+    numbers = rng.integers(1, 9999, n).astype(str)
+    streets = STREETS[rng.integers(0, len(STREETS), n)]
+    frame = pd.DataFrame({
+        "address": pd.Series(numbers, dtype=object) + " " + pd.Series(streets, dtype=object)
+                   + " #" + pd.Series(np.arange(n).astype(str), dtype=object),
+        "sqft": sqft.astype(int),
+        "bedrooms": bedrooms.astype(int),
+        "bathrooms": bathrooms,
+        "lot_size": lot_size,
+        "year_built": year_built,
+        "condition": CONDITIONS[condition_codes],
+        "sale_price": sale_price.astype(int),
+    })
+    if not extended:
+        return frame
+
+    # Position uniforme dans le disque de rayon radius_miles
+    distance = radius_miles * np.sqrt(rng.random(n))
+    bearing = rng.random(n) * 2 * np.pi
+    latitude = center[0] + distance * np.cos(bearing) / 69.05
+    longitude = center[1] + distance * np.sin(bearing) / (69.05 * np.cos(np.radians(center[0])))
+
+    sale_dates = pd.Timestamp(end_date) - pd.to_timedelta(rng.integers(0, days_span, n), unit="D")
+    frame["sale_date"] = sale_dates.strftime("%Y-%m-%d")
+    frame["property_type"] = np.where(rng.random(n) < 0.9, "residential", "commercial")
+    frame["days_on_market"] = rng.integers(3, 180, n)
+    frame["price_per_sqft"] = (frame["sale_price"] / frame["sqft"]).round(2)
+    frame["latitude"] = latitude.round(6)
+    frame["longitude"] = longitude.round(6)
+    return frame
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Écrit comparables.csv (échantillon fixe ou comparables synthétiques)")
+    parser.add_argument("--rows", type=int, default=0, help="Nombre de comparables synthétiques (0 = échantillon de 3 lignes)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--extended", action="store_true", help="Ajoute les colonnes lues par les outils")
+    parser.add_argument("--output", default="comparables.csv")
+    args = parser.parse_args()
 
-# Sauvegarder le DataFrame dans un fichier CSV
-comps_df.to_csv('comparables.csv', index=False)
+    # Créer un DataFrame pandas
+    if args.rows:
+        comps_df = generate_comps(args.rows, seed=args.seed, extended=args.extended)
+    else:
+        comps_df = pd.DataFrame(comps_data)
 
-# Retourner le nom du fichier CSV
-'comparables.csv'
\ No newline at end of file
+    # Sauvegarder le DataFrame dans un fichier CSV
+    comps_df.to_csv(args.output, index=False)
+    print(args.output)
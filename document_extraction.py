@@ -0,0 +1,255 @@
+from typing import Dict, Any, List, Optional, Tuple
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from functools import lru_cache
+import multiprocessing
+import os
+import re
+import threading
+import unicodedata
+
+try:
+    from .document_scanner import parse_property_content
+    from .document_sections import parse_property_sections
+except ImportError:
+    from document_scanner import parse_property_content
+    from document_sections import parse_property_sections
+
+# Dépendances optionnelles: sans elles, l'extraction du format concerné échoue avec un message explicite
+try:
+    import pypdf
+except ImportError:
+    pypdf = None
+try:
+    import docx
+except ImportError:
+    docx = None
+
+
+EXTRACTABLE_EXTENSIONS = (".pdf", ".docx")
+EXTRACTION_WORKERS = int(os.getenv("DOCUMENT_EXTRACTION_WORKERS", "2"))
+# Texte normalisé écrit à côté du document (<nom>.pdf.txt): il est lu ensuite par
+# document_property_parser / document_directory_parser comme tout document texte
+TEXT_SUFFIX = ".txt"
+
+BULLET_MARKERS = re.compile(r"^[ \t]*[•●▪◦‣∙·][ \t]*", re.MULTILINE)
+HYPHENATED_BREAK = re.compile(r"([a-zà-ÿ])-\n([a-zà-ÿ])")
+HORIZONTAL_SPACE = re.compile(r"[^\S\n]+")
+BLANK_LINES = re.compile(r"\n{3,}")
+HEADING_STYLE = re.compile(r"^Heading\s+([1-6])$")
+
+
+def normalize_text(text: str) -> str:
+    """
+    Normalise le texte extrait d'un PDF/DOCX pour les parseurs de documents.
+
+    Formes Unicode compatibles (ligatures, espaces insécables), tirets conditionnels retirés,
+    mots coupés en fin de ligne recollés, puces typographiques converties en "- ",
+    espaces et lignes vides en trop réduits.
+    """
+    text = unicodedata.normalize("NFKC", text)
+    text = text.replace("\r\n", "\n").replace("\r", "\n").replace("\u00ad", "")
+    text = HYPHENATED_BREAK.sub(r"\1\2", text)
+    text = BULLET_MARKERS.sub("- ", text)
+    text = HORIZONTAL_SPACE.sub(" ", text)
+    text = "\n".join(line.strip() for line in text.split("\n"))
+    return BLANK_LINES.sub("\n\n", text).strip() + "\n"
+
+
+def extract_pdf_text(file_path: str) -> Tuple[str, int]:
+    """
+    Texte d'un PDF, page par page (nécessite pypdf).
+
+    Returns:
+        (texte brut, nombre de pages)
+    """
+    if pypdf is None:
+        raise RuntimeError("pypdf n'est pas installé (pip install pypdf)")
+    reader = pypdf.PdfReader(file_path)
+    if reader.is_encrypted:
+        reader.decrypt("")
+    pages = [page.extract_text() or "" for page in reader.pages]
+    return "\n\n".join(pages), len(pages)
+
+
+def extract_docx_text(file_path: str) -> Tuple[str, int]:
+    """
+    Texte d'un DOCX dans l'ordre du document (nécessite python-docx).
+
+    Les titres deviennent des titres markdown et les listes des puces, pour que les sections
+    (## Subject Property, ...) soient reconnues; une ligne de tableau devient une ligne dont
+    les cellules sont séparées par des tirets cadratins.
+
+    Returns:
+        (texte brut, nombre de paragraphes et lignes de tableau)
+    """
+    if docx is None:
+        raise RuntimeError("python-docx n'est pas installé (pip install python-docx)")
+    from docx.table import Table
+    from docx.text.paragraph import Paragraph
+
+    document = docx.Document(file_path)
+    lines: List[str] = []
+    number = 0
+    for child in document.element.body.iterchildren():
+        tag = child.tag.rsplit("}", 1)[-1]
+        if tag == "p":
+            paragraph = Paragraph(child, document)
+            text = paragraph.text.strip()
+            style = paragraph.style.name if paragraph.style is not None else ""
+            heading = HEADING_STYLE.match(style)
+            if not text:
+                continue
+            if style == "Title":
+                lines.append(f"# {text}")
+            elif heading:
+                lines.append("#" * int(heading.group(1)) + f" {text}")
+            elif style.startswith("List Number"):
+                number += 1
+                lines.append(f"{number}. {text}")
+                continue
+            elif style.startswith("List"):
+                lines.append(f"- {text}")
+            else:
+                lines.append(text)
+            number = 0
+        elif tag == "tbl":
+            for row in Table(child, document).rows:
+                cells = [cell.text.strip() for cell in row.cells]
+                if any(cells):
+                    lines.append(" — ".join(cell for cell in cells if cell))
+    return "\n".join(lines), len(lines)
+
+
+EXTRACTORS = {".pdf": extract_pdf_text, ".docx": extract_docx_text}
+
+
+def extract_document(file_path: str, doc_type: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Extrait, normalise et analyse un document PDF/DOCX (exécuté dans un processus de travail).
+
+    Args:
+        file_path: Chemin du document
+        doc_type: Type de document (listing, inspection, autre)
+
+    Returns:
+        Attributs du bien (format de document_property_parser), sections reconnues,
+        chemin du texte normalisé et avertissements
+    """
+    extension = os.path.splitext(file_path)[1].lower()
+    raw_text, units = EXTRACTORS[extension](file_path)
+    text = normalize_text(raw_text)
+    text_path = file_path + TEXT_SUFFIX
+    with open(text_path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+    warnings = []
+    if not text.strip():
+        warnings.append("Aucun texte extrait (document numérisé? l'OCR n'est pas pris en charge)")
+    sections = parse_property_sections(text)
+    result = parse_property_content(text_path, text, doc_type)
+    unit = "pages" if extension == ".pdf" else "lines"
+    result.update({
+        "source_path": file_path,
+        "format": extension.lstrip("."),
+        unit: units,
+        "characters": len(text),
+        "sections": list(sections),
+        "comparable_count": len(sections.get("comparable_sales", [])),
+        "warnings": warnings,
+    })
+    return result
+
+
+class ExtractionPipeline:
+    """
+    Extraction des documents téléversés sur un pool de processus.
+
+    submit() rend la main immédiatement; l'interface interroge status() à chaque rerun
+    (ou rafraîchissement partiel) sans jamais attendre un résultat. Un même fichier au
+    même contenu n'est soumis qu'une fois, quel que soit le nombre de reruns.
+    """
+
+    def __init__(self, max_workers: int = EXTRACTION_WORKERS):
+        self.max_workers = max_workers
+        self.executor = self._executor()
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+
+    def _executor(self) -> ProcessPoolExecutor:
+        # "spawn": le pool est créé depuis le serveur Streamlit multi-thread, un fork pourrait
+        # hériter d'un verrou tenu par un autre thread et bloquer le processus de travail
+        return ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+
+    @staticmethod
+    def job_key(file_path: str, digest: str) -> str:
+        return f"{os.path.abspath(file_path)}:{digest}"
+
+    def _submit(self, file_path: str, doc_type: Optional[str]) -> Future:
+        try:
+            return self.executor.submit(extract_document, file_path, doc_type)
+        except BrokenProcessPool:
+            # Un processus de travail a planté (document corrompu): nouveau pool
+            self.executor = self._executor()
+            return self.executor.submit(extract_document, file_path, doc_type)
+
+    def submit(self, file_path: str, digest: str, doc_type: Optional[str] = None) -> str:
+        """
+        Soumet l'extraction d'un document (sans effet si déjà soumis avec ce contenu).
+
+        Args:
+            file_path: Chemin du document enregistré
+            digest: Empreinte du contenu (distingue deux versions d'un même nom de fichier)
+            doc_type: Type de document
+
+        Returns:
+            Clé du travail, à passer à status()
+        """
+        key = self.job_key(file_path, digest)
+        with self.lock:
+            if key not in self.jobs:
+                self.jobs[key] = {
+                    "file_path": file_path,
+                    "name": os.path.basename(file_path),
+                    "future": self._submit(file_path, doc_type),
+                    "submitted_at": datetime.now().isoformat(),
+                }
+        return key
+
+    def status(self, keys: List[str]) -> List[Dict[str, Any]]:
+        """
+        État courant des travaux (lecture seule, ne bloque jamais).
+
+        Returns:
+            Un dictionnaire par clé connue: name, file_path, state (pending, running, done,
+            error), et result ou error une fois terminé
+        """
+        statuses = []
+        for key in keys:
+            job = self.jobs.get(key)
+            if job is None:
+                continue
+            future = job["future"]
+            status = {"key": key, "name": job["name"], "file_path": job["file_path"], "submitted_at": job["submitted_at"]}
+            if not future.done():
+                status["state"] = "running" if future.running() else "pending"
+            elif future.exception() is not None:
+                status["state"] = "error"
+                status["error"] = str(future.exception())
+            else:
+                status["state"] = "done"
+                status["result"] = future.result()
+            statuses.append(status)
+        return statuses
+
+    def progress(self, keys: List[str]) -> Tuple[int, int]:
+        """(travaux terminés, travaux connus) parmi les clés."""
+        futures = [self.jobs[key]["future"] for key in keys if key in self.jobs]
+        return sum(future.done() for future in futures), len(futures)
+
+
+@lru_cache(maxsize=1)
+def get_extraction_pipeline() -> ExtractionPipeline:
+    """Pool d'extraction partagé par le processus (et donc par toutes les sessions Streamlit)."""
+    return ExtractionPipeline()
@@ -0,0 +1,213 @@
+from typing import Dict, Any, Callable, List, Optional, Tuple
+from functools import lru_cache
+import hashlib
+import json
+import os
+import threading
+import uuid
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no advisory lock, the merge still narrows lost updates to concurrent saves
+    fcntl = None
+
+
+DEFAULT_MANIFEST_PATH = os.getenv(
+    "DOCUMENT_MANIFEST_PATH", os.path.join(os.path.dirname(__file__), "data", "document_manifest.json")
+)
+
+
+def file_signature(stat: os.stat_result) -> Tuple[int, int]:
+    """(taille, mtime en ns) d'un fichier: identifie une version sans lire le contenu."""
+    return stat.st_size, stat.st_mtime_ns
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def scan_files(directory: str, extensions: Tuple[str, ...]) -> List[Tuple[str, os.stat_result]]:
+    """
+    Fichiers d'un dossier (récursif, ordre stable) avec leur stat, via os.scandir.
+
+    Returns:
+        Liste de (chemin, stat): un seul appel stat par fichier
+    """
+    found = []
+    stack = [directory]
+    while stack:
+        current = stack.pop()
+        with os.scandir(current) as entries:
+            entries = sorted(entries, key=lambda entry: entry.name)
+        subdirectories = []
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                subdirectories.append(entry.path)
+            elif entry.name.lower().endswith(extensions):
+                found.append((entry.path, entry.stat()))
+        stack.extend(reversed(subdirectories))
+    return found
+
+
+class DocumentManifest:
+    """
+    Manifeste persistant (JSON) des documents déjà traités: chemin -> taille, mtime,
+    empreinte SHA-256 du contenu et dernier résultat par type de traitement.
+
+    Un fichier dont la taille et le mtime n'ont pas changé est servi depuis le manifeste
+    (un stat, aucune lecture). Si seul le mtime a changé mais que l'empreinte est identique,
+    le résultat est conservé et seule la signature est mise à jour.
+    """
+
+    def __init__(self, path: str = DEFAULT_MANIFEST_PATH):
+        self.path = path
+        self.entries: Dict[str, Dict[str, Any]] = self._load()
+        # Entrées modifiées / retirées depuis la dernière sauvegarde (fusionnées avec le disque)
+        self.changed: set = set()
+        self.removed: set = set()
+        self.lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            # Manifeste corrompu: tout sera retraité
+            return {}
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self.changed or self.removed)
+
+    @staticmethod
+    def key(file_path: str) -> str:
+        return os.path.abspath(file_path)
+
+    def get(self, file_path: str, kind: str, stat: Optional[os.stat_result] = None) -> Optional[Any]:
+        """
+        Résultat en cache d'un traitement si le fichier n'a pas changé (taille + mtime).
+
+        Args:
+            file_path: Chemin du fichier
+            kind: Type de traitement (ex. "property_attributes:v1")
+            stat: Stat déjà obtenu (évite un second appel)
+
+        Returns:
+            Le résultat enregistré, ou None s'il faut retraiter
+        """
+        entry = self.entries.get(self.key(file_path))
+        if entry is None or kind not in entry["results"]:
+            return None
+        stat = stat or os.stat(file_path)
+        if [entry["size"], entry["mtime_ns"]] != list(file_signature(stat)):
+            return None
+        return entry["results"][kind]
+
+    def put(self, file_path: str, kind: str, stat: os.stat_result, digest: str, result: Any) -> Any:
+        """
+        Enregistre un résultat; un contenu identique (même empreinte) garde le résultat existant.
+
+        Returns:
+            Le résultat servi pour ce fichier
+        """
+        key = self.key(file_path)
+        size, mtime_ns = file_signature(stat)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry["sha256"] != digest:
+                # Nouveau contenu: les résultats des autres traitements sont périmés
+                entry = {"sha256": digest, "results": {}}
+                self.entries[key] = entry
+            elif kind in entry["results"]:
+                result = entry["results"][kind]
+            entry["size"], entry["mtime_ns"] = size, mtime_ns
+            entry["results"][kind] = result
+            self.changed.add(key)
+            self.removed.discard(key)
+        return result
+
+    def process(self, file_path: str, kind: str, compute: Callable[[bytes], Any]) -> Tuple[Any, bool]:
+        """
+        Résultat d'un traitement pour un fichier, recalculé seulement si son contenu a changé.
+
+        Args:
+            file_path: Chemin du fichier
+            kind: Type de traitement
+            compute: Fonction contenu brut -> résultat (sérialisable en JSON)
+
+        Returns:
+            (résultat, True s'il vient du manifeste)
+        """
+        stat = os.stat(file_path)
+        cached = self.get(file_path, kind, stat)
+        if cached is not None:
+            return cached, True
+        with open(file_path, "rb") as f:
+            data = f.read()
+        digest = content_hash(data)
+        entry = self.entries.get(self.key(file_path))
+        if entry is not None and entry["sha256"] == digest and kind in entry["results"]:
+            return self.put(file_path, kind, stat, digest, None), True
+        return self.put(file_path, kind, stat, digest, compute(data)), False
+
+    def prune(self, directory: str, present: List[str]) -> int:
+        """Retire les entrées d'un dossier dont le fichier n'existe plus."""
+        prefix = self.key(directory) + os.sep
+        keep = {self.key(path) for path in present}
+        removed = [key for key in self.entries if key.startswith(prefix) and key not in keep]
+        with self.lock:
+            for key in removed:
+                del self.entries[key]
+            self.removed.update(removed)
+            self.changed.difference_update(removed)
+        return len(removed)
+
+    def save(self) -> None:
+        """
+        Écrit le manifeste s'il a changé, fusionné avec la version sur disque.
+
+        Plusieurs processus (Streamlit, outils des agents) partagent le fichier: sous un verrou
+        de fichier, la version sur disque est relue, seules les entrées modifiées ou retirées
+        ici y sont appliquées, puis le fichier est remplacé atomiquement (nom temporaire propre
+        au processus).
+        """
+        if not self.dirty:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self.lock, open(self.path + ".lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                merged = self._load()
+                for key in self.removed:
+                    merged.pop(key, None)
+                for key in self.changed:
+                    entry = self.entries[key]
+                    current = merged.get(key)
+                    if current is not None and current["sha256"] == entry["sha256"]:
+                        # Même contenu: garder aussi les traitements enregistrés par les autres processus
+                        entry = {**entry, "results": {**current["results"], **entry["results"]}}
+                    merged[key] = entry
+                temporary = f"{self.path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+                try:
+                    with open(temporary, "w") as f:
+                        json.dump(merged, f)
+                    os.replace(temporary, self.path)
+                finally:
+                    if os.path.exists(temporary):
+                        os.remove(temporary)
+                self.entries = merged
+                self.changed.clear()
+                self.removed.clear()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+@lru_cache(maxsize=8)
+def get_document_manifest(path: str = DEFAULT_MANIFEST_PATH) -> DocumentManifest:
+    """Manifeste partagé par le processus (chargé une fois)."""
+    return DocumentManifest(path)
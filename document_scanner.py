@@ -0,0 +1,412 @@
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+
+try:
+    from .document_manifest import DocumentManifest, content_hash, scan_files
+except ImportError:
+    from document_manifest import DocumentManifest, content_hash, scan_files
+
+
+# Motifs des attributs (robustes aux variations de casse); le groupe "<clé>_value" porte la valeur
+ATTRIBUTE_PATTERNS = {
+    "address": r"address\s*[:\-]?\s*(?P<address_value>.+)$",
+    "sqft": r"(?:sqft|square\s*feet)\s*[:\-]?\s*(?P<sqft_value>\d{3,6})",
+    "bedrooms": r"bed(?:room)?s?\s*[:\-]?\s*(?P<bedrooms_value>\d{1,2})",
+    "bathrooms": r"bath(?:room)?s?\s*[:\-]?\s*(?P<bathrooms_value>\d{1,2}(?:\.\d)?)",
+    "lot_size": r"lot\s*size\s*[:\-]?\s*(?P<lot_size_value>\d{1,2}(?:\.\d{1,2})?)",
+    "year_built": r"year\s*built\s*[:\-]?\s*(?P<year_built_value>\d{4})",
+}
+AMENITIES = ["garage", "pool", "garden", "balcony", "fireplace"]
+CONVERTERS = {
+    "sqft": int,
+    "bedrooms": lambda value: int(float(value)),
+    "bathrooms": float,
+    "lot_size": float,
+    "year_built": int,
+    "address": str.strip,
+}
+
+# Mot-clé initial de chaque motif: un seul balayage cherche tous les mots-clés (alternance de
+# littéraux, que le moteur saute rapidement sur une copie en minuscules), puis le motif complet
+# de l'attribut est essayé uniquement à la position trouvée. La première position où il
+# réussit est celle qu'aurait trouvée re.search sur tout le document.
+KEYWORD_ATTRIBUTES = {
+    "address": "address",
+    "sqft": "sqft",
+    "square": "sqft",
+    "bed": "bedrooms",
+    "bath": "bathrooms",
+    "lot": "lot_size",
+    "year": "year_built",
+    **{amenity: "amenity" for amenity in AMENITIES},
+}
+KEYWORDS = re.compile("|".join(KEYWORD_ATTRIBUTES))
+ATTRIBUTE_REGEXES = {key: re.compile(pattern, re.IGNORECASE | re.MULTILINE) for key, pattern in ATTRIBUTE_PATTERNS.items()}
+AMENITY_REGEX = re.compile(r"\b(?P<amenity_value>" + "|".join(AMENITIES) + r")\b", re.IGNORECASE)
+# Minuscules ASCII de même longueur (repli si lower() change la longueur du texte)
+ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+DEFAULT_DOCUMENTS_DIR = os.path.join(os.path.dirname(__file__), "documents2")
+TEXT_EXTENSIONS = (".md", ".txt", ".csv")
+# Type de traitement dans le manifeste (à incrémenter si l'extraction change)
+PARSER_KIND = "property_attributes:v1"
+STREAM_KIND = "property_blocks:v1"
+
+# Début d'un bloc d'annonce dans les exports texte: titre de niveau 1, ligne de séparation
+# (---, ===, ***), saut de page ou identifiant MLS en début de ligne
+LISTING_BLOCK_START = rb"^(?:#[ \t]|[-=*]{3,}[ \t]*\r?$|\f|MLS[ \t]*(?:#|ID\b|No\b))"
+STREAM_CHUNK_SIZE = 8 * 1024 * 1024
+# Un bloc plus long (export sans séparateurs) est coupé en fin de ligne (ou, sans fin de ligne,
+# à la limite du morceau) pour borner la mémoire
+MAX_BLOCK_SIZE = 64 * 1024 * 1024
+# Au-delà de cette taille, document_property_parser passe en lecture par blocs
+STREAM_THRESHOLD = 256 * 1024 * 1024
+DEFAULT_RECORDS_DIR = os.getenv("DOCUMENT_RECORDS_DIR", os.path.join(os.path.dirname(__file__), "data", "records"))
+
+
+def scan_property_text(content: str) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Extrait attributs et équipements d'un texte en un seul passage.
+
+    Args:
+        content: Texte du document
+
+    Returns:
+        (champs extraits, lignes correspondantes dans l'ordre des attributs)
+    """
+    found: Dict[str, Tuple[str, str]] = {}
+    amenities = set()
+    lowered = content.lower()
+    if len(lowered) != len(content):
+        lowered = content.translate(ASCII_LOWER)
+
+    position = 0
+    while True:
+        keyword = KEYWORDS.search(lowered, position)
+        if keyword is None:
+            break
+        start = keyword.start()
+        key = KEYWORD_ATTRIBUTES[keyword.group()]
+        if key == "amenity":
+            match = AMENITY_REGEX.match(content, start)
+            if match:
+                amenities.add(match.group("amenity_value").lower())
+        elif key not in found:
+            match = ATTRIBUTE_REGEXES[key].match(content, start)
+            if match:
+                found[key] = (match.group(f"{key}_value"), match.group(0))
+        # Tout est trouvé: inutile de parcourir le reste du document
+        if len(found) == len(ATTRIBUTE_PATTERNS) and len(amenities) == len(AMENITIES):
+            break
+        # Position suivante (et non fin du mot-clé): aucun chevauchement n'est manqué
+        position = start + 1
+
+    extracted: Dict[str, Any] = {key: None for key in ATTRIBUTE_PATTERNS}
+    matched_lines: List[str] = []
+    for key in ATTRIBUTE_PATTERNS:
+        if key not in found:
+            continue
+        value, line = found[key]
+        matched_lines.append(line)
+        try:
+            extracted[key] = CONVERTERS[key](value)
+        except Exception:
+            extracted[key] = value
+    extracted["amenities"] = [amenity for amenity in AMENITIES if amenity in amenities]
+    return extracted, matched_lines
+
+
+def decode_text(data: bytes) -> str:
+    """Contenu brut -> texte, comme open(..., encoding="utf-8", errors="ignore") (fins de ligne universelles)."""
+    return data.decode("utf-8", errors="ignore").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def parse_property_content(file_path: str, content: str, doc_type: Optional[str] = None) -> Dict[str, Any]:
+    """Résultat de document_property_parser pour un texte déjà lu."""
+    extracted, matched_lines = scan_property_text(content)
+    return {
+        "file_path": file_path,
+        "doc_type": doc_type,
+        "extracted": extracted,
+        "matched_examples": matched_lines[:5],
+        "parsed_at": datetime.now().isoformat(),
+    }
+
+
+def parse_property_file(
+    file_path: str,
+    doc_type: Optional[str] = None,
+    manifest: Optional[DocumentManifest] = None,
+) -> Dict[str, Any]:
+    """
+    Lit un fichier texte et en extrait les attributs du bien.
+
+    Args:
+        file_path: Chemin vers un fichier texte lisible
+        doc_type: Type de document (listing, inspection, autre)
+        manifest: Manifeste servant le résultat précédent si le fichier n'a pas changé
+
+    Returns:
+        Dictionnaire des champs extraits + résumé des lignes correspondantes
+    """
+    try:
+        if manifest is not None:
+            result, cached = manifest.process(
+                file_path, PARSER_KIND, lambda data: parse_property_content(file_path, decode_text(data))
+            )
+            manifest.save()
+            return {**result, "file_path": file_path, "doc_type": doc_type, "cached": cached}
+        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
+            content = f.read()
+    except Exception as e:
+        return {"error": f"Lecture impossible: {str(e)}", "file_path": file_path, "doc_type": doc_type}
+    return parse_property_content(file_path, content, doc_type)
+
+
+def _parse_batch(batch: List[str], doc_type: Optional[str]) -> List[Tuple[Optional[str], Dict[str, Any]]]:
+    """(empreinte du contenu, résultat) par fichier; lecture et analyse dans le processus de travail."""
+    parsed = []
+    for path in batch:
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except Exception as e:
+            parsed.append((None, {"error": f"Lecture impossible: {str(e)}", "file_path": path, "doc_type": doc_type}))
+            continue
+        parsed.append((content_hash(data), parse_property_content(path, decode_text(data), doc_type)))
+    return parsed
+
+
+def list_documents(directory: str, extensions: Tuple[str, ...] = TEXT_EXTENSIONS) -> List[str]:
+    """Fichiers texte d'un dossier (récursif, ordre stable)."""
+    return [path for path, _ in scan_files(directory, extensions)]
+
+
+def parse_directory(
+    directory: str = DEFAULT_DOCUMENTS_DIR,
+    doc_type: Optional[str] = None,
+    max_workers: Optional[int] = None,
+    batch_size: int = 64,
+    manifest: Optional[DocumentManifest] = None,
+) -> Dict[str, Any]:
+    """
+    Parse tous les documents texte d'un dossier, par lots répartis sur un pool de processus.
+
+    Avec un manifeste, seuls les fichiers nouveaux ou modifiés sont lus et parsés;
+    les autres coûtent un stat (fait par le parcours du dossier).
+
+    Args:
+        directory: Dossier à parcourir
+        doc_type: Type de document appliqué à tous les fichiers
+        max_workers: Nombre de processus (défaut: nombre de CPU; 1 = séquentiel)
+        batch_size: Fichiers par tâche (amortit le coût d'envoi entre processus)
+        manifest: Manifeste des résultats précédents (mis à jour et sauvegardé)
+
+    Returns:
+        Dictionnaire avec un résultat par fichier (ordre de list_documents), et les nombres
+        de fichiers reparsés, servis depuis le manifeste et retirés du manifeste
+    """
+    files = scan_files(directory, TEXT_EXTENSIONS)
+    results: List[Optional[Dict[str, Any]]] = [None] * len(files)
+    stale = []
+    for position, (path, stat) in enumerate(files):
+        cached = manifest.get(path, PARSER_KIND, stat) if manifest is not None else None
+        if cached is not None:
+            results[position] = {**cached, "file_path": path, "doc_type": doc_type, "cached": True}
+        else:
+            stale.append(position)
+
+    paths = [files[position][0] for position in stale]
+    batches = [paths[start:start + batch_size] for start in range(0, len(paths), batch_size)]
+    workers = min(max_workers or os.cpu_count() or 1, len(batches))
+    if workers <= 1:
+        parsed = [item for batch in batches for item in _parse_batch(batch, doc_type)]
+    else:
+        # "spawn" plutôt que fork: l'outil peut être appelé depuis le serveur Streamlit multi-thread
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            parsed = [item for batch in executor.map(_parse_batch, batches, [doc_type] * len(batches)) for item in batch]
+
+    for position, (digest, result) in zip(stale, parsed):
+        path, stat = files[position]
+        if manifest is not None and digest is not None:
+            result = {**manifest.put(path, PARSER_KIND, stat, digest, result), "doc_type": doc_type}
+        results[position] = {**result, "cached": False} if manifest is not None else result
+
+    removed = 0
+    if manifest is not None:
+        removed = manifest.prune(directory, [path for path, _ in files])
+        manifest.save()
+    return {"results": results, "reparsed": len(stale), "cached": len(files) - len(stale), "removed": removed}
+
+
+def iter_listing_blocks(
+    file_path: str,
+    block_start: bytes = LISTING_BLOCK_START,
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    max_block_size: int = MAX_BLOCK_SIZE,
+    hasher: Optional[Any] = None,
+) -> Iterator[Tuple[int, bytes]]:
+    """
+    Découpe un fichier en blocs d'annonce, lu par morceaux de taille fixe.
+
+    Seul le bloc en cours est conservé entre deux morceaux: un bloc (et donc tout motif
+    d'attribut qu'il contient) n'est jamais coupé par une limite de morceau, et la mémoire
+    reste bornée par chunk_size + max_block_size quelle que soit la taille du fichier.
+
+    Args:
+        file_path: Chemin du fichier
+        block_start: Motif (bytes, ancré en début de ligne) de la première ligne d'un bloc
+        chunk_size: Taille des lectures
+        max_block_size: Taille au-delà de laquelle un bloc est coupé à la dernière fin de ligne
+            (ou à la limite du morceau s'il n'y en a pas)
+        hasher: Objet hashlib mis à jour avec chaque morceau lu (empreinte sans seconde lecture)
+
+    Returns:
+        Itérateur de (position du bloc dans le fichier en octets, contenu brut du bloc)
+    """
+    pattern = re.compile(block_start, re.MULTILINE | re.IGNORECASE)
+    buffer = b""
+    offset = 0  # position dans le fichier du début du tampon (un début de ligne, sauf coupe forcée)
+    searched = 0  # début de la première ligne du tampon pas encore examinée
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if hasher is not None:
+                hasher.update(chunk)
+            buffer += chunk
+            # Seules les lignes complètes sont examinées: une ligne coupée par la fin du morceau
+            # le sera avec le morceau suivant
+            end = len(buffer) if not chunk else max(buffer.rfind(b"\n") + 1, searched)
+            start = 0
+            for match in pattern.finditer(buffer, searched, end):
+                # Le tampon commence par la première ligne du bloc en cours
+                if match.start() > start:
+                    yield offset + start, buffer[start:match.start()]
+                    start = match.start()
+            if not chunk:
+                if buffer[start:].strip():
+                    yield offset + start, buffer[start:]
+                return
+            if len(buffer) - start > max_block_size:
+                # Coupé à la dernière fin de ligne (\n, ou \r seul d'un export Mac), à défaut à la
+                # limite du morceau (fichier sans fin de ligne): le tampon reste borné dans tous les cas
+                cut = max(buffer.rfind(b"\n", start), buffer.rfind(b"\r", start)) + 1
+                cut = cut if cut > start else len(buffer)
+                yield offset + start, buffer[start:cut]
+                start = cut
+            buffer = buffer[start:]
+            offset += start
+            searched = max(end - start, 0)
+
+
+def stream_property_records(
+    file_path: str,
+    block_start: bytes = LISTING_BLOCK_START,
+    hasher: Optional[Any] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Un enregistrement par bloc d'annonce non vide d'un export texte, sans charger le fichier.
+
+    Args:
+        file_path: Chemin du fichier
+        block_start: Motif de la première ligne d'un bloc (voir iter_listing_blocks)
+        hasher: Objet hashlib mis à jour avec le contenu lu
+
+    Returns:
+        Itérateur d'enregistrements (numéro de bloc, position, taille, champs extraits)
+    """
+    number = 0
+    for offset, data in iter_listing_blocks(file_path, block_start, hasher=hasher):
+        if not data.strip():
+            continue
+        extracted, matched_lines = scan_property_text(decode_text(data))
+        yield {
+            "block": number,
+            "offset": offset,
+            "length": len(data),
+            "extracted": extracted,
+            "matched_examples": matched_lines[:3],
+        }
+        number += 1
+
+
+def parse_property_stream(
+    file_path: str,
+    doc_type: Optional[str] = None,
+    output_path: Optional[str] = None,
+    block_start: bytes = LISTING_BLOCK_START,
+    manifest: Optional[DocumentManifest] = None,
+    preview: int = 5,
+) -> Dict[str, Any]:
+    """
+    Parse un gros export texte bloc par bloc et écrit un enregistrement JSON par annonce.
+
+    Les blocs sans aucun attribut reconnu (en-têtes, notes) sont comptés mais non écrits.
+
+    Args:
+        file_path: Chemin de l'export
+        doc_type: Type de document
+        output_path: Fichier JSONL des enregistrements (défaut: DEFAULT_RECORDS_DIR/<nom>.records.jsonl)
+        block_start: Motif de la première ligne d'un bloc
+        manifest: Manifeste servant le résumé précédent si l'export et la sortie n'ont pas changé
+        preview: Nombre d'enregistrements recopiés dans le résumé
+
+    Returns:
+        Résumé: nombre de blocs et d'enregistrements, couverture par attribut, aperçu et chemin de sortie
+    """
+    if output_path is None:
+        output_path = os.path.join(DEFAULT_RECORDS_DIR, os.path.basename(file_path) + ".records.jsonl")
+    # Le résultat dépend du découpage et de l'emplacement de sortie
+    fingerprint = content_hash(block_start + b"\0" + os.path.abspath(output_path).encode())
+    kind = f"{STREAM_KIND}:{fingerprint[:16]}"
+    try:
+        stat = os.stat(file_path)
+        cached = manifest.get(file_path, kind, stat) if manifest is not None else None
+        if cached is not None and os.path.exists(output_path):
+            return {**cached, "file_path": file_path, "doc_type": doc_type, "cached": True}
+
+        hasher = hashlib.sha256()
+        blocks = records = 0
+        field_counts = {key: 0 for key in list(ATTRIBUTE_PATTERNS) + ["amenities"]}
+        examples = []
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        with open(output_path, "w", encoding="utf-8") as out:
+            for record in stream_property_records(file_path, block_start, hasher):
+                blocks += 1
+                extracted = record["extracted"]
+                present = [key for key, value in extracted.items() if value]
+                if not present:
+                    continue
+                for key in present:
+                    field_counts[key] += 1
+                record["record"] = records
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                if len(examples) < preview:
+                    examples.append(record)
+                records += 1
+    except Exception as e:
+        return {"error": f"Lecture impossible: {str(e)}", "file_path": file_path, "doc_type": doc_type}
+
+    result = {
+        "file_path": file_path,
+        "doc_type": doc_type,
+        "mode": "stream",
+        "bytes": stat.st_size,
+        "blocks": blocks,
+        "records": records,
+        "empty_blocks": blocks - records,
+        "field_counts": field_counts,
+        "preview": examples,
+        "output_path": output_path,
+        "parsed_at": datetime.now().isoformat(),
+    }
+    if manifest is not None:
+        result = manifest.put(file_path, kind, stat, hasher.hexdigest(), result)
+        manifest.save()
+        result = {**result, "doc_type": doc_type, "cached": False}
+    return result
@@ -0,0 +1,229 @@
+from typing import Dict, Any, List, Optional
+import re
+
+
+# Titres de section (préfixe, insensible à la casse) -> clé du résultat
+SECTIONS = {
+    "subject property": "subject",
+    "market context": "market_context",
+    "comparable sales": "comparable_sales",
+    "source metadata": "source_metadata",
+}
+# Types de traitement dans le manifeste des documents (à incrémenter si l'extraction change)
+SECTIONS_KIND = "property_sections:v1"
+KB_CHUNKS_KIND = "kb_chunks:v1"
+ANY_HEADING = re.compile(r"^#{1,6}\s+(.+?)\s*$", re.MULTILINE)
+HEADING = re.compile(r"^#{2,3}\s+(.+?)\s*$", re.MULTILINE)
+BULLET = re.compile(r"^\s*[-*]\s+([^:]+?)\s*:\s*(.+?)\s*$", re.MULTILINE)
+NUMBERED = re.compile(r"^\s*\d+[.)]\s+(.+?)\s*$", re.MULTILINE)
+# Champs d'une ligne de comparable, séparés par des tirets cadratins (ou demi-cadratins / --)
+SEPARATOR = re.compile(r"\s+(?:—|–|--)\s+")
+CONDITIONS = ("Excellent", "Good", "Fair", "Poor")
+
+COMP_FIELDS = [
+    ("sqft", re.compile(r"^([\d,]+)\s*(?:sq\.?\s*ft|sqft)$", re.IGNORECASE), lambda m: int(m.group(1).replace(",", ""))),
+    ("rooms", re.compile(r"^(\d+(?:\.\d+)?)\s*bd\s*/\s*(\d+(?:\.\d+)?)\s*ba$", re.IGNORECASE), None),
+    ("lot_size", re.compile(r"^lot\s+(\d+(?:\.\d+)?)\s*(?:ac|acres?)?$", re.IGNORECASE), lambda m: float(m.group(1))),
+    ("year_built", re.compile(r"^(1[89]\d{2}|20\d{2})$"), lambda m: int(m.group(1))),
+    ("sale_price", re.compile(r"^\$\s*([\d,]+(?:\.\d+)?)$"), lambda m: int(float(m.group(1).replace(",", "")))),
+    ("sale_date", re.compile(r"^(\d{4}-\d{2}-\d{2})$"), lambda m: m.group(1)),
+    ("days_on_market", re.compile(r"^DOM\s+(\d+)$", re.IGNORECASE), lambda m: int(m.group(1))),
+    ("price_per_sqft", re.compile(r"^ppsf\s+\$?([\d,]+(?:\.\d+)?)$", re.IGNORECASE), lambda m: float(m.group(1).replace(",", ""))),
+]
+
+# Libellés de "Market Context" -> clés de market_signals (market_monitor)
+MARKET_CONTEXT_KEYS = {
+    "inventory": "inventory_levels",
+    "days on market": "days_on_market",
+    "absorption rate": "absorption_rate",
+    "price reductions": "price_reductions",
+    "new listings": "new_listings",
+    "pending sales": "pending_sales",
+}
+# Libellés de "Subject Property" -> arguments de avm_engine
+SUBJECT_KEYS = {
+    "address": "property_address",
+    "property type": "property_type",
+    "living area": "property_sqft",
+    "sqft": "property_sqft",
+    "bedrooms": "bedrooms",
+    "bathrooms": "bathrooms",
+    "lot size": "lot_size",
+    "year built": "year_built",
+    "condition": "condition",
+    "amenities": "amenities",
+}
+# Arguments obligatoires de avm_engine décrivant le bien
+AVM_SUBJECT_FIELDS = ["property_address", "property_sqft", "bedrooms", "bathrooms", "lot_size", "year_built", "condition"]
+NUMBER = re.compile(r"-?\d[\d,]*(?:\.\d+)?")
+
+
+def _number(text: str) -> Optional[float]:
+    match = NUMBER.search(text)
+    return float(match.group().replace(",", "")) if match else None
+
+
+def _label_key(label: str, keys: Dict[str, str]) -> Optional[str]:
+    label = label.lower()
+    for prefix, key in keys.items():
+        if label.startswith(prefix):
+            return key
+    return None
+
+
+def split_sections(content: str) -> Dict[str, str]:
+    """Corps des sections connues (## titre), indexés par clé de SECTIONS."""
+    headings = list(HEADING.finditer(content))
+    sections = {}
+    for i, heading in enumerate(headings):
+        key = _label_key(heading.group(1), SECTIONS)
+        if key and key not in sections:
+            end = headings[i + 1].start() if i + 1 < len(headings) else len(content)
+            sections[key] = content[heading.end():end]
+    return sections
+
+
+def markdown_chunks(content: str) -> List[Dict[str, Any]]:
+    """Découpage par titres markdown: titre et bornes (caractères) de chaque section non vide."""
+    headings = list(ANY_HEADING.finditer(content))
+    bounds = [(None, 0)] + [(heading.group(1), heading.start()) for heading in headings]
+    chunks = []
+    for i, (title, start) in enumerate(bounds):
+        end = bounds[i + 1][1] if i + 1 < len(bounds) else len(content)
+        if content[start:end].strip():
+            chunks.append({"title": title, "start": start, "end": end})
+    return chunks
+
+
+def property_type_of(description: Optional[str]) -> str:
+    """Type au sens des outils (residential/commercial/land) d'un libellé libre."""
+    text = (description or "").lower()
+    if "land" in text or "lot only" in text:
+        return "land"
+    if any(word in text for word in ("commercial", "retail", "office", "industrial")):
+        return "commercial"
+    return "residential"
+
+
+def parse_comparable_line(line: str, property_type: str = "residential") -> Optional[Dict[str, Any]]:
+    """
+    Une ligne "adresse — 2,000 sqft — 3bd/2ba — Lot 0.17 ac — 2011 — Good — $435,000 — 2024-02-10 — DOM 31 — ppsf 217.5".
+
+    Chaque champ est reconnu par sa forme (l'ordre et les champs absents, ex. lot d'un condo, sont tolérés).
+
+    Returns:
+        Enregistrement au format des comparables de avm_engine/comps_analyzer, ou None sans prix de vente
+    """
+    parts = SEPARATOR.split(line.strip())
+    comp: Dict[str, Any] = {"address": parts[0].strip()}
+    seen = set()
+    unparsed = []
+    for part in parts[1:]:
+        part = part.strip()
+        if part in CONDITIONS:
+            comp["condition"] = part
+            continue
+        for name, pattern, convert in COMP_FIELDS:
+            match = pattern.match(part)
+            if match and name not in seen:
+                seen.add(name)
+                if name == "rooms":
+                    comp["bedrooms"] = int(float(match.group(1)))
+                    comp["bathrooms"] = float(match.group(2))
+                else:
+                    comp[name] = convert(match)
+                break
+        else:
+            unparsed.append(part)
+    if "sale_price" not in comp:
+        return None
+    if "price_per_sqft" not in comp and comp.get("sqft"):
+        comp["price_per_sqft"] = round(comp["sale_price"] / comp["sqft"], 2)
+    comp.setdefault("property_type", property_type)
+    if unparsed:
+        comp["unparsed"] = unparsed
+    return comp
+
+
+def parse_market_context(body: str) -> Dict[str, Any]:
+    """Puces "- Libellé: valeur" -> signaux au format market_signals (valeurs numériques converties)."""
+    context: Dict[str, Any] = {}
+    for label, value in BULLET.findall(body):
+        key = _label_key(label, MARKET_CONTEXT_KEYS)
+        if key is None:
+            context[re.sub(r"\W+", "_", label.lower()).strip("_")] = value
+        elif key == "inventory_levels":
+            context[key] = value
+        else:
+            number = _number(value)
+            context[key] = int(number) if number is not None and key != "absorption_rate" else number
+    return context
+
+
+def parse_source_metadata(body: str) -> Dict[str, Any]:
+    """Date de collecte, liste des sources, filtres (rayon en miles et fenêtre en mois si présents)."""
+    metadata: Dict[str, Any] = {}
+    for label, value in BULLET.findall(body):
+        label = label.lower()
+        if label.startswith("collected"):
+            date = re.search(r"\d{4}-\d{2}-\d{2}", value)
+            metadata["collected"] = date.group() if date else value
+        elif label.startswith("source"):
+            metadata["sources"] = [source.strip() for source in value.split(",") if source.strip()]
+        elif label.startswith("filter"):
+            metadata["filters"] = [item.strip() for item in value.split(";") if item.strip()]
+            radius = re.search(r"radius\s*[≤<=]*\s*(\d+(?:\.\d+)?)\s*mi", value, re.IGNORECASE)
+            months = re.search(r"within\s+(\d+)\s+months", value, re.IGNORECASE)
+            if radius:
+                metadata["radius_miles"] = float(radius.group(1))
+            if months:
+                metadata["within_months"] = int(months.group(1))
+        else:
+            metadata[re.sub(r"\W+", "_", label).strip("_")] = value
+    return metadata
+
+
+def parse_subject(body: str) -> Dict[str, Any]:
+    """Puces du bien -> arguments de avm_engine (property_address, property_sqft, bedrooms, ...)."""
+    subject: Dict[str, Any] = {}
+    for label, value in BULLET.findall(body):
+        key = _label_key(label, SUBJECT_KEYS)
+        if key is None or key in subject:
+            continue
+        if key in ("property_address", "condition"):
+            subject[key] = value
+        elif key == "property_type":
+            subject[key] = property_type_of(value)
+            subject["property_type_label"] = value
+        elif key == "amenities":
+            subject[key] = [item.strip() for item in value.split(",") if item.strip()]
+        else:
+            number = _number(value)
+            if number is not None:
+                subject[key] = int(number) if key in ("property_sqft", "bedrooms", "year_built") else number
+    return subject
+
+
+def parse_property_sections(content: str) -> Dict[str, Any]:
+    """
+    Extraction déterministe des sections structurées d'un document de bien.
+
+    Args:
+        content: Texte markdown (## Subject Property, ## Market Context, ## Comparable Sales, ## Source Metadata)
+
+    Returns:
+        Dictionnaire subject / comparable_sales / market_context / source_metadata (sections absentes omises)
+    """
+    sections = split_sections(content)
+    result: Dict[str, Any] = {}
+    if "subject" in sections:
+        result["subject"] = parse_subject(sections["subject"])
+    property_type = result.get("subject", {}).get("property_type", "residential")
+    if "comparable_sales" in sections:
+        comps = [parse_comparable_line(line, property_type) for line in NUMBERED.findall(sections["comparable_sales"])]
+        result["comparable_sales"] = [comp for comp in comps if comp is not None]
+    if "market_context" in sections:
+        result["market_context"] = parse_market_context(sections["market_context"])
+    if "source_metadata" in sections:
+        result["source_metadata"] = parse_source_metadata(sections["source_metadata"])
+    return result
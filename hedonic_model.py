@@ -0,0 +1,218 @@
+from typing import Dict, Any, List, Optional, Tuple, Hashable, Union
+import hashlib
+import numpy as np
+from datetime import datetime
+
+try:
+    from .comps_store import ComparablesStore, as_comps_store
+except ImportError:
+    from comps_store import ComparablesStore, as_comps_store
+
+CompsInput = Union[ComparablesStore, List[Dict[str, Any]]]
+
+
+FEATURE_NAMES = ["sqft", "bedrooms", "bathrooms", "lot_size", "age"]
+
+# Former hard-coded avm_engine coefficients, now used as the ridge prior
+PRIOR_COEFFICIENTS = [150, 5000, 10000, 20000, -500]  # [sqft, bedrooms, bathrooms, lot_size, age]
+PRIOR_INTERCEPT = 50000
+
+
+def training_data(comps: ComparablesStore, current_year: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Design matrix [1, sqft, bedrooms, bathrooms, lot_size, age] and prices of the
+    comps that have a sale price (missing features count as 0, as in avm_engine).
+    """
+    sale_prices = comps.filled("sale_price")
+    valid = sale_prices != 0
+    features = np.column_stack([
+        np.ones(int(valid.sum())),
+        comps.filled("sqft")[valid],
+        comps.filled("bedrooms")[valid],
+        comps.filled("bathrooms")[valid],
+        comps.filled("lot_size")[valid],
+        current_year - comps.filled("year_built", current_year)[valid],
+    ])
+    return features, sale_prices[valid]
+
+
+def update_digest(digest: Any, features: np.ndarray, prices: np.ndarray) -> Any:
+    """
+    Feed training rows to a content hash, row by row ([x, y] as little-endian float64).
+
+    Hashing sales A then B gives the digest of A followed by B, so a segment grown
+    with add_sales matches a later get() on the appended comps set.
+    """
+    rows = np.column_stack([features, prices]).astype("<f8", copy=False)
+    digest.update(np.ascontiguousarray(rows).tobytes())
+    return digest
+
+
+class HedonicSegmentModel:
+    """
+    Least-squares hedonic regression for one market segment, kept as sufficient
+    statistics (X'X, X'y) so new sales are added without a full refit.
+    """
+
+    def __init__(self, current_year: int, prior_strength: float = 3.0):
+        self.current_year = current_year
+        self.prior_strength = prior_strength
+        self.xtx = np.zeros((6, 6))
+        self.xty = np.zeros(6)
+        self.n = 0
+        # Content hash of the rows the statistics were built from
+        self.digest = hashlib.blake2b(digest_size=16)
+        self.coefficients: List[float] = list(PRIOR_COEFFICIENTS)
+        self.intercept: float = float(PRIOR_INTERCEPT)
+
+    def fit(self, comparable_sales: CompsInput) -> None:
+        """
+        Refit the segment on exactly this set of sales (two matrix products and a 6x6 solve).
+
+        Args:
+            comparable_sales: Full comparable set the segment should be fitted on
+        """
+        features, prices = training_data(as_comps_store(comparable_sales), self.current_year)
+        self.xtx = features.T @ features
+        self.xty = features.T @ prices
+        self.n = len(prices)
+        self.digest = update_digest(hashlib.blake2b(digest_size=16), features, prices)
+        self._solve()
+
+    def add_sales(self, new_sales: CompsInput) -> None:
+        """
+        Add newly closed sales to the segment (O(new sales) update, then a 6x6 solve).
+
+        Args:
+            new_sales: Sales not yet included in the segment
+        """
+        features, prices = training_data(as_comps_store(new_sales), self.current_year)
+        self.xtx += features.T @ features
+        self.xty += features.T @ prices
+        self.n += len(prices)
+        update_digest(self.digest, features, prices)
+        self._solve()
+
+    def _solve(self) -> None:
+        # Ridge towards the prior coefficients, scaled to the data so that
+        # prior_strength acts like that many pseudo-observations per feature
+        if self.n <= 0:
+            self.coefficients = list(PRIOR_COEFFICIENTS)
+            self.intercept = float(PRIOR_INTERCEPT)
+            return
+        prior = np.array([PRIOR_INTERCEPT] + PRIOR_COEFFICIENTS, dtype=float)
+        penalty = np.zeros(6)
+        penalty[1:] = self.prior_strength * np.maximum(np.diag(self.xtx)[1:] / self.n, 1e-9)
+        a = self.xtx + np.diag(penalty)
+        b = self.xty + penalty * prior
+        beta = np.linalg.lstsq(a, b, rcond=None)[0]
+        if not np.all(np.isfinite(beta)):
+            beta = prior
+        self.intercept = float(beta[0])
+        self.coefficients = [float(value) for value in beta[1:]]
+
+    def fingerprint(self) -> str:
+        return self.digest.hexdigest()
+
+    def summary(self, segment_key: Optional[Hashable] = None) -> Dict[str, Any]:
+        return {
+            "coefficients": self.coefficients,
+            "intercept": self.intercept,
+            "features": FEATURE_NAMES,
+            "sample_size": self.n,
+            "segment": segment_key,
+        }
+
+
+class HedonicRegressionCache:
+    """
+    Fitted hedonic regressions cached by (segment key, comps identity).
+
+    A store opened from disk is identified by its published version, so a repeat
+    valuation is a dictionary lookup; other comps sets by a hash of their training
+    rows (one pass over the arrays, no per-row Python objects).
+    """
+
+    def __init__(self, prior_strength: float = 3.0, max_entries: int = 1024):
+        self.prior_strength = prior_strength
+        self.max_entries = max_entries
+        self.segments: Dict[Tuple[Hashable, int], HedonicSegmentModel] = {}
+        self.fitted: Dict[Tuple, Dict[str, Any]] = {}
+
+    def _segment(self, segment_key: Optional[Hashable], current_year: int) -> HedonicSegmentModel:
+        model = self.segments.get((segment_key, current_year))
+        if model is None:
+            model = HedonicSegmentModel(current_year, self.prior_strength)
+            self.segments[(segment_key, current_year)] = model
+        return model
+
+    def _remember(self, cache_key: Tuple, result: Dict[str, Any]) -> None:
+        if len(self.fitted) >= self.max_entries:
+            self.fitted.pop(next(iter(self.fitted)))
+        self.fitted[cache_key] = result
+
+    def get(
+        self,
+        comparable_sales: CompsInput,
+        segment_key: Optional[Hashable] = None,
+        current_year: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Return fitted coefficients for a comparable set (fitting if needed).
+
+        Args:
+            comparable_sales: Comparable sales to fit on
+            segment_key: Market segment (e.g. zip + property type); None keys on the comps only
+            current_year: Year used to compute ages (defaults to the current year)
+
+        Returns:
+            Dictionary with coefficients, intercept, feature names and sample size
+        """
+        current_year = current_year or datetime.now().year
+        comps = as_comps_store(comparable_sales)
+        version_key = comps.version_key
+        if version_key is not None:
+            cache_key = (segment_key, current_year, "version", version_key)
+        else:
+            features, prices = training_data(comps, current_year)
+            digest = update_digest(hashlib.blake2b(digest_size=16), features, prices)
+            cache_key = (segment_key, current_year, "rows", digest.hexdigest())
+        cached = self.fitted.get(cache_key)
+        if cached is not None:
+            return cached
+
+        model = self._segment(segment_key, current_year)
+        model.fit(comps)
+        result = model.summary(segment_key)
+        self._remember(cache_key, result)
+        return result
+
+    def add_sales(
+        self,
+        segment_key: Hashable,
+        new_sales: CompsInput,
+        current_year: Optional[int] = None,
+    ) -> Dict[str, Any]:
+        """
+        Ingest new sales into a segment and cache the refreshed fit.
+
+        Args:
+            segment_key: Market segment receiving the sales
+            new_sales: Newly closed sales
+            current_year: Year used to compute ages (defaults to the current year)
+
+        Returns:
+            Dictionary with the refreshed coefficients and intercept
+        """
+        current_year = current_year or datetime.now().year
+        model = self._segment(segment_key, current_year)
+        model.add_sales(new_sales)
+
+        result = model.summary(segment_key)
+        # Same key as get() on the previous comps with the new sales appended
+        self._remember((segment_key, current_year, "rows", model.fingerprint()), result)
+        return result
+
+
+# Process-wide cache shared by avm_engine and avm_engine_batch
+hedonic_cache = HedonicRegressionCache()
@@ -0,0 +1,245 @@
+from typing import Dict, Any, List, Optional
+from datetime import date
+import json
+import os
+import threading
+import numpy as np
+
+
+DEFAULT_EVENT_LOG_PATH = os.getenv(
+    "LISTING_EVENTS_PATH", os.path.join(os.path.dirname(__file__), "data", "listing_events.jsonl")
+)
+EVENT_TYPES = ["listed", "price_cut", "pending", "sold"]
+# Window fields: one count per event type, then the days on market summed over sales
+FIELDS = EVENT_TYPES + ["dom_sum"]
+SHORT_WINDOW = 30
+LONG_WINDOW = 90
+
+
+def _day(value: str) -> int:
+    return date.fromisoformat(value[:10]).toordinal()
+
+
+class SlidingWindow:
+    """
+    Per-day totals over the last `days` days in a ring of daily bins.
+
+    Adding an event is O(1); moving the window forward clears the bins of the
+    days that fall out, so each day is cleared once (amortized O(1)).
+    """
+
+    def __init__(self, days: int):
+        self.days = days
+        self.bins = np.zeros((days, len(FIELDS)))
+        self.totals = np.zeros(len(FIELDS))
+        self.head: Optional[int] = None  # latest day covered
+
+    def advance(self, day: int) -> None:
+        """Move the window end to `day` (no-op for earlier days)."""
+        if self.head is None:
+            self.head = day
+            return
+        if day <= self.head:
+            return
+        if day - self.head >= self.days:
+            self.bins[:] = 0
+            self.totals[:] = 0
+        else:
+            for expired in range(self.head + 1, day + 1):
+                slot = expired % self.days
+                self.totals -= self.bins[slot]
+                self.bins[slot] = 0
+        self.head = day
+
+    def add(self, day: int, values: np.ndarray) -> None:
+        """Add an event's values on `day`; events older than the window are dropped."""
+        self.advance(day)
+        if day <= self.head - self.days:
+            return
+        self.bins[day % self.days] += values
+        self.totals += values
+
+
+class LocationSignals:
+    """Sliding windows and active listings of one location."""
+
+    def __init__(self):
+        self.short = SlidingWindow(SHORT_WINDOW)
+        self.long = SlidingWindow(LONG_WINDOW)
+        self.listed: Dict[str, int] = {}  # listing id -> listing day, until sold
+        self.pending: set = set()  # listed ids under contract (not active inventory)
+
+    @property
+    def active(self) -> int:
+        return len(self.listed) - len(self.pending)
+
+    def add(self, day: int, event: str, listing_id: Optional[str], days_on_market: Optional[float]) -> None:
+        values = np.zeros(len(FIELDS))
+        values[EVENT_TYPES.index(event)] = 1
+        if listing_id is not None:
+            if event == "listed":
+                self.listed[listing_id] = day
+                self.pending.discard(listing_id)
+            elif event == "pending" and listing_id in self.listed:
+                self.pending.add(listing_id)
+            elif event == "sold":
+                listed_day = self.listed.pop(listing_id, None)
+                self.pending.discard(listing_id)
+                if days_on_market is None and listed_day is not None:
+                    days_on_market = day - listed_day
+        if event == "sold":
+            values[FIELDS.index("dom_sum")] = days_on_market or 0
+        self.short.add(day, values)
+        self.long.add(day, values)
+
+
+class ListingEventAggregator:
+    """
+    Market signals per location from an append-only JSON-lines log of listing events.
+
+    Each line is {"date", "location", "event", "listing_id"[, "days_on_market", "price"]}
+    with event in listed / price_cut / pending / sold. refresh() only reads the
+    bytes appended since the previous call, so serving signals never re-reads
+    the event history.
+    """
+
+    def __init__(self, path: str = DEFAULT_EVENT_LOG_PATH):
+        self.path = path
+        # Shared by concurrent tool calls: reading from offset, applying and advancing is one step
+        self.lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self.offset = 0
+        self.latest_day: Optional[int] = None
+        self.locations: Dict[str, LocationSignals] = {}
+        self.skipped = 0
+
+    @staticmethod
+    def key(location: str) -> str:
+        return str(location).strip().lower()
+
+    def add_event(self, event: Dict[str, Any]) -> bool:
+        """
+        Apply one event to its location windows (O(1)).
+
+        Returns:
+            False (and counted in skipped) when the event is malformed: unknown type,
+            missing location, or a date / days_on_market that cannot be parsed
+        """
+        try:
+            if event.get("event") not in EVENT_TYPES or not event.get("location") or not event.get("date"):
+                raise ValueError("incomplete event")
+            day = _day(event["date"])
+            days_on_market = event.get("days_on_market")
+            days_on_market = None if days_on_market is None else float(days_on_market)
+        except (AttributeError, TypeError, ValueError):
+            self.skipped += 1
+            return False
+        key = self.key(event["location"])
+        signals = self.locations.get(key)
+        if signals is None:
+            signals = LocationSignals()
+            self.locations[key] = signals
+        listing_id = event.get("listing_id")
+        signals.add(day, event["event"], None if listing_id is None else str(listing_id), days_on_market)
+        self.latest_day = day if self.latest_day is None else max(self.latest_day, day)
+        return True
+
+    def refresh(self) -> int:
+        """
+        Consume the events appended to the log since the last refresh.
+
+        Malformed lines are counted in skipped; the read offset advances line by
+        line under the instance lock, so no event is ever applied twice.
+
+        Returns:
+            Number of events applied
+        """
+        with self.lock:
+            return self._refresh()
+
+    def _refresh(self) -> int:
+        if not os.path.exists(self.path):
+            return 0
+        size = os.path.getsize(self.path)
+        if size < self.offset:
+            # Log replaced or truncated: start over
+            self._reset()
+        if size == self.offset:
+            return 0
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            chunk = f.read(size - self.offset)
+        # A partially written last line is read on the next refresh
+        end = chunk.rfind(b"\n") + 1
+        count = 0
+        for line in chunk[:end].splitlines(keepends=True):
+            self.offset += len(line)
+            if not line.strip():
+                continue
+            try:
+                event = json.loads(line)
+            except ValueError:
+                self.skipped += 1
+                continue
+            if isinstance(event, dict) and self.add_event(event):
+                count += 1
+            elif not isinstance(event, dict):
+                self.skipped += 1
+        return count
+
+    def signals(self, location: str, as_of: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Current market signals of a location, shaped like market_monitor's market_signals.
+
+        Args:
+            location: Location as written in the event log (case-insensitive)
+            as_of: Window end date (defaults to the latest event date in the log)
+
+        Returns:
+            Signals dictionary, or None when the log has no events for the location
+        """
+        with self.lock:
+            self._refresh()
+            signals = self.locations.get(self.key(location))
+            if signals is None:
+                return None
+            day = _day(as_of) if as_of else self.latest_day
+            signals.short.advance(day)
+            signals.long.advance(day)
+            short = dict(zip(FIELDS, signals.short.totals.tolist()))
+            long = dict(zip(FIELDS, signals.long.totals.tolist()))
+            active = signals.active
+
+        # Months of supply: active listings over the monthly sales pace of the long window
+        monthly_sales = long["sold"] / (LONG_WINDOW / 30)
+        months_of_supply = active / monthly_sales if monthly_sales else None
+        if months_of_supply is None:
+            inventory_level = "High" if active else "Low"
+        else:
+            inventory_level = "Low" if months_of_supply < 3 else "Medium" if months_of_supply < 6 else "High"
+
+        return {
+            "inventory_levels": inventory_level,
+            "days_on_market": round(long["dom_sum"] / long["sold"]) if long["sold"] else None,
+            "price_reductions": int(short["price_cut"]),
+            "new_listings": int(short["listed"]),
+            "pending_sales": int(short["pending"]),
+            "absorption_rate": round(short["pending"] / short["listed"], 2) if short["listed"] else None,
+            "active_listings": active,
+            "months_of_supply": round(months_of_supply, 1) if months_of_supply is not None else None,
+            "sold_last_90_days": int(long["sold"]),
+            "as_of": date.fromordinal(day).isoformat(),
+        }
+
+
+def append_events(events: List[Dict[str, Any]], path: str = DEFAULT_EVENT_LOG_PATH) -> None:
+    """Append events to the log (one JSON line each, single write)."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "a") as f:
+        f.write("".join(json.dumps(event) + "\n" for event in events))
+
+
+# Process-wide aggregator over the default log, used by market_monitor
+listing_signals = ListingEventAggregator()
@@ -10,6 +10,9 @@ except ImportError as e:
     st.error(f"Erreur lors de l'import de module2: {e}")
     st.stop()
 
+from document_extraction import EXTRACTABLE_EXTENSIONS, get_extraction_pipeline
+from document_manifest import content_hash
+
 # -------------------------------
 # Config Streamlit
 # -------------------------------
@@ -42,6 +45,9 @@ st.markdown(
 # -------------------------------
 if "chat_history" not in st.session_state:
     st.session_state.chat_history = []
+# Fichiers déjà enregistrés (nom:empreinte) -> clé du travail d'extraction (None pour txt/csv)
+if "uploads" not in st.session_state:
+    st.session_state.uploads = {}
 
 # -------------------------------
 # UI
@@ -136,11 +142,65 @@ if st.button("Envoyer"):
 # Upload fichiers
 # -------------------------------
 st.subheader("Upload documents (optionnel)")
-uploaded_file = st.file_uploader("Choisir un fichier", type=["pdf", "docx", "txt", "csv"])
-if uploaded_file:
-    documents_dir = os.path.join("documents2")
+uploaded_files = st.file_uploader(
+    "Choisir des fichiers", type=["pdf", "docx", "txt", "csv"], accept_multiple_files=True
+)
+documents_dir = os.path.join("documents2")
+pipeline = get_extraction_pipeline()
+for uploaded_file in uploaded_files or []:
+    data = bytes(uploaded_file.getbuffer())
+    digest = content_hash(data)
+    upload_id = f"{uploaded_file.name}:{digest}"
+    # Chaque interaction relance le script: un fichier déjà traité n'est ni réécrit ni resoumis
+    if upload_id in st.session_state.uploads:
+        continue
     os.makedirs(documents_dir, exist_ok=True)
     filepath = os.path.join(documents_dir, uploaded_file.name)
     with open(filepath, "wb") as f:
-        f.write(uploaded_file.getbuffer())
+        f.write(data)
     st.success(f"Fichier enregistré : {filepath}")
+    # PDF/DOCX: texte normalisé et attributs extraits en arrière-plan (le script ne bloque pas)
+    job_key = None
+    if uploaded_file.name.lower().endswith(EXTRACTABLE_EXTENSIONS):
+        job_key = pipeline.submit(filepath, digest)
+    st.session_state.uploads[upload_id] = job_key
+
+
+def show_extraction_progress(job_keys, polling):
+    """
+    État des extractions de la session; relu périodiquement tant que des travaux sont en cours.
+    """
+    done, total = pipeline.progress(job_keys)
+    st.progress(done / total if total else 1.0, text=f"Extraction des documents : {done}/{total}")
+    labels = {"pending": "⏳ en attente", "running": "⚙️ en cours", "done": "✅ terminé", "error": "❌ erreur"}
+    for status in pipeline.status(job_keys):
+        st.markdown(f"**{status['name']}** — {labels[status['state']]}")
+        if status["state"] == "error":
+            st.error(status["error"])
+        elif status["state"] == "done":
+            result = status["result"]
+            for warning in result["warnings"]:
+                st.warning(warning)
+            with st.expander(f"Attributs extraits — {status['name']}"):
+                st.caption(f"Texte normalisé : {result['file_path']}")
+                st.json({
+                    "extracted": result["extracted"],
+                    "sections": result["sections"],
+                    "comparable_count": result["comparable_count"],
+                })
+    # Tout est terminé: un rerun complet arrête le rafraîchissement périodique
+    if polling and done == total:
+        st.rerun()
+
+
+job_keys = [key for key in st.session_state.uploads.values() if key is not None]
+if job_keys:
+    done, total = pipeline.progress(job_keys)
+    polling = done < total
+    if hasattr(st, "fragment"):
+        # Seul ce bloc est réexécuté toutes les 2 s, sans relancer le reste de la page
+        st.fragment(show_extraction_progress, run_every=2 if polling else None)(job_keys, polling)
+    else:
+        show_extraction_progress(job_keys, False)
+        if polling:
+            st.button("Rafraîchir l'état des extractions")
@@ -0,0 +1,176 @@
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+from functools import lru_cache
+import json
+import os
+import pandas as pd
+import numpy as np
+
+
+# Indicators monitored by market_monitor, grouped by monitoring category
+INDICATOR_CATEGORIES = {
+    "economic": ["unemployment_rate", "gdp_growth", "inflation_rate", "interest_rates", "consumer_confidence"],
+    "development": ["new_construction_permits", "commercial_development", "infrastructure_projects", "zoning_changes"],
+    "regulatory": ["property_tax_changes", "zoning_updates", "building_code_changes", "environmental_regulations"],
+    "demographic": ["population_growth", "median_income_change"],
+}
+INDICATORS = [name for names in INDICATOR_CATEGORIES.values() for name in names]
+INDICATOR_CATEGORY = {name: category for category, names in INDICATOR_CATEGORIES.items() for name in names}
+
+# Comparison operators: "above"/"below" compare the level, "change_above"/"change_below"
+# the relative change since the previous period
+OPERATORS = ["above", "below", "change_above", "change_below"]
+SEVERITIES = ["Low", "Medium", "High"]
+
+# A threshold of null means "use the alert_threshold passed to the tool"
+DEFAULT_ALERT_RULES = [
+    {"name": "high_unemployment", "indicator": "unemployment_rate", "operator": "above", "threshold": 5.0,
+     "severity": "High", "risk_weight": 0.3, "message": "High unemployment rate"},
+    {"name": "high_interest_rates", "indicator": "interest_rates", "operator": "above", "threshold": 6.0,
+     "severity": "Medium", "risk_weight": 0.2, "message": "High interest rates"},
+    {"name": "construction_oversupply", "indicator": "new_construction_permits", "operator": "above", "threshold": 50,
+     "severity": "Medium", "risk_weight": 0.2, "message": "High construction activity - potential oversupply"},
+    {"name": "property_tax_increase", "indicator": "property_tax_changes", "operator": "above", "threshold": 0.05,
+     "severity": "High", "risk_weight": 0.3, "message": "Significant property tax increase"},
+    {"name": "interest_rate_jump", "indicator": "interest_rates", "operator": "change_above", "threshold": None,
+     "severity": "Medium", "risk_weight": 0.0, "message": "Interest rates rose faster than the alert threshold"},
+    {"name": "unemployment_jump", "indicator": "unemployment_rate", "operator": "change_above", "threshold": None,
+     "severity": "High", "risk_weight": 0.0, "message": "Unemployment rose faster than the alert threshold"},
+    {"name": "permits_surge", "indicator": "new_construction_permits", "operator": "change_above", "threshold": None,
+     "severity": "Low", "risk_weight": 0.0, "message": "Construction permits jumped versus the previous period"},
+    {"name": "confidence_drop", "indicator": "consumer_confidence", "operator": "change_below", "threshold": None,
+     "severity": "Medium", "risk_weight": 0.0, "message": "Consumer confidence fell faster than the alert threshold"},
+    {"name": "income_decline", "indicator": "median_income_change", "operator": "below", "threshold": 0.0,
+     "severity": "Medium", "risk_weight": 0.1, "message": "Median income is declining"},
+]
+
+DEFAULT_RULES_PATH = os.getenv("MARKET_ALERT_RULES_PATH", "")
+DEFAULT_INDICATORS_PATH = os.getenv(
+    "MARKET_INDICATORS_PATH", os.path.join(os.path.dirname(__file__), "data", "market_indicators.csv")
+)
+
+
+class CompiledRules:
+    """
+    Alert rules compiled into arrays: one column index, operator code, threshold,
+    severity and risk weight per rule, evaluated for every location at once.
+    """
+
+    def __init__(self, rules: Sequence[Dict[str, Any]], indicators: Sequence[str] = INDICATORS):
+        unknown = [rule["indicator"] for rule in rules if rule["indicator"] not in indicators]
+        if unknown:
+            raise ValueError(f"Unknown indicators in alert rules: {unknown}")
+        bad_operators = [rule["operator"] for rule in rules if rule["operator"] not in OPERATORS]
+        if bad_operators:
+            raise ValueError(f"Unknown operators in alert rules: {bad_operators}")
+
+        self.rules = list(rules)
+        self.indicators = list(indicators)
+        self.columns = np.array([self.indicators.index(rule["indicator"]) for rule in rules], dtype=np.int64)
+        operators = np.array([OPERATORS.index(rule["operator"]) for rule in rules], dtype=np.int64)
+        self.is_change = operators >= 2
+        self.is_above = (operators % 2) == 0
+        self.thresholds = np.array(
+            [np.nan if rule.get("threshold") is None else rule["threshold"] for rule in rules], dtype=float
+        )
+        self.severity = np.array([SEVERITIES.index(rule.get("severity", "Medium")) for rule in rules], dtype=np.int64)
+        self.risk_weights = np.array([rule.get("risk_weight", 0.0) for rule in rules], dtype=float)
+
+    def evaluate(
+        self,
+        current: np.ndarray,
+        previous: Optional[np.ndarray] = None,
+        alert_threshold: float = 0.05,
+    ) -> Dict[str, np.ndarray]:
+        """
+        Evaluate every rule for every location.
+
+        Args:
+            current: locations x indicators values (NaN = unknown)
+            previous: Values of the previous period, same shape (change rules need it)
+            alert_threshold: Threshold of the rules defined without one (relative change, 0.05 = 5%)
+
+        Returns:
+            Dictionary with the locations x rules fired mask, compared values, thresholds
+            and the per-location risk score
+        """
+        current = np.atleast_2d(np.asarray(current, dtype=float))
+        level = current[:, self.columns]
+        if previous is not None:
+            before = np.atleast_2d(np.asarray(previous, dtype=float))[:, self.columns]
+            with np.errstate(divide="ignore", invalid="ignore"):
+                change = (level - before) / np.abs(before)
+        else:
+            change = np.full(level.shape, np.nan)
+
+        values = np.where(self.is_change, change, level)
+        thresholds = np.where(np.isnan(self.thresholds), alert_threshold, self.thresholds)
+        # Change-below rules fire on a drop larger than the threshold
+        thresholds = np.where(self.is_change & ~self.is_above, -np.abs(thresholds), thresholds)
+        with np.errstate(invalid="ignore"):
+            fired = np.where(self.is_above, values > thresholds, values < thresholds)
+        fired &= ~np.isnan(values)
+        return {
+            "fired": fired,
+            "values": values,
+            "thresholds": thresholds,
+            "risk_score": fired.astype(float) @ self.risk_weights,
+        }
+
+    def alerts(self, evaluation: Dict[str, np.ndarray], row: int) -> List[Dict[str, Any]]:
+        """Alerts fired for one location, most severe first."""
+        fired = np.flatnonzero(evaluation["fired"][row])
+        fired = fired[np.argsort(-self.severity[fired], kind="stable")]
+        return [
+            {
+                "category": INDICATOR_CATEGORY.get(self.rules[i]["indicator"], "other").title(),
+                "rule": self.rules[i]["name"],
+                "indicator": self.rules[i]["indicator"],
+                "description": self.rules[i]["message"],
+                "value": round(float(evaluation["values"][row, i]), 4),
+                "threshold": round(float(evaluation["thresholds"][i]), 4),
+                "severity": SEVERITIES[self.severity[i]],
+            }
+            for i in fired.tolist()
+        ]
+
+
+@lru_cache(maxsize=8)
+def load_rules(path: str = DEFAULT_RULES_PATH) -> CompiledRules:
+    """
+    Compile the alert rules once (a JSON list of rules at path, else DEFAULT_ALERT_RULES).
+    """
+    if path and os.path.exists(path):
+        with open(path) as f:
+            return CompiledRules(json.load(f))
+    return CompiledRules(DEFAULT_ALERT_RULES)
+
+
+@lru_cache(maxsize=8)
+def _load_indicators(path: str, mtime: float) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    frame = pd.read_csv(path, dtype={"location": str})
+    frame["location"] = frame["location"].str.strip().str.lower()
+    frame = frame.sort_values(["location", "date"], kind="stable")
+    values = frame.reindex(columns=INDICATORS).to_numpy(dtype=float)
+    locations = frame["location"].to_numpy()
+    last = np.flatnonzero(np.append(locations[1:] != locations[:-1], True))
+    has_previous = np.append(False, locations[1:] == locations[:-1])[last]
+    previous = np.where(has_previous[:, None], values[np.maximum(last - 1, 0)], np.nan)
+    return locations[last].tolist(), values[last], previous
+
+
+def load_indicator_matrix(path: Optional[str] = None) -> Optional[Tuple[List[str], np.ndarray, np.ndarray]]:
+    """
+    Latest and previous indicator values per location from a wide CSV
+    (location, date, one column per indicator), parsed once per file version.
+
+    Returns:
+        (locations, current locations x indicators, previous locations x indicators), or None without a file
+    """
+    path = path or DEFAULT_INDICATORS_PATH
+    if not os.path.exists(path):
+        return None
+    return _load_indicators(path, os.path.getmtime(path))
+
+
+def overall_risk(risk_score: float) -> str:
+    return "Low" if risk_score < 0.3 else "Medium" if risk_score < 0.6 else "High"
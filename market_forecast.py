@@ -0,0 +1,206 @@
+from typing import Dict, Hashable, Optional, Sequence, Tuple
+import itertools
+import warnings
+import numpy as np
+
+
+SEASON_LENGTH = 12
+FORECAST_HORIZONS = {"next_3_months": 3, "next_6_months": 6, "next_12_months": 12}
+
+# Smoothing parameter grid searched per series (level alpha, trend beta, season gamma)
+ALPHAS = (0.1, 0.3, 0.5, 0.7, 0.9)
+BETAS = (0.01, 0.05, 0.15)
+GAMMAS = (0.05, 0.15, 0.3)
+PARAMETER_GRID = np.array(list(itertools.product(ALPHAS, BETAS, GAMMAS)))
+
+# Parameters are fitted on at most this many recent months
+FIT_WINDOW = 120
+
+
+def _initial_state(log_prices: np.ndarray, seasonal: bool) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Level, trend and season start values per series from the first two seasons (NaN-aware)."""
+    n_series, n_months = log_prices.shape
+    m = SEASON_LENGTH
+    # All-missing first seasons give NaN starts (replaced below); silence the nanmean warnings
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        first = np.nanmean(log_prices[:, :m], axis=1)
+        if seasonal:
+            second = np.nanmean(log_prices[:, m:2 * m], axis=1)
+            trend = (second - first) / m
+            season = log_prices[:, :m] - first[:, None]
+            season = np.where(np.isnan(season), 0.0, season)
+            season = season - season.mean(axis=1, keepdims=True)
+        else:
+            observed = ~np.isnan(log_prices)
+            first_index = np.argmax(observed, axis=1)
+            last_index = n_months - 1 - np.argmax(observed[:, ::-1], axis=1)
+            rows = np.arange(n_series)
+            span = np.maximum(last_index - first_index, 1)
+            trend = (log_prices[rows, last_index] - log_prices[rows, first_index]) / span
+            season = np.zeros((n_series, m))
+    first = np.where(np.isnan(first), 0.0, first)
+    trend = np.where(np.isnan(trend), 0.0, trend)
+    # The first-season mean sits at its middle month; step back to the level before month 0
+    center = (min(n_months, m) - 1) / 2
+    return first - trend * (center + 1), trend, season
+
+
+def holt_winters_filter(
+    log_prices: np.ndarray,
+    params: np.ndarray,
+    seasonal: bool = True,
+) -> Dict[str, np.ndarray]:
+    """
+    Run additive Holt-Winters recursions on log prices for many series and parameter sets at once.
+
+    The time loop is the only Python loop; each step updates every
+    (series, parameter set) lane with array operations. Missing months (NaN)
+    carry the one-step forecast forward without error.
+
+    Args:
+        log_prices: series x months log prices
+        params: series x sets x 3 (alpha, beta, gamma), or sets x 3 shared by every series
+        seasonal: Use the seasonal component (needs two full seasons)
+
+    Returns:
+        Dictionary with per-lane (series x sets) sse and final level, trend and season states
+    """
+    n_series, n_months = log_prices.shape
+    m = SEASON_LENGTH
+    params = np.broadcast_to(params, (n_series,) + params.shape[-2:])
+    alpha, beta, gamma = params[..., 0], params[..., 1], params[..., 2]
+    if not seasonal:
+        gamma = np.zeros_like(gamma)
+
+    level0, trend0, season0 = _initial_state(log_prices, seasonal)
+    n_sets = params.shape[1]
+    level = np.repeat(level0[:, None], n_sets, axis=1)
+    trend = np.repeat(trend0[:, None], n_sets, axis=1)
+    season = np.repeat(season0[:, None, :], n_sets, axis=1)
+    sse = np.zeros((n_series, n_sets))
+
+    for t in range(n_months):
+        y = log_prices[:, t][:, None]
+        s = season[:, :, t % m]
+        forecast = level + trend + s
+        missing = np.isnan(y)
+        observed = np.where(missing, forecast, y)
+        error = observed - forecast
+        if t >= m:
+            sse += error * error
+        new_level = alpha * (observed - s) + (1 - alpha) * (level + trend)
+        trend = beta * (new_level - level) + (1 - beta) * trend
+        season[:, :, t % m] = gamma * (observed - new_level) + (1 - gamma) * s
+        level = new_level
+
+    return {"sse": sse, "level": level, "trend": trend, "season": season, "n_months": n_months}
+
+
+def fit_holt_winters(log_prices: np.ndarray, seasonal: bool = True) -> np.ndarray:
+    """
+    Best (alpha, beta, gamma) per series by grid search on one-step-ahead squared error.
+
+    Args:
+        log_prices: series x months log prices
+
+    Returns:
+        series x 3 parameter array
+    """
+    fit = holt_winters_filter(log_prices[:, -FIT_WINDOW:], PARAMETER_GRID, seasonal)
+    return PARAMETER_GRID[np.argmin(fit["sse"], axis=1)]
+
+
+def forecast_from_state(state: Dict[str, np.ndarray], horizons: Sequence[int]) -> np.ndarray:
+    """Price forecasts (series x horizons) from the final states of a single-set filter run."""
+    level = state["level"][:, 0]
+    trend = state["trend"][:, 0]
+    season = state["season"][:, 0, :]
+    n_months = state["n_months"]
+    columns = []
+    for h in horizons:
+        columns.append(np.exp(level + h * trend + season[:, (n_months - 1 + h) % SEASON_LENGTH]))
+    return np.column_stack(columns)
+
+
+def holt_winters_forecast(
+    prices: np.ndarray,
+    horizons: Sequence[int] = tuple(FORECAST_HORIZONS.values()),
+    params: Optional[np.ndarray] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Seasonal exponential-smoothing forecasts for many price series (rows).
+
+    Args:
+        prices: series x months prices (NaN for missing months); a 1-D array is one series
+        horizons: Months ahead to forecast
+        params: Fitted series x 3 parameters to reuse (fitted here when None)
+
+    Returns:
+        Dictionary with forecasts (series x horizons), params and whether seasonality was used
+    """
+    prices = np.atleast_2d(np.asarray(prices, dtype=float))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_prices = np.where(prices > 0, np.log(prices), np.nan)
+    seasonal = prices.shape[1] >= 2 * SEASON_LENGTH
+    if params is None:
+        params = fit_holt_winters(log_prices, seasonal)
+    state = holt_winters_filter(log_prices, params[:, None, :], seasonal)
+    return {"forecast": forecast_from_state(state, horizons), "params": params, "seasonal": seasonal}
+
+
+class HoltWintersCache:
+    """
+    Fitted smoothing parameters per series key, reused until the series has grown by refit_after months.
+    """
+
+    def __init__(self, refit_after: int = 12, max_entries: int = 100000):
+        self.refit_after = refit_after
+        self.max_entries = max_entries
+        self.params: Dict[Hashable, Tuple[np.ndarray, int]] = {}
+
+    def forecast(
+        self,
+        keys: Sequence[Hashable],
+        prices: np.ndarray,
+        last_months: Sequence[int],
+        horizons: Sequence[int] = tuple(FORECAST_HORIZONS.values()),
+    ) -> Dict[str, np.ndarray]:
+        """
+        Forecast many series, fitting only those without fresh cached parameters.
+
+        Args:
+            keys: Series identity per row, e.g. (location, property_type)
+            prices: series x months prices
+            last_months: Month number of each row's last observation
+            horizons: Months ahead to forecast
+
+        Returns:
+            Dictionary like holt_winters_forecast plus the number of series fitted
+        """
+        prices = np.atleast_2d(np.asarray(prices, dtype=float))
+        params = np.empty((len(prices), 3))
+        stale = []
+        for row, (key, last_month) in enumerate(zip(keys, last_months)):
+            cached = self.params.get(key)
+            if cached is not None and 0 <= last_month - cached[1] < self.refit_after:
+                params[row] = cached[0]
+            else:
+                stale.append(row)
+
+        if stale:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                log_prices = np.where(prices[stale] > 0, np.log(prices[stale]), np.nan)
+            params[stale] = fit_holt_winters(log_prices, prices.shape[1] >= 2 * SEASON_LENGTH)
+            for row in stale:
+                if len(self.params) >= self.max_entries:
+                    self.params.pop(next(iter(self.params)))
+                self.params[keys[row]] = (params[row].copy(), int(last_months[row]))
+
+        result = holt_winters_forecast(prices, horizons, params)
+        result["fitted"] = len(stale)
+        return result
+
+
+# Process-wide parameter cache shared by the market trend tools
+holt_winters_cache = HoltWintersCache()
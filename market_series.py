@@ -0,0 +1,267 @@
+from typing import Dict, Any, List, Optional, Tuple
+from functools import lru_cache
+from datetime import datetime
+import pandas as pd
+import numpy as np
+import os
+
+try:
+    from .price_index_store import PriceIndexStore, get_price_index_store
+except ImportError:
+    from price_index_store import PriceIndexStore, get_price_index_store
+
+
+# Monthly seasonal factors of the simulated series (January..December)
+SEASONAL_FACTORS = np.array([0.95, 0.92, 0.98, 1.05, 1.08, 1.10, 1.12, 1.08, 1.05, 1.02, 0.98, 0.95])
+MONTH_NAMES = [datetime(2024, month, 1).strftime("%B") for month in range(1, 13)]
+# Observed months needed for a trend (matrix_statistics rows with fewer are NaN or flat)
+MIN_TREND_MONTHS = 2
+
+DEFAULT_SERIES_PATH = os.getenv(
+    "MARKET_SERIES_PATH", os.path.join(os.path.dirname(__file__), "data", "market_series.csv")
+)
+
+SeriesKey = Tuple[str, str]
+
+
+def month_number(year: Any, month: Any) -> Any:
+    """Months since year 0 (year * 12 + month - 1); works on scalars and arrays."""
+    return year * 12 + month - 1
+
+
+def month_labels(months: np.ndarray) -> List[str]:
+    """YYYY-MM labels of month numbers."""
+    return [f"{month // 12:04d}-{month % 12 + 1:02d}" for month in np.asarray(months).tolist()]
+
+
+def series_key(location: str, property_type: Optional[str] = None) -> SeriesKey:
+    """Normalized (location, property_type) lookup key."""
+    return (str(location).strip().lower(), str(property_type or "residential").strip().lower())
+
+
+def read_series_file(path: str) -> pd.DataFrame:
+    """
+    Read a long-format monthly series file (CSV, or Parquet when pyarrow/fastparquet is installed).
+
+    Expected columns: location, date (YYYY-MM or YYYY-MM-DD), price; optional property_type.
+    """
+    if path.endswith((".parquet", ".pq")):
+        return pd.read_parquet(path)
+    # Keep ZIP-code locations as text (leading zeros)
+    return pd.read_csv(path, dtype={"location": str})
+
+
+def _normalized_labels(values: pd.Series) -> np.ndarray:
+    """strip().lower() applied once per distinct label rather than once per row."""
+    codes, uniques = pd.factorize(values.astype(str))
+    return np.asarray(pd.Index(uniques).str.strip().str.lower(), dtype=object)[codes]
+
+
+@lru_cache(maxsize=8)
+def _load_series(path: str, mtime: float) -> Dict[SeriesKey, Tuple[np.ndarray, np.ndarray]]:
+    frame = read_series_file(path)
+    raw_dates = frame["date"].astype(str)
+    dates = pd.to_datetime(raw_dates, format="%Y-%m", errors="coerce")
+    unparsed = dates.isna()
+    if unparsed.any():
+        dates[unparsed] = pd.to_datetime(raw_dates[unparsed], errors="coerce")
+    property_types = frame["property_type"] if "property_type" in frame.columns else pd.Series("residential", index=frame.index)
+    table = pd.DataFrame({
+        "location": _normalized_labels(frame["location"]),
+        "property_type": _normalized_labels(property_types.fillna("residential")),
+        "month": month_number(dates.dt.year, dates.dt.month),
+        "price": pd.to_numeric(frame["price"], errors="coerce"),
+    }).dropna()
+    # One value per month (last row wins), sorted so every series is a contiguous slice
+    table = table.drop_duplicates(["location", "property_type", "month"], keep="last")
+    table = table.sort_values(["location", "property_type", "month"], kind="stable")
+
+    months = table["month"].to_numpy(dtype=np.int64)
+    prices = table["price"].to_numpy(dtype=np.float64)
+    locations = table["location"].to_numpy()
+    property_types = table["property_type"].to_numpy()
+    changes = (locations[1:] != locations[:-1]) | (property_types[1:] != property_types[:-1])
+    boundaries = np.concatenate([[0], np.flatnonzero(changes) + 1, [len(table)]]).tolist()
+    return {
+        (locations[start], property_types[start]): (months[start:end], prices[start:end])
+        for start, end in zip(boundaries[:-1], boundaries[1:])
+    }
+
+
+def load_price_series(path: Optional[str] = None) -> Dict[SeriesKey, Tuple[np.ndarray, np.ndarray]]:
+    """
+    All monthly price series of the source file, parsed once per file version.
+
+    Args:
+        path: CSV or Parquet file (defaults to MARKET_SERIES_PATH / data/market_series.csv)
+
+    Returns:
+        Mapping (location, property_type) -> (month numbers, prices), chronological; empty if no file
+    """
+    path = path or DEFAULT_SERIES_PATH
+    if not os.path.exists(path):
+        return {}
+    return _load_series(path, os.path.getmtime(path))
+
+
+def get_price_series(
+    location: str,
+    property_type: Optional[str] = None,
+    analysis_period: Optional[int] = None,
+    path: Optional[str] = None,
+    store: Optional[PriceIndexStore] = None,
+) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+    """
+    The last analysis_period months of one location's series, read from the price index store.
+
+    Months of the source file newer than the stored ones are appended to the store
+    first (the store is append-only: revisions of stored months are not applied).
+
+    Args:
+        location: Location of the series
+        property_type: Property type of the series
+        analysis_period: Number of months (None for the whole series)
+        path: Series file (defaults to MARKET_SERIES_PATH)
+        store: Price index store (defaults to PRICE_INDEX_STORE_PATH)
+
+    Returns:
+        (month numbers, prices), zero-copy views unless months are missing;
+        None if neither the store nor the source has the location/type
+    """
+    key = series_key(location, property_type)
+    series = load_price_series(path).get(key)
+    try:
+        store = store or get_price_index_store()
+        if series is not None:
+            store.sync(key, *series)
+        window = store.window(key, analysis_period)
+    except OSError:
+        # Read-only deployment: use the source file directly
+        window = None if series is None else (series[0][-(analysis_period or 0):], series[1][-(analysis_period or 0):])
+    if window is None:
+        return None
+    months, prices = window
+    observed = ~np.isnan(prices)
+    if not observed.all():
+        months, prices = months[observed], prices[observed]
+    return months, prices
+
+
+def simulated_series(
+    analysis_period: int,
+    include_seasonal: bool = True,
+    base_price: float = 400000,
+    now: Optional[datetime] = None,
+    rng: Optional[np.random.Generator] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Simulated monthly series ending this month: 2% annual appreciation, seasonal factors, 2% noise.
+
+    Returns:
+        (month numbers, prices), chronological
+    """
+    now = now or datetime.now()
+    rng = rng or np.random.default_rng()
+    months = month_number(now.year, now.month) - np.arange(analysis_period)[::-1]
+    months_ago = np.arange(analysis_period)[::-1]
+    seasonal = SEASONAL_FACTORS[months % 12] if include_seasonal else 1.0
+    prices = base_price * 1.02 ** (-months_ago / 12) * seasonal * rng.normal(1.0, 0.02, analysis_period)
+    return months, np.round(prices, 2)
+
+
+def cycle_phase(annual_growth: float) -> str:
+    return "Expansion" if annual_growth > 0.03 else "Stable" if annual_growth > 0 else "Contraction"
+
+
+def volatility_level(volatility: float) -> str:
+    return "High" if volatility > 0.15 else "Medium" if volatility > 0.10 else "Low"
+
+
+def price_matrix(
+    locations: List[str],
+    property_type: Optional[str] = None,
+    analysis_period: int = 24,
+    path: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Align the last analysis_period calendar months of many locations into one matrix.
+
+    Args:
+        locations: Locations to include
+        property_type: Property type of the series
+        analysis_period: Number of months (columns), ending at the latest month in the selection
+        path: Series file (defaults to MARKET_SERIES_PATH)
+
+    Returns:
+        Dictionary with the locations x months matrix (NaN where a month is missing),
+        the month numbers, the locations found and those missing from the source
+    """
+    found, missing, series = [], [], []
+    for location in locations:
+        entry = get_price_series(location, property_type, analysis_period, path)
+        if entry is None:
+            missing.append(location)
+        else:
+            found.append(location)
+            series.append(entry)
+
+    end = max((int(months[-1]) for months, _ in series), default=0)
+    months = np.arange(end - analysis_period + 1, end + 1)
+    matrix = np.full((len(series), analysis_period), np.nan)
+    for row, (series_months, prices) in enumerate(series):
+        start = np.searchsorted(series_months, months[0])
+        columns = series_months[start:] - months[0]
+        matrix[row, columns] = prices[start:]
+    return {"matrix": matrix, "months": months, "locations": found, "missing": missing}
+
+
+def matrix_statistics(matrix: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Trend slope, growth rates, annualized volatility and cycle phase for every row at once.
+
+    Rows are series over the same months; NaN marks a missing month (left out of
+    the fit, and the returns touching it are skipped). Gap-free rows give the same
+    numbers as market_trend_state.TrendState over the same window.
+
+    Args:
+        matrix: locations x months prices
+
+    Returns:
+        Dictionary of per-row arrays
+    """
+    observed = ~np.isnan(matrix)
+    counts = observed.sum(axis=1)
+    values = np.where(observed, matrix, 0.0)
+    x = np.broadcast_to(np.arange(matrix.shape[1], dtype=float), matrix.shape)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_x = (x * observed).sum(axis=1) / counts
+        mean_y = values.sum(axis=1) / counts
+        dx = np.where(observed, x - mean_x[:, None], 0.0)
+        dy = np.where(observed, values - mean_y[:, None], 0.0)
+        sxx = (dx * dx).sum(axis=1)
+        slope = np.where(sxx > 0, (dx * dy).sum(axis=1) / sxx, 0.0)
+        intercept = mean_y - slope * mean_x
+        monthly_growth = slope / mean_y
+        annual_growth = monthly_growth * 12
+
+        returns = np.diff(matrix, axis=1) / matrix[:, :-1]
+        valid_returns = ~np.isnan(returns)
+        return_counts = valid_returns.sum(axis=1)
+        return_values = np.where(valid_returns, returns, 0.0)
+        return_mean = return_values.sum(axis=1) / return_counts
+        return_var = (np.where(valid_returns, returns - return_mean[:, None], 0.0) ** 2).sum(axis=1) / return_counts
+    volatility = np.where(return_counts > 0, np.sqrt(return_var) * np.sqrt(12), 0.0)
+
+    last_index = matrix.shape[1] - 1 - np.argmax(observed[:, ::-1], axis=1)
+    phase = np.where(annual_growth > 0.03, "Expansion", np.where(annual_growth > 0, "Stable", "Contraction"))
+    return {
+        "slope": slope,
+        "intercept": intercept,
+        "monthly_growth": monthly_growth,
+        "annual_growth": annual_growth,
+        "volatility": volatility,
+        "phase": phase,
+        "months_observed": counts,
+        "last_price": matrix[np.arange(len(matrix)), last_index] if len(matrix) else np.empty(0),
+    }
@@ -0,0 +1,231 @@
+from typing import Dict, Any, Hashable, Optional, Tuple
+from collections import deque
+import numpy as np
+
+try:
+    from .market_series import MONTH_NAMES
+except ImportError:
+    from market_series import MONTH_NAMES
+
+
+class TrendState:
+    """
+    Sliding-window trend statistics of one monthly series, updated in O(1) per month.
+
+    Keeps running sums for the least-squares trend, Welford mean/M2 of monthly
+    returns and per-calendar-month price sums, so appending a month (and evicting
+    the one that falls out of the window) never revisits the history. Matches
+    market_series.matrix_statistics on a gap-free window.
+    """
+
+    def __init__(self, window: int):
+        self.window = window
+        self.points: deque = deque()  # (sequence x, month number, price)
+        self.next_x = 0
+        # Trend: running sums over the window
+        self.sum_x = 0.0
+        self.sum_y = 0.0
+        self.sum_xx = 0.0
+        self.sum_xy = 0.0
+        # Returns: Welford running mean / M2
+        self.return_count = 0
+        self.return_mean = 0.0
+        self.return_m2 = 0.0
+        # Seasonality: per calendar month count, sum and sum of squares of prices
+        self.season_count = np.zeros(12)
+        self.season_sum = np.zeros(12)
+        self.season_sumsq = np.zeros(12)
+
+    @classmethod
+    def from_series(cls, months: np.ndarray, prices: np.ndarray, window: int) -> "TrendState":
+        """Initialize from the last `window` months of a chronological series with array ops."""
+        months = np.asarray(months)[-window:]
+        prices = np.asarray(prices, dtype=float)[-window:]
+        state = cls(window)
+        n = len(prices)
+        x = np.arange(n, dtype=float)
+        state.points = deque(zip(x.tolist(), months.tolist(), prices.tolist()))
+        state.next_x = n
+        state.sum_x = float(x.sum())
+        state.sum_y = float(prices.sum())
+        state.sum_xx = float(np.dot(x, x))
+        state.sum_xy = float(np.dot(x, prices))
+        returns = np.diff(prices) / prices[:-1]
+        state.return_count = len(returns)
+        state.return_mean = float(returns.mean()) if len(returns) else 0.0
+        state.return_m2 = float(((returns - state.return_mean) ** 2).sum()) if len(returns) else 0.0
+        month_of_year = months % 12
+        state.season_count = np.bincount(month_of_year, minlength=12).astype(float)
+        state.season_sum = np.bincount(month_of_year, weights=prices, minlength=12)
+        state.season_sumsq = np.bincount(month_of_year, weights=prices * prices, minlength=12)
+        return state
+
+    def _add_return(self, value: float) -> None:
+        self.return_count += 1
+        delta = value - self.return_mean
+        self.return_mean += delta / self.return_count
+        self.return_m2 += delta * (value - self.return_mean)
+
+    def _remove_return(self, value: float) -> None:
+        if self.return_count <= 1:
+            self.return_count, self.return_mean, self.return_m2 = 0, 0.0, 0.0
+            return
+        delta = value - self.return_mean
+        self.return_count -= 1
+        self.return_mean -= delta / self.return_count
+        self.return_m2 = max(self.return_m2 - delta * (value - self.return_mean), 0.0)
+
+    def _evict(self) -> None:
+        x, month, price = self.points.popleft()
+        self.sum_x -= x
+        self.sum_y -= price
+        self.sum_xx -= x * x
+        self.sum_xy -= x * price
+        self.season_count[month % 12] -= 1
+        self.season_sum[month % 12] -= price
+        self.season_sumsq[month % 12] -= price * price
+        if self.points:
+            self._remove_return((self.points[0][2] - price) / price)
+        # Once per window length, renumber x from 0 and recompute the trend sums exactly
+        # (amortized O(1); keeps x small and drops accumulated rounding)
+        if self.points and self.points[0][0] >= self.window:
+            self._rebase()
+
+    def _rebase(self) -> None:
+        self.points = deque((float(i), month, price) for i, (_, month, price) in enumerate(self.points))
+        self.next_x = len(self.points)
+        x = np.arange(len(self.points), dtype=float)
+        prices = np.array([point[2] for point in self.points])
+        self.sum_x = float(x.sum())
+        self.sum_y = float(prices.sum())
+        self.sum_xx = float(np.dot(x, x))
+        self.sum_xy = float(np.dot(x, prices))
+
+    def add(self, month: int, price: float) -> None:
+        """
+        Append the next month (O(1)); the oldest month leaves the window once it is full.
+
+        Args:
+            month: Month number, later than the last one added
+            price: Price for that month
+        """
+        if self.points and month <= self.points[-1][1]:
+            raise ValueError(f"Month {month} is not after the last month {self.points[-1][1]}")
+        x = float(self.next_x)
+        self.next_x += 1
+        if self.points:
+            previous = self.points[-1][2]
+            self._add_return((price - previous) / previous)
+        self.points.append((x, month, price))
+        self.sum_x += x
+        self.sum_y += price
+        self.sum_xx += x * x
+        self.sum_xy += x * price
+        self.season_count[month % 12] += 1
+        self.season_sum[month % 12] += price
+        self.season_sumsq[month % 12] += price * price
+        if len(self.points) > self.window:
+            self._evict()
+
+    @property
+    def last(self) -> Optional[Tuple[int, float]]:
+        """(month, price) of the latest point, or None when empty."""
+        return (self.points[-1][1], self.points[-1][2]) if self.points else None
+
+    def statistics(self, include_seasonal: bool = True, base_price: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Trend, growth, volatility and seasonal profile of the current window.
+
+        Args:
+            include_seasonal: Include the per-calendar-month profile
+            base_price: Price at index 100 (defaults to the first price of the window)
+
+        Returns:
+            Dictionary of unrounded statistics used by market_trend_analyzer
+        """
+        n = len(self.points)
+        base_price = base_price or self.points[0][2]
+        mean_y = self.sum_y / n
+        # Slope/intercept with x counted from the first month of the window
+        first_x = self.points[0][0]
+        mean_x = self.sum_x / n - first_x
+        sxx = self.sum_xx - self.sum_x * self.sum_x / n
+        slope = (self.sum_xy - self.sum_x * self.sum_y / n) / sxx if n > 1 and sxx > 0 else 0.0
+        intercept = mean_y - slope * mean_x
+        monthly_growth = slope / mean_y
+        annual_growth = monthly_growth * 12
+        volatility = float(np.sqrt(self.return_m2 / self.return_count) * np.sqrt(12)) if self.return_count else 0.0
+
+        seasonal = {}
+        if include_seasonal:
+            present = self.season_count > 0
+            means = np.divide(self.season_sum, self.season_count, out=np.zeros(12), where=present)
+            variances = np.divide(self.season_sumsq, self.season_count, out=np.zeros(12), where=present) - means ** 2
+            stds = np.sqrt(np.maximum(variances, 0))
+            seasonal = {
+                int(month) + 1: {
+                    "month_name": MONTH_NAMES[month],
+                    "avg_index": round(float(means[month] / base_price * 100), 2),
+                    "volatility": round(float(stds[month] / base_price * 100), 2),
+                }
+                for month in np.flatnonzero(present)
+            }
+
+        months = np.array([point[1] for point in self.points], dtype=np.int64)
+        prices = np.array([point[2] for point in self.points])
+        return {
+            "months": months,
+            "prices": prices,
+            "price_index": prices / base_price * 100,
+            "slope": slope,
+            "intercept": intercept,
+            "monthly_growth": monthly_growth,
+            "annual_growth": annual_growth,
+            "volatility": volatility,
+            "seasonal": seasonal,
+        }
+
+
+class TrendStateCache:
+    """
+    TrendState per (series key, window), brought up to date with only the new months.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.states: Dict[Tuple[Hashable, int], TrendState] = {}
+
+    def sync(self, key: Hashable, months: np.ndarray, prices: np.ndarray, window: int) -> TrendState:
+        """
+        State for a series, appending months newer than the cached state's last month.
+
+        The state is rebuilt when the series no longer contains the cached last
+        point (history revised or another source).
+
+        Args:
+            key: Series identity, e.g. (location, property_type)
+            months: Chronological month numbers of the full series
+            prices: Prices, same length
+            window: Number of months in the window (analysis_period)
+
+        Returns:
+            Up-to-date TrendState
+        """
+        state = self.states.get((key, window))
+        if state is not None and state.last is not None:
+            last_month, last_price = state.last
+            position = int(np.searchsorted(months, last_month))
+            if position < len(months) and months[position] == last_month and prices[position] == last_price:
+                for month, price in zip(months[position + 1:].tolist(), prices[position + 1:].tolist()):
+                    state.add(month, price)
+                return state
+
+        state = TrendState.from_series(months, prices, window)
+        if len(self.states) >= self.max_entries:
+            self.states.pop(next(iter(self.states)))
+        self.states[(key, window)] = state
+        return state
+
+
+# Process-wide states shared by market_trend_analyzer calls
+trend_states = TrendStateCache()
@@ -22,19 +22,31 @@ from pathlib import Path
 try:
     from .tools import (
         mls_integration,
+        similar_comps_selector,
         avm_engine,
+        avm_sensitivity_sweep,
         comps_analyzer,
+        comps_analyzer_batch,
         market_trend_analyzer,
+        market_trend_batch,
+        neighborhood_ppsf_quartiles,
         market_monitor,
+        market_alert_scan,
         maintenance_cost_estimator,
     )
 except ImportError:
     from tools import (
         mls_integration,
+        similar_comps_selector,
         avm_engine,
+        avm_sensitivity_sweep,
         comps_analyzer,
+        comps_analyzer_batch,
         market_trend_analyzer,
+        market_trend_batch,
+        neighborhood_ppsf_quartiles,
         market_monitor,
+        market_alert_scan,
         maintenance_cost_estimator,
     )
 
@@ -43,6 +55,8 @@ try:
     from .tools_2 import (
         web_property_scraper,
         document_property_parser,
+        document_directory_parser,
+        document_comparables_extractor,
         valuation_model_runner,
         advice_policy_rules,
         cross_validation_checker,
@@ -54,6 +68,8 @@ except ImportError:
     from tools_2 import (
         web_property_scraper,
         document_property_parser,
+        document_directory_parser,
+        document_comparables_extractor,
         valuation_model_runner,
         advice_policy_rules,
         cross_validation_checker,
@@ -129,9 +145,12 @@ DataCollectionAgent = Agent(
         PandasTools(),
         FinancialDatasetsTools(),
         mls_integration,
+        similar_comps_selector,
         market_monitor,
         web_property_scraper,
         document_property_parser,
+        document_directory_parser,
+        document_comparables_extractor,
     ],
     description="""
     Un agent IA centré sur la collecte et la normalisation des données de biens immobiliers
@@ -150,8 +169,15 @@ DataCollectionAgent = Agent(
 
     ## Tool Usage Guidelines
     - Utilisez mls_integration comme source principale de comparables, avec filtres (sqft, chambres, jours, rayon).
+    - Utilisez similar_comps_selector pour retenir les k comparables les plus proches du bien; transmettez-les tels quels
+      (avec similarity_weight) à avm_engine pour une valorisation pondérée par similarité.
     - Complétez via web_property_scraper lorsque des attributs/comps manquent; dédupliquez par adresse/date.
     - Parsez les documents fournis avec document_property_parser (listing/inspection) pour extraire des attributs structurés.
+    - Pour un dossier entier (ex. documents2/), appelez document_directory_parser une seule fois plutôt que fichier par fichier.
+    - Pour un export MLS volumineux (plusieurs Go), document_property_parser lit le fichier bloc par bloc (stream=True, automatique au-delà de 256 Mo): il renvoie un résumé et écrit un enregistrement par annonce dans output_path.
+    - Pour les documents de bien structurés (sections Comparable Sales / Market Context / Source Metadata), utilisez
+      document_comparables_extractor: ses comparable_sales et subject se passent tels quels à avm_engine et comps_analyzer,
+      sans relire ni retranscrire le fichier.
     - Ajoutez les signaux marché avec market_monitor (DOM, inventaire, price reductions, absorption).
     - Utilisez GoogleSearchTools pour news/projets locaux seulement si MLS/documents sont insuffisants.
     - Nettoyez et unifiez avec PandasTools (types, unités, ppsf; jointures multi-sources).
@@ -228,7 +254,9 @@ ValuationAgent = Agent(
         CalculatorTools(),
         PythonTools(),
         avm_engine,
+        avm_sensitivity_sweep,
         comps_analyzer,
+        comps_analyzer_batch,
         valuation_model_runner,
     ],
     description="""
@@ -246,7 +274,12 @@ ValuationAgent = Agent(
 
     ## Tool Usage Guidelines
     - Utilisez avm_engine pour agréger 3 méthodes standards (ppsf, régression simple, comps ajustés).
+      Pour une fourchette P10/P50/P90, passez bootstrap_resamples (ex. 2000) et un seed fixe.
+      Sans tendance connue, omettez market_trend: l'appréciation de l'indice de ventes répétées du code postal est utilisée.
+    - Pour des scénarios what-if (état, tendance de marché, pondération des méthodes), utilisez avm_sensitivity_sweep
+      en un seul appel plutôt que de relancer avm_engine pour chaque variante.
     - Utilisez comps_analyzer pour calibrer/inspecter les ajustements et la variance des prix ajustés.
+    - Utilisez comps_analyzer_batch pour évaluer plusieurs biens d'un même quartier contre les mêmes comparables en un seul appel.
     - Utilisez valuation_model_runner pour ajouter, si disponible, une prédiction ML et comparer avec les autres méthodes.
     - Nettoyez avec PandasTools les colonnes/valeurs avant d'appeler les modèles; utilisez CalculatorTools pour conversions unitaires.
     - Documentez la pondération et conservez la traçabilité des comparables utilisés.
@@ -276,7 +309,10 @@ MarketComparisonAgent = Agent(
         PandasTools(),
         FinancialDatasetsTools(),
         market_trend_analyzer,
+        market_trend_batch,
+        neighborhood_ppsf_quartiles,
         market_monitor,
+        market_alert_scan,
         CalculatorTools(),
     ],
     description="""
@@ -294,9 +330,13 @@ MarketComparisonAgent = Agent(
 
     ## Tool Usage Guidelines
     - Utilisez market_trend_analyzer pour la tendance (growth, volatilité, phase de cycle) et les séries récentes.
+    - Pour un rapport régional (plusieurs villes/codes postaux), appelez market_trend_batch une seule fois avec
+      toutes les localisations plutôt que market_trend_analyzer en boucle.
     - Utilisez market_monitor pour signaux temps quasi-réel (inventaire, DOM, absorption, alertes locales).
+    - Pour surveiller plusieurs zones, utilisez market_alert_scan (un seul appel) et citez la règle et la sévérité de chaque alerte.
     - Utilisez FinancialDatasetsTools pour indicateurs macro pertinents.
-    - Exploitez PandasTools et CalculatorTools pour calculer ppsf, percentiles, et delta_to_market_pct.
+    - Utilisez neighborhood_ppsf_quartiles (avec subject_ppsf) pour les quartiles ppsf du quartier et delta_to_market_pct.
+    - Exploitez PandasTools et CalculatorTools pour les calculs complémentaires.
 
     ## Sortie attendue
     - market_positioning: ppsf_sujet vs quartiles locaux, delta_to_market_pct
@@ -0,0 +1,224 @@
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Tuple, Union
+import re
+import pandas as pd
+import numpy as np
+
+try:
+    from .comps_store import ComparablesStore, PROPERTY_TYPE_NAMES, as_comps_store, same_store
+except ImportError:
+    from comps_store import ComparablesStore, PROPERTY_TYPE_NAMES, as_comps_store, same_store
+
+
+QUARTILES = (0.25, 0.5, 0.75)
+ZIP_PATTERN = re.compile(r"\b(\d{5})(?:-\d{4})?\s*$")
+
+
+class TDigest:
+    """
+    Mergeable quantile sketch (merging t-digest with the arcsine scale function).
+
+    Values are buffered and folded into at most ~compression centroids; two
+    digests merge by folding their centroids together. Quartiles are cached
+    after each fold, so reading them is O(1).
+    """
+
+    def __init__(self, compression: float = 200, buffer_size: int = 500):
+        self.compression = compression
+        self.buffer_size = buffer_size
+        self.means = np.empty(0)
+        self.weights = np.empty(0)
+        self.buffer: List[np.ndarray] = []
+        self.buffered = 0
+        self.count = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self._quartiles: Optional[Tuple[float, float, float]] = None
+
+    def update(self, values: Union[float, Sequence[float], np.ndarray]) -> None:
+        """Add values (NaN ignored); folds into the centroids once the buffer is full."""
+        values = np.atleast_1d(np.asarray(values, dtype=float))
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.buffer.append(values)
+        self.buffered += len(values)
+        self.count += len(values)
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        self._quartiles = None
+        if self.buffered >= self.buffer_size:
+            self._fold()
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        """Fold another digest into this one (in place) and return self."""
+        other._fold()
+        self._fold()
+        if not other.count:
+            return self
+        self.means = np.concatenate([self.means, other.means])
+        self.weights = np.concatenate([self.weights, other.weights])
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress(self.means, self.weights)
+        return self
+
+    def _fold(self) -> None:
+        if not self.buffered:
+            return
+        values = np.concatenate(self.buffer)
+        self.buffer, self.buffered = [], 0
+        self._compress(np.concatenate([self.means, values]), np.concatenate([self.weights, np.ones(len(values))]))
+
+    def _compress(self, means: np.ndarray, weights: np.ndarray) -> None:
+        order = np.argsort(means, kind="stable")
+        means, weights = means[order], weights[order]
+        total = weights.sum()
+        # Centroids whose left cumulative quantile falls in the same unit of the
+        # scale k(q) = compression / (2 pi) * asin(2q - 1) are merged
+        q_left = (np.cumsum(weights) - weights) / total
+        k = self.compression / (2 * np.pi) * np.arcsin(2 * q_left - 1)
+        groups = np.floor(k - k[0]).astype(np.int64)
+        _, starts = np.unique(groups, return_index=True)
+        group_weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / group_weights
+        self.weights = group_weights
+        self._quartiles = None
+
+    def quantile(self, q: Union[float, Sequence[float]]) -> np.ndarray:
+        """Quantiles by interpolating between centroid midpoints (exact min/max at the ends)."""
+        self._fold()
+        q = np.atleast_1d(np.asarray(q, dtype=float))
+        if not self.count:
+            return np.full(len(q), np.nan)
+        if np.all(self.weights == 1):
+            # Still exact (every centroid is one value)
+            return np.quantile(self.means, q)
+        centers = np.cumsum(self.weights) - self.weights / 2
+        positions = np.concatenate([[0.0], centers, [self.count]])
+        values = np.concatenate([[self.min], self.means, [self.max]])
+        return np.interp(q * self.count, positions, values)
+
+    def quartiles(self) -> Tuple[float, float, float]:
+        """(p25, p50, p75), cached until the next update."""
+        if self._quartiles is None or self.buffered:
+            self._quartiles = tuple(float(value) for value in self.quantile(QUARTILES))
+        return self._quartiles
+
+
+def neighborhood_of(address: str) -> str:
+    """Neighborhood key of an address: its ZIP code, or the address' city part, or 'unknown'."""
+    match = ZIP_PATTERN.search(address or "")
+    if match:
+        return match.group(1)
+    parts = [part.strip() for part in (address or "").split(",")]
+    return parts[1].lower() if len(parts) > 2 else "unknown"
+
+
+class PpsfQuantileService:
+    """
+    Price-per-sqft sketches per (neighborhood, property type), updated as sales are ingested.
+    """
+
+    def __init__(self, compression: float = 200):
+        self.compression = compression
+        self.digests: Dict[Tuple[str, str], TDigest] = {}
+        # Store the sketches were last rebuilt from (see sync_store)
+        self.source: Optional[ComparablesStore] = None
+
+    @staticmethod
+    def key(neighborhood: str, property_type: Optional[str] = None) -> Tuple[str, str]:
+        return (str(neighborhood).strip().lower(), str(property_type or "residential").strip().lower())
+
+    def ingest(
+        self,
+        comparable_sales: Union[ComparablesStore, List[Dict[str, Any]]],
+        neighborhoods: Optional[Sequence[str]] = None,
+    ) -> int:
+        """
+        Add sales' price per sqft to their neighborhood sketches (one grouped update per sketch).
+
+        Args:
+            comparable_sales: ComparablesStore or list of comparable sales data
+            neighborhoods: Neighborhood per sale (defaults to a "neighborhood" field,
+                else the ZIP code of the address)
+
+        Returns:
+            Number of sales with a price per sqft that were added
+        """
+        comps = as_comps_store(comparable_sales)
+        if neighborhoods is None:
+            if comps.records is not None and any("neighborhood" in comp for comp in comps.records):
+                neighborhoods = [comp.get("neighborhood") or neighborhood_of(comp.get("address")) for comp in comps.records]
+            else:
+                # One regex pass per distinct address
+                codes, addresses = pd.factorize(pd.Series(np.asarray(comps["address"])))
+                neighborhoods = np.array([neighborhood_of(address) for address in addresses], dtype=object)[codes]
+        property_types = np.asarray(comps["property_type"])
+        ppsf = np.asarray(comps["price_per_sqft"])
+
+        frame = pd.DataFrame({
+            "neighborhood": pd.Series(neighborhoods, dtype=object).astype(str).str.strip().str.lower(),
+            "property_type": [PROPERTY_TYPE_NAMES.get(code, "residential") for code in property_types.tolist()],
+            "ppsf": ppsf,
+        }).dropna(subset=["ppsf"])
+        for (neighborhood, property_type), group in frame.groupby(["neighborhood", "property_type"], sort=False):
+            digest = self.digests.get((neighborhood, property_type))
+            if digest is None:
+                digest = TDigest(self.compression)
+                self.digests[(neighborhood, property_type)] = digest
+            digest.update(group["ppsf"].to_numpy())
+        return len(frame)
+
+    def sync_store(self, comps: ComparablesStore) -> bool:
+        """
+        Rebuild the sketches from a store unless they already hold exactly its sales.
+
+        A store opened from disk is recognized by its published version, an in-memory
+        one by identity (the reference kept here prevents id reuse). A republished
+        store replaces the sketches instead of being added on top of the old sales.
+
+        Returns:
+            True if the sketches were rebuilt
+        """
+        if same_store(self.source, comps):
+            return False
+        fresh = PpsfQuantileService(self.compression)
+        fresh.ingest(comps)
+        # Swapped in whole: concurrent readers see either the old or the new sketches
+        self.digests, self.source = fresh.digests, comps
+        return True
+
+    def merged(self, neighborhoods: Iterable[str], property_type: Optional[str] = None) -> TDigest:
+        """One digest for several neighborhoods (e.g. a region), merged from their sketches."""
+        digest = TDigest(self.compression)
+        for neighborhood in neighborhoods:
+            part = self.digests.get(self.key(neighborhood, property_type))
+            if part is not None:
+                digest.merge(part)
+        return digest
+
+    def quartiles(self, neighborhood: str, property_type: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """p25/p50/p75 and sale count for a neighborhood, or None if nothing was ingested for it."""
+        digest = self.digests.get(self.key(neighborhood, property_type))
+        if digest is None or not digest.count:
+            return None
+        p25, p50, p75 = digest.quartiles()
+        return {"p25": p25, "p50": p50, "p75": p75, "count": int(digest.count)}
+
+
+def delta_to_market_pct(subject_ppsf: float, median_ppsf: float) -> float:
+    """Subject ppsf relative to the neighborhood median, in percent."""
+    return (subject_ppsf - median_ppsf) / median_ppsf * 100
+
+
+def market_position(subject_ppsf: float, quartiles: Dict[str, Any]) -> str:
+    if subject_ppsf < quartiles["p25"]:
+        return "Below market (under p25)"
+    if subject_ppsf > quartiles["p75"]:
+        return "Above market (over p75)"
+    return "Within market range (p25-p75)"
+
+
+# Process-wide sketches, seeded from the MLS store on first use by the tools
+ppsf_quantiles = PpsfQuantileService()
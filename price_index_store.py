@@ -0,0 +1,231 @@
+from typing import Dict, Any, BinaryIO, Hashable, Iterator, List, Optional, Sequence, Tuple
+from contextlib import contextmanager
+from functools import lru_cache
+import hashlib
+import json
+import os
+import re
+import threading
+import uuid
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no advisory lock, the re-read still narrows lost index updates to concurrent creations
+    fcntl = None
+
+
+DEFAULT_INDEX_STORE_PATH = os.getenv(
+    "PRICE_INDEX_STORE_PATH", os.path.join(os.path.dirname(__file__), "data", "price_index_store")
+)
+VALUE_DTYPE = np.dtype("<f8")
+
+
+def _file_name(key: Hashable) -> str:
+    """Stable, filesystem-safe file name for a series key."""
+    text = json.dumps(list(key) if isinstance(key, tuple) else key)
+    slug = re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")[:40]
+    return f"{slug}-{hashlib.sha1(text.encode()).hexdigest()[:10]}.f64"
+
+
+class PriceIndexStore:
+    """
+    Append-only monthly values per location, one fixed-width (float64) file per series.
+
+    A value's byte offset is (month - first_month) * 8, so the offset index only
+    records each series' file and first month; the length comes from the file size.
+    Appending a month writes 8 bytes (missing months in between are NaN) and window
+    reads are slices of a read-only memory map.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_STORE_PATH):
+        self.path = path
+        self.index_path = os.path.join(path, "index.json")
+        self.index: Dict[str, Dict[str, Any]] = self._load_index()
+        self._maps: Dict[str, np.memmap] = {}
+        self.lock = threading.Lock()
+
+    def _load_index(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.index_path):
+            return {}
+        with open(self.index_path) as f:
+            return json.load(f)
+
+    def _entry(self, key: Hashable) -> Optional[Dict[str, Any]]:
+        """Index entry of a series, re-reading the index once if another process may have created it."""
+        entry_key = self._entry_key(key)
+        entry = self.index.get(entry_key)
+        if entry is None:
+            self.index = {**self._load_index(), **self.index}
+            entry = self.index.get(entry_key)
+        return entry
+
+    @staticmethod
+    def _entry_key(key: Hashable) -> str:
+        return json.dumps(list(key) if isinstance(key, tuple) else key)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self._entry(key) is not None
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def keys(self) -> List[Any]:
+        return [tuple(json.loads(entry)) if entry.startswith("[") else json.loads(entry) for entry in self.index]
+
+    def _file(self, entry: Dict[str, Any]) -> str:
+        return os.path.join(self.path, entry["file"])
+
+    def length(self, key: Hashable) -> int:
+        """Number of months stored for a series (0 if unknown)."""
+        entry = self._entry(key)
+        if entry is None:
+            return 0
+        return os.path.getsize(self._file(entry)) // VALUE_DTYPE.itemsize
+
+    def last_month(self, key: Hashable) -> Optional[int]:
+        """Month number of the latest stored value, or None."""
+        entry = self._entry(key)
+        if entry is None:
+            return None
+        count = self.length(key)
+        return entry["first_month"] + count - 1 if count else None
+
+    def extend(self, key: Hashable, months: Sequence[int], values: Sequence[float]) -> int:
+        """
+        Append months (ascending, all after the last stored month) with one write.
+
+        Args:
+            key: Series identity, e.g. (location, property_type)
+            months: Month numbers to append
+            values: Values for those months
+
+        Returns:
+            Number of months written, gap fill included
+        """
+        months = np.asarray(months, dtype=np.int64)
+        values = np.asarray(values, dtype=VALUE_DTYPE)
+        if not len(months):
+            return 0
+        if np.any(np.diff(months) <= 0):
+            raise ValueError("Months must be strictly increasing")
+        entry = self._entry(key) or self._create(key, int(months[0]))
+        with self._series_lock(entry) as f:
+            return self._write(entry, f, months, values)
+
+    def append(self, key: Hashable, month: int, value: float) -> None:
+        """Append one month (O(1): an 8-byte write, plus NaN for any skipped months)."""
+        self.extend(key, [month], [value])
+
+    def sync(self, key: Hashable, months: np.ndarray, values: np.ndarray) -> int:
+        """Append the months of a chronological series that are newer than the stored ones."""
+        months = np.asarray(months, dtype=np.int64)
+        values = np.asarray(values, dtype=VALUE_DTYPE)
+        if not len(months):
+            return 0
+        entry = self._entry(key) or self._create(key, int(months[0]))
+        with self._series_lock(entry) as f:
+            # Stored length read under the lock: a concurrent sync cannot append the same months
+            count = os.fstat(f.fileno()).st_size // VALUE_DTYPE.itemsize
+            if count:
+                start = int(np.searchsorted(months, entry["first_month"] + count - 1, side="right"))
+                months, values = months[start:], values[start:]
+            return self._write(entry, f, months, values)
+
+    @contextmanager
+    def _series_lock(self, entry: Dict[str, Any]) -> Iterator[BinaryIO]:
+        """
+        Series file opened for appending, under the thread lock and an exclusive flock.
+
+        The stored length is checked and the block appended inside the same lock, so
+        two writers (threads or processes) never append the same months twice, which
+        would shift every later month off its (month - first_month) * 8 offset.
+        """
+        with self.lock, open(self._file(entry), "ab") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield f
+                # Written out before the lock is released, not when the file is closed
+                f.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _write(entry: Dict[str, Any], f: BinaryIO, months: np.ndarray, values: np.ndarray) -> int:
+        if not len(months):
+            return 0
+        start = entry["first_month"] + os.fstat(f.fileno()).st_size // VALUE_DTYPE.itemsize
+        if months[0] < start:
+            raise ValueError(f"Month {int(months[0])} is already stored (append-only, next month is {start})")
+        block = np.full(int(months[-1]) - start + 1, np.nan, dtype=VALUE_DTYPE)
+        block[months - start] = values
+        f.write(block.tobytes())
+        return len(block)
+
+    def window(self, key: Hashable, months: Optional[int] = None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        The last `months` months of a series as a zero-copy view of the memory map.
+
+        Args:
+            key: Series identity
+            months: Window length (None for the whole series)
+
+        Returns:
+            (month numbers, values) with NaN for months never recorded, or None if unknown
+        """
+        entry_key = self._entry_key(key)
+        entry = self._entry(key)
+        if entry is None:
+            return None
+        count = self.length(key)
+        if not count:
+            return None
+        mapped = self._maps.get(entry_key)
+        if mapped is None or len(mapped) != count:
+            mapped = np.memmap(self._file(entry), dtype=VALUE_DTYPE, mode="r", shape=(count,))
+            self._maps[entry_key] = mapped
+        start = max(count - months, 0) if months else 0
+        return np.arange(entry["first_month"] + start, entry["first_month"] + count), mapped[start:]
+
+    def _create(self, key: Hashable, first_month: int) -> Dict[str, Any]:
+        """
+        Register a new series (the index is only rewritten here, not on appends).
+
+        Other processes share the directory: under a file lock the index is re-read,
+        so a series they created meanwhile is reused rather than overwritten, and
+        the series file is opened in append mode, never truncated.
+        """
+        entry_key = self._entry_key(key)
+        os.makedirs(self.path, exist_ok=True)
+        with self.lock, open(self.index_path + ".lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                merged = {**self.index, **self._load_index()}
+                entry = merged.get(entry_key)
+                if entry is None:
+                    entry = {"file": _file_name(key), "first_month": first_month}
+                    merged[entry_key] = entry
+                    open(self._file(entry), "ab").close()
+                    temporary = f"{self.index_path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+                    try:
+                        with open(temporary, "w") as f:
+                            json.dump(merged, f)
+                        os.replace(temporary, self.index_path)
+                    finally:
+                        if os.path.exists(temporary):
+                            os.remove(temporary)
+                self.index = merged
+                return entry
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+@lru_cache(maxsize=8)
+def get_price_index_store(path: str = DEFAULT_INDEX_STORE_PATH) -> PriceIndexStore:
+    """Process-wide store for a directory (opened once)."""
+    return PriceIndexStore(path)
@@ -0,0 +1,306 @@
+from typing import Dict, Any, Hashable, List, Optional, Tuple
+import pandas as pd
+import numpy as np
+
+try:
+    from .comps_store import ComparablesStore, PROPERTY_TYPE_NAMES, same_store
+    from .ppsf_sketch import ZIP_PATTERN
+except ImportError:
+    from comps_store import ComparablesStore, PROPERTY_TYPE_NAMES, same_store
+    from ppsf_sketch import ZIP_PATTERN
+
+
+# Case-Shiller excludes pairs held less than six months (flips, data errors)
+MIN_HOLD_MONTHS = 6
+# Locations need this many pairs before their index is served
+MIN_PAIRS = 10
+# Appreciation used when no market trend is given and no repeat-sales index covers the subject
+DEFAULT_MARKET_TREND = 0.02
+EPOCH_ORDINAL = 719163  # date(1970, 1, 1).toordinal()
+
+
+def ordinal_months(ordinals: np.ndarray) -> np.ndarray:
+    """Month numbers (year * 12 + month - 1) of proleptic Gregorian ordinals."""
+    days = (np.asarray(ordinals, dtype=np.int64) - EPOCH_ORDINAL).astype("datetime64[D]")
+    return days.astype("datetime64[M]").astype(np.int64) + 1970 * 12
+
+
+def location_keys(address: str) -> List[str]:
+    """Index locations of a sale address: its ZIP code and its city (when present)."""
+    keys = []
+    match = ZIP_PATTERN.search(address or "")
+    if match:
+        keys.append(match.group(1))
+    parts = [part.strip() for part in (address or "").split(",")]
+    if len(parts) > 2 and parts[1]:
+        keys.append(parts[1].lower())
+    return keys
+
+
+def lookup_key(location: str) -> str:
+    """Index location of a query: a ZIP code if it contains one, else its first part (the city)."""
+    match = ZIP_PATTERN.search(location or "")
+    if match:
+        return match.group(1)
+    return (location or "").split(",")[0].strip().lower()
+
+
+class RepeatSalesIndex:
+    """
+    Repeat-sales regression of one location, kept as its normal equations.
+
+    Each pair (bought in month s, sold in month t) is one row of the sparse
+    design with -1 at s and +1 at t against log(p_t / p_s). Its normal matrix
+    is a months x months Laplacian built from pair counts, so adding pairs is
+    O(pairs) and solving is a small dense system whatever the number of pairs.
+    """
+
+    def __init__(self, first_month: int):
+        self.first_month = first_month
+        self.gram = np.zeros((0, 0))
+        self.rhs = np.zeros(0)
+        # Per-month count and sum of log prices of all sales, to anchor the index in dollars
+        self.sale_count = np.zeros(0)
+        self.sale_log_sum = np.zeros(0)
+        self.pairs = 0
+        self._solution: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+
+    def _cover(self, first: int, last: int) -> None:
+        """Grow the month axis to include [first, last]."""
+        before = max(self.first_month - first, 0)
+        after = max(last - (self.first_month + len(self.rhs) - 1), 0)
+        if not before and not after:
+            return
+        self.gram = np.pad(self.gram, ((before, after), (before, after)))
+        self.rhs = np.pad(self.rhs, (before, after))
+        self.sale_count = np.pad(self.sale_count, (before, after))
+        self.sale_log_sum = np.pad(self.sale_log_sum, (before, after))
+        self.first_month -= before
+
+    def add_pairs(self, first_months: np.ndarray, second_months: np.ndarray, log_returns: np.ndarray) -> None:
+        """Accumulate sale pairs (earlier month, later month, log price change)."""
+        if not len(log_returns):
+            return
+        self._cover(int(first_months.min()), int(second_months.max()))
+        s = first_months - self.first_month
+        t = second_months - self.first_month
+        size = len(self.rhs)
+        self.gram += (
+            np.bincount(s * size + s, minlength=size * size)
+            + np.bincount(t * size + t, minlength=size * size)
+            - np.bincount(s * size + t, minlength=size * size)
+            - np.bincount(t * size + s, minlength=size * size)
+        ).reshape(size, size)
+        self.rhs += np.bincount(t, weights=log_returns, minlength=size) - np.bincount(s, weights=log_returns, minlength=size)
+        self.pairs += len(log_returns)
+        self._solution = None
+
+    def add_sales(self, months: np.ndarray, log_prices: np.ndarray) -> None:
+        """Accumulate sales (paired or not) used to express the index as a price level."""
+        if not len(months):
+            return
+        self._cover(int(months.min()), int(months.max()))
+        offsets = months - self.first_month
+        self.sale_count += np.bincount(offsets, minlength=len(self.rhs))
+        self.sale_log_sum += np.bincount(offsets, weights=log_prices, minlength=len(self.rhs))
+        self._solution = None
+
+    def solve(self) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Monthly index from the first to the last month with pairs.
+
+        Returns:
+            (month numbers, index with 100 at the first month, constant-quality price level), or None
+        """
+        if self._solution is not None:
+            return self._solution
+        observed = np.flatnonzero(np.diag(self.gram) > 0)
+        if self.pairs < MIN_PAIRS or len(observed) < 2:
+            return None
+        # The first observed month is the base (log index 0); solve for the others
+        free = observed[1:]
+        log_index = np.zeros(len(self.rhs))
+        log_index[free] = np.linalg.lstsq(self.gram[np.ix_(free, free)], self.rhs[free], rcond=None)[0]
+
+        # Months between observed ones are interpolated in logs
+        span = np.arange(observed[0], observed[-1] + 1)
+        log_index = np.interp(span, observed, log_index[observed])
+
+        # Level: mean log price of the location's sales once deflated by the index
+        count = self.sale_count[span]
+        if count.sum():
+            level = (self.sale_log_sum[span].sum() - np.dot(count, log_index)) / count.sum()
+        else:
+            level = 0.0
+        self._solution = (span + self.first_month, 100 * np.exp(log_index), np.exp(level + log_index))
+        return self._solution
+
+
+class RepeatSalesBuilder:
+    """
+    Repeat-sales indexes per (location, property type), built incrementally by closed month.
+
+    Each update only reads sales of months after the last processed one and
+    pairs them with the previous sale of the same address (kept in a last-sale
+    table), so a new month costs the new sales, not the history.
+    """
+
+    def __init__(self, min_hold_months: int = MIN_HOLD_MONTHS):
+        self.min_hold_months = min_hold_months
+        self.indexes: Dict[Hashable, RepeatSalesIndex] = {}
+        self.last_sales = pd.DataFrame({
+            "address": pd.Series(dtype=object),
+            "ordinal": pd.Series(dtype=np.int64),
+            "month": pd.Series(dtype=np.int64),
+            "log_price": pd.Series(dtype=float),
+        })
+        self.through_month: Optional[int] = None
+        # Store of the last update (compared by published version, see comps_store.same_store)
+        self._seen: Optional[ComparablesStore] = None
+
+    @staticmethod
+    def key(location: str, property_type: Optional[str] = None) -> Tuple[str, str]:
+        return (lookup_key(location), str(property_type or "residential").strip().lower())
+
+    def _index(self, key: Hashable, first_month: int) -> RepeatSalesIndex:
+        index = self.indexes.get(key)
+        if index is None:
+            index = RepeatSalesIndex(first_month)
+            self.indexes[key] = index
+        return index
+
+    def update(self, comps: ComparablesStore, through_month: Optional[int] = None) -> int:
+        """
+        Add the sales of months after the last processed one, up to through_month.
+
+        Args:
+            comps: Comparable sales history (address, sale_date, sale_price, property_type)
+            through_month: Last month to process (defaults to the month before the latest
+                sale, the latest month still being incomplete)
+
+        Returns:
+            Number of sale pairs added
+        """
+        if same_store(self._seen, comps) and through_month is None:
+            return 0
+        self._seen = comps
+        ordinals = np.asarray(comps["sale_date"], dtype=np.int64)
+        prices = np.asarray(comps["sale_price"], dtype=float)
+        valid = (ordinals > 0) & (prices > 0)
+        if not valid.any():
+            return 0
+        months = ordinal_months(np.where(valid, ordinals, EPOCH_ORDINAL))
+        if through_month is None:
+            through_month = int(months[valid].max()) - 1
+        new = valid & (months <= through_month)
+        if self.through_month is not None:
+            new &= months > self.through_month
+        rows = np.flatnonzero(new)
+        if not len(rows):
+            return 0
+
+        # Normalized address and index locations, computed once per distinct address
+        codes, addresses = pd.factorize(pd.Series(np.asarray(comps["address"], dtype=object)[rows]).fillna(""))
+        normalized = np.array([" ".join(address.lower().split()) for address in addresses], dtype=object)
+        type_names = np.array(
+            [PROPERTY_TYPE_NAMES.get(code, "residential") for code in np.asarray(comps["property_type"])[rows].tolist()],
+            dtype=object,
+        )
+        sales = pd.DataFrame({
+            "address": normalized[codes],
+            "ordinal": ordinals[rows],
+            "month": months[rows],
+            "log_price": np.log(prices[rows]),
+            "property_type": type_names,
+            "new": True,
+        })
+        sales = sales[sales["address"] != ""]
+
+        combined = pd.concat([self.last_sales.assign(new=False), sales.drop(columns="property_type")], ignore_index=True)
+        combined = combined.sort_values(["address", "ordinal"], kind="stable")
+        address = combined["address"].to_numpy()
+        month = combined["month"].to_numpy(dtype=np.int64)
+        log_price = combined["log_price"].to_numpy(dtype=float)
+        is_new = combined["new"].to_numpy(dtype=bool)
+        # Consecutive sales of one address whose later sale is new form a pair
+        paired = (address[1:] == address[:-1]) & is_new[1:] & (month[1:] - month[:-1] >= self.min_hold_months)
+        second = np.flatnonzero(paired) + 1
+        pairs = pd.DataFrame({
+            "address": address[second],
+            "first_month": month[second - 1],
+            "second_month": month[second],
+            "log_return": log_price[second] - log_price[second - 1],
+        })
+        self.last_sales = combined.drop_duplicates("address", keep="last").drop(columns="new").reset_index(drop=True)
+
+        # Pairs and sales take the location of the address and the type of the new sale
+        address_types = sales.drop_duplicates("address", keep="last").set_index("address")["property_type"]
+        unique_addresses = pd.unique(np.concatenate([pairs["address"].to_numpy(), sales["address"].to_numpy()]))
+        address_locations = pd.Series(
+            [location_keys(address) for address in unique_addresses], index=unique_addresses, dtype=object
+        )
+        pairs["property_type"] = pairs["address"].map(address_types).fillna("residential")
+        pairs["location"] = pairs["address"].map(address_locations)
+        sales["location"] = sales["address"].map(address_locations)
+
+        for (location, property_type), group in pairs.explode("location").dropna(subset=["location"]).groupby(["location", "property_type"], sort=False):
+            first_months = group["first_month"].to_numpy(dtype=np.int64)
+            self._index((location, property_type), int(first_months.min())).add_pairs(
+                first_months, group["second_month"].to_numpy(dtype=np.int64), group["log_return"].to_numpy()
+            )
+        for (location, property_type), group in sales.explode("location").dropna(subset=["location"]).groupby(["location", "property_type"], sort=False):
+            sale_months = group["month"].to_numpy(dtype=np.int64)
+            self._index((location, property_type), int(sale_months.min())).add_sales(sale_months, group["log_price"].to_numpy())
+
+        self.through_month = max(through_month, self.through_month or through_month)
+        return len(pairs)
+
+    def series(self, location: str, property_type: Optional[str] = None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(month numbers, constant-quality price level) of a location, or None without enough pairs."""
+        index = self.indexes.get(self.key(location, property_type))
+        solution = index.solve() if index is not None else None
+        if solution is None:
+            return None
+        return solution[0], solution[2]
+
+    def annual_appreciation(self, location: str, property_type: Optional[str] = None) -> Optional[float]:
+        """Index change over the last 12 months (decimal), or None."""
+        index = self.indexes.get(self.key(location, property_type))
+        solution = index.solve() if index is not None else None
+        if solution is None or len(solution[1]) < 13:
+            return None
+        return float(solution[1][-1] / solution[1][-13] - 1)
+
+    def summary(self, location: str, property_type: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        index = self.indexes.get(self.key(location, property_type))
+        if index is None or index.solve() is None:
+            return None
+        return {"pairs": index.pairs, "months": len(index.solve()[0])}
+
+
+# Process-wide builder, fed from the MLS store by the tools
+repeat_sales = RepeatSalesBuilder()
+
+
+def resolve_market_trend(
+    market_trend: Optional[float],
+    property_address: Optional[str],
+    builder: Optional[RepeatSalesBuilder] = None,
+) -> Tuple[float, str]:
+    """
+    Market trend of a valuation, shared by avm_engine, avm_engine_batch and avm_engine_sweep.
+
+    Args:
+        market_trend: Rate given by the caller (used as-is when not None)
+        property_address: Subject address, to find its repeat-sales index
+        builder: Repeat-sales indexes (defaults to the process-wide builder)
+
+    Returns:
+        (annual appreciation rate, source: provided / repeat_sales_index / default)
+    """
+    if market_trend is not None:
+        return float(market_trend), "provided"
+    appreciation = (builder or repeat_sales).annual_appreciation(property_address) if property_address else None
+    if appreciation is not None:
+        return appreciation, "repeat_sales_index"
+    return DEFAULT_MARKET_TREND, "default"
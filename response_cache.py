@@ -0,0 +1,134 @@
+from typing import Dict, Any, Callable, Optional, Tuple
+from collections import OrderedDict
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+
+
+# Seconds a response stays valid, per tool
+DEFAULT_TOOL_TTLS = {
+    "mls_integration": 900,
+    "market_trend_analyzer": 3600,
+    "market_monitor": 300,
+}
+DEFAULT_TTL = 600
+DEFAULT_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", "1024"))
+
+
+def normalize_argument(value: Any) -> Any:
+    """
+    Canonical form of an argument: tuples for sequences, sorted dicts, integral floats as ints.
+
+    Strings are kept as given: tools match addresses case-sensitively and echo
+    their arguments, so two spellings are two different responses.
+    """
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, (list, tuple)):
+        return tuple(normalize_argument(item) for item in value)
+    if isinstance(value, dict):
+        return tuple(sorted((str(key), normalize_argument(item)) for key, item in value.items()))
+    return value
+
+
+class ResponseCache:
+    """
+    Tool responses keyed by tool name and normalized arguments, with per-tool
+    TTLs and least-recently-used eviction beyond max_entries.
+
+    Shared by every agent of a pipeline run, so a repeated call (same location,
+    same parameters) costs one dictionary lookup. Cached responses are shared
+    objects and must not be mutated by callers.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttls: Optional[Dict[str, float]] = None):
+        self.max_entries = max_entries
+        self.ttls = dict(DEFAULT_TOOL_TTLS if ttls is None else ttls)
+        self.entries: "OrderedDict[Tuple[str, str], Tuple[float, Any]]" = OrderedDict()
+        self.counters: Dict[str, Dict[str, int]] = {}
+        self.lock = threading.Lock()
+
+    def _count(self, name: str, counter: str) -> None:
+        counts = self.counters.get(name)
+        if counts is None:
+            counts = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0}
+            self.counters[name] = counts
+        counts[counter] += 1
+
+    def get(self, name: str, key: str) -> Tuple[bool, Any]:
+        """(found, response) for a key; expired entries are dropped and count as misses."""
+        with self.lock:
+            entry = self.entries.get((name, key))
+            if entry is not None:
+                if entry[0] > time.monotonic():
+                    self.entries.move_to_end((name, key))
+                    self._count(name, "hits")
+                    return True, entry[1]
+                del self.entries[(name, key)]
+                self._count(name, "expired")
+            self._count(name, "misses")
+            return False, None
+
+    def put(self, name: str, key: str, response: Any) -> None:
+        with self.lock:
+            self.entries[(name, key)] = (time.monotonic() + self.ttls.get(name, DEFAULT_TTL), response)
+            self.entries.move_to_end((name, key))
+            while len(self.entries) > self.max_entries:
+                evicted_name, _ = self.entries.popitem(last=False)[0]
+                self._count(evicted_name, "evicted")
+
+    def clear(self, name: Optional[str] = None) -> None:
+        """Drop every entry, or only one tool's."""
+        with self.lock:
+            if name is None:
+                self.entries.clear()
+            else:
+                for key in [key for key in self.entries if key[0] == name]:
+                    del self.entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/expired/evicted counters and hit rate per tool, plus the current size."""
+        with self.lock:
+            tools = {}
+            for name, counts in self.counters.items():
+                lookups = counts["hits"] + counts["misses"]
+                tools[name] = {**counts, "hit_rate": round(counts["hits"] / lookups, 3) if lookups else 0.0}
+            return {"entries": len(self.entries), "max_entries": self.max_entries, "tools": tools}
+
+    def cached(self, name: str) -> Callable[[Callable], Callable]:
+        """
+        Decorator caching a tool function's responses (apply below @tool).
+
+        Arguments are bound to the signature with defaults applied before
+        normalization, so positional, keyword and default-valued calls share entries.
+        Error responses ({"error": ...}) are not cached.
+        """
+        def decorator(function: Callable) -> Callable:
+            signature = inspect.signature(function)
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                key = json.dumps(
+                    [[argument, normalize_argument(value)] for argument, value in bound.arguments.items()],
+                    default=str,
+                )
+                found, response = self.get(name, key)
+                if found:
+                    return response
+                response = function(*args, **kwargs)
+                if not (isinstance(response, dict) and "error" in response):
+                    self.put(name, key, response)
+                return response
+
+            return wrapper
+
+        return decorator
+
+
+# Process-wide cache shared by the agents of a pipeline run
+tool_response_cache = ResponseCache()
@@ -2,15 +2,129 @@ from agno.tools import tool
 from typing import Dict, Any, List, Optional
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import datetime
 import json
 
+try:
+    from .hedonic_model import hedonic_cache
+    from .comps_store import ComparablesStore, PROPERTY_TYPE_CODES, as_comps_store, open_shared_store
+    from .comps_index import get_geo_index, select_rows, count_in_range, top_k_similar, locate_subject, get_address_index, data_as_of, DEFAULT_SIMILARITY_WEIGHTS
+    from .avm_batch import avm_engine_sweep
+    from .avm_bootstrap import bootstrap_valuation_bands
+    from .comps_adjustments import DEFAULT_ADJUSTMENT_FACTORS, adjustment_tensor, summarize_adjustments, confidence_label
+    from .market_series import get_price_series, simulated_series, series_key, month_labels, cycle_phase, volatility_level, price_matrix, matrix_statistics, MIN_TREND_MONTHS
+    from .market_trend_state import TrendState, trend_states
+    from .market_forecast import FORECAST_HORIZONS, FIT_WINDOW, holt_winters_cache, holt_winters_forecast
+    from .ppsf_sketch import ppsf_quantiles, delta_to_market_pct, market_position
+    from .listing_events import listing_signals
+    from .response_cache import tool_response_cache
+    from .repeat_sales import RepeatSalesBuilder, repeat_sales, resolve_market_trend
+    from .market_alerts import INDICATORS, INDICATOR_CATEGORY, SEVERITIES, load_rules, load_indicator_matrix, overall_risk
+except ImportError:
+    from hedonic_model import hedonic_cache
+    from comps_store import ComparablesStore, PROPERTY_TYPE_CODES, as_comps_store, open_shared_store
+    from comps_index import get_geo_index, select_rows, count_in_range, top_k_similar, locate_subject, get_address_index, data_as_of, DEFAULT_SIMILARITY_WEIGHTS
+    from avm_batch import avm_engine_sweep
+    from avm_bootstrap import bootstrap_valuation_bands
+    from comps_adjustments import DEFAULT_ADJUSTMENT_FACTORS, adjustment_tensor, summarize_adjustments, confidence_label
+    from market_series import get_price_series, simulated_series, series_key, month_labels, cycle_phase, volatility_level, price_matrix, matrix_statistics, MIN_TREND_MONTHS
+    from market_trend_state import TrendState, trend_states
+    from market_forecast import FORECAST_HORIZONS, FIT_WINDOW, holt_winters_cache, holt_winters_forecast
+    from ppsf_sketch import ppsf_quantiles, delta_to_market_pct, market_position
+    from listing_events import listing_signals
+    from response_cache import tool_response_cache
+    from repeat_sales import RepeatSalesBuilder, repeat_sales, resolve_market_trend
+    from market_alerts import INDICATORS, INDICATOR_CATEGORY, SEVERITIES, load_rules, load_indicator_matrix, overall_risk
+
+
+# Simulated MLS data - in production, this would connect to actual MLS API
+SIMULATED_COMPARABLE_SALES = [
+    {
+        "address": "123 Main St, Sample City, ST 12345",
+        "sale_price": 450000,
+        "sale_date": "2024-01-15",
+        "sqft": 2200,
+        "bedrooms": 3,
+        "bathrooms": 2.5,
+        "lot_size": 0.25,
+        "year_built": 2010,
+        "condition": "Good",
+        "property_type": "residential",
+        "days_on_market": 45,
+        "price_per_sqft": 204.55,
+        "latitude": 40.01520,
+        "longitude": -75.13210
+    },
+    {
+        "address": "456 Oak Ave, Sample City, ST 12345",
+        "sale_price": 485000,
+        "sale_date": "2024-02-20",
+        "sqft": 2400,
+        "bedrooms": 4,
+        "bathrooms": 3,
+        "lot_size": 0.3,
+        "year_built": 2015,
+        "condition": "Excellent",
+        "property_type": "residential",
+        "days_on_market": 28,
+        "price_per_sqft": 202.08,
+        "latitude": 40.01985,
+        "longitude": -75.12870
+    },
+    {
+        "address": "789 Pine Rd, Sample City, ST 12345",
+        "sale_price": 420000,
+        "sale_date": "2023-12-10",
+        "sqft": 2000,
+        "bedrooms": 3,
+        "bathrooms": 2,
+        "lot_size": 0.2,
+        "year_built": 2008,
+        "condition": "Fair",
+        "property_type": "residential",
+        "days_on_market": 67,
+        "price_per_sqft": 210.00,
+        "latitude": 40.01210,
+        "longitude": -75.13650
+    }
+]
+SIMULATED_COMPS_STORE = ComparablesStore.from_records(SIMULATED_COMPARABLE_SALES)
+
+
+def get_mls_store() -> ComparablesStore:
+    """
+    Comparable sales backing mls_integration.
+
+    Returns:
+        The shared memory-mapped store (COMPS_STORE_PATH) if one was saved, else the simulated sample
+    """
+    return open_shared_store() or SIMULATED_COMPS_STORE
+
+
+def nan_mean(values: np.ndarray) -> float:
+    """Mean of the non-missing values (0 when all are missing, as for an empty result)."""
+    values = np.asarray(values, dtype=float)
+    present = values[~np.isnan(values)]
+    return float(present.mean()) if len(present) else 0.0
+
+
+def seed_ppsf_quantiles(comps: ComparablesStore) -> None:
+    """Build the neighborhood ppsf sketches from a store (rebuilt when a new version is published)."""
+    ppsf_quantiles.sync_store(comps)
+
+
+def repeat_sales_index() -> RepeatSalesBuilder:
+    """Repeat-sales indexes, updated with the closed months of the MLS store not yet processed."""
+    repeat_sales.update(get_mls_store())
+    return repeat_sales
+
 
 @tool(
     name="mls_integration",
     description="Access Multiple Listing Service data for property information and comparable sales",
     show_result=True,
 )
+@tool_response_cache.cached("mls_integration")
 def mls_integration(
     property_address: str,
     property_type: str = "residential",
@@ -20,6 +134,8 @@ def mls_integration(
     max_sqft: Optional[int] = None,
     min_bedrooms: Optional[int] = None,
     max_bedrooms: Optional[int] = None,
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
 ) -> Dict[str, Any]:
     """
     Access MLS data for property information and comparable sales analysis.
@@ -28,79 +144,87 @@ def mls_integration(
         property_address: Address of the subject property
         property_type: Type of property (residential/commercial/land)
         search_radius: Search radius in miles
-        days_back: Number of days back to search for sales
+        days_back: Number of days back to search for sales (counted from the latest sale in the data;
+            sales without a date are kept and counted in search_criteria.undated_comparables)
         min_sqft: Minimum square footage filter
         max_sqft: Maximum square footage filter
         min_bedrooms: Minimum number of bedrooms
         max_bedrooms: Maximum number of bedrooms
+        latitude: Subject latitude (looked up from the address when omitted)
+        longitude: Subject longitude (looked up from the address when omitted)
         
     Returns:
         Dictionary containing MLS data and comparable sales
     """
-    # Simulated MLS data - in production, this would connect to actual MLS API
-    comparable_sales = [
-        {
-            "address": "123 Main St, Sample City, ST 12345",
-            "sale_price": 450000,
-            "sale_date": "2024-01-15",
-            "sqft": 2200,
-            "bedrooms": 3,
-            "bathrooms": 2.5,
-            "lot_size": 0.25,
-            "year_built": 2010,
-            "condition": "Good",
-            "days_on_market": 45,
-            "price_per_sqft": 204.55
-        },
-        {
-            "address": "456 Oak Ave, Sample City, ST 12345",
-            "sale_price": 485000,
-            "sale_date": "2024-02-20",
-            "sqft": 2400,
-            "bedrooms": 4,
-            "bathrooms": 3,
-            "lot_size": 0.3,
-            "year_built": 2015,
-            "condition": "Excellent",
-            "days_on_market": 28,
-            "price_per_sqft": 202.08
-        },
-        {
-            "address": "789 Pine Rd, Sample City, ST 12345",
-            "sale_price": 420000,
-            "sale_date": "2023-12-10",
-            "sqft": 2000,
-            "bedrooms": 3,
-            "bathrooms": 2,
-            "lot_size": 0.2,
-            "year_built": 2008,
-            "condition": "Fair",
-            "days_on_market": 67,
-            "price_per_sqft": 210.00
-        }
-    ]
+    comps = get_mls_store()
     
-    # Filter comparables based on criteria
-    filtered_comps = []
-    for comp in comparable_sales:
-        if min_sqft and comp["sqft"] < min_sqft:
-            continue
-        if max_sqft and comp["sqft"] > max_sqft:
-            continue
-        if min_bedrooms and comp["bedrooms"] < min_bedrooms:
-            continue
-        if max_bedrooms and comp["bedrooms"] > max_bedrooms:
-            continue
-        filtered_comps.append(comp)
-    
-    # Calculate market statistics
-    if filtered_comps:
-        avg_price_per_sqft = sum(comp["price_per_sqft"] for comp in filtered_comps) / len(filtered_comps)
-        avg_days_on_market = sum(comp["days_on_market"] for comp in filtered_comps) / len(filtered_comps)
+    # Radius + recency through the geo index (recency only if the subject can't be located)
+    as_of = data_as_of(comps)
+    min_sale_ordinal = as_of.toordinal() - days_back if days_back else 0
+    if latitude is not None and longitude is not None:
+        center = {"latitude": latitude, "longitude": longitude}
+    else:
+        center = locate_subject(comps, property_address)
+    
+    # Attribute ranges resolved by bisection on the sorted column indexes
+    ranges = {}
+    if min_sqft or max_sqft:
+        ranges["sqft"] = (min_sqft or -np.inf, max_sqft or np.inf)
+    if min_bedrooms or max_bedrooms:
+        ranges["bedrooms"] = (min_bedrooms or -np.inf, max_bedrooms or np.inf)
+    type_code = PROPERTY_TYPE_CODES.get((property_type or "").lower())
+    # Sales of unknown type (code 0, e.g. a store without a property_type column) match any type
+    untyped = type_code and count_in_range(comps, "property_type", 0, 0)
+    if type_code and not untyped:
+        ranges["property_type"] = (type_code, type_code)
+    
+    # Sales without a date (ordinal 0) are kept by the recency cut and reported as undated
+    undated = min_sale_ordinal and count_in_range(comps, "sale_date", 0, 0)
+    
+    distances = None
+    if center and search_radius:
+        hits = get_geo_index(comps).query(
+            comps, center["latitude"], center["longitude"], search_radius, 0 if undated else min_sale_ordinal
+        )
+        rows = select_rows(comps, ranges, candidates=hits["rows"])
+        distances = hits["distance_miles"][np.searchsorted(hits["rows"], rows)]
+    else:
+        if min_sale_ordinal and not undated:
+            ranges["sale_date"] = (min_sale_ordinal, np.inf)
+        rows = select_rows(comps, ranges)
+    
+    # The subject's own sales are not comparables for it
+    keep = ~np.isin(rows, get_address_index(comps).rows(property_address))
+    if untyped:
+        types = np.asarray(comps["property_type"])[rows]
+        keep &= (types == type_code) | (types == 0)
+    if undated:
+        dates = np.asarray(comps["sale_date"])[rows]
+        keep &= (dates >= min_sale_ordinal) | (dates == 0)
+    if not keep.all():
+        rows = rows[keep]
+        if distances is not None:
+            distances = distances[keep]
+    undated_count = int((np.asarray(comps["sale_date"])[rows] == 0).sum())
+    
+    filtered = comps.take(rows)
+    filtered_comps = filtered.to_records()
+    if distances is not None:
+        filtered_comps = [
+            {**comp, "distance_miles": round(float(distance), 2)}
+            for comp, distance in zip(filtered_comps, distances)
+        ]
+    
+    # Calculate market statistics from the filtered columns
+    if len(filtered):
+        sale_prices = filtered["sale_price"]
+        avg_price_per_sqft = nan_mean(filtered["price_per_sqft"])
+        avg_days_on_market = nan_mean(filtered["days_on_market"])
+        middle = len(sale_prices) // 2
         price_range = {
-            "min": min(comp["sale_price"] for comp in filtered_comps),
-            "max": max(comp["sale_price"] for comp in filtered_comps),
-            "median": sorted([comp["sale_price"] for comp in filtered_comps])[len(filtered_comps)//2]
+            "min": float(sale_prices.min()),
+            "max": float(sale_prices.max()),
+            "median": float(np.partition(sale_prices, middle)[middle])
         }
     else:
         avg_price_per_sqft = 0
@@ -113,7 +237,11 @@ def mls_integration(
             "property_type": property_type,
             "search_criteria": {
                 "radius_miles": search_radius,
+                "radius_applied": distances is not None,
+                "center": center,
                 "days_back": days_back,
+                "as_of_date": as_of.strftime("%Y-%m-%d"),
+                "undated_comparables": undated_count,
                 "sqft_range": [min_sqft, max_sqft],
                 "bedroom_range": [min_bedrooms, max_bedrooms]
             }
@@ -129,6 +257,91 @@ def mls_integration(
     }
 
 
+@tool(
+    name="similar_comps_selector",
+    description="Select the k comparable sales most similar to a subject property, with similarity weights for avm_engine",
+    show_result=True,
+)
+def similar_comps_selector(
+    property_address: str,
+    property_sqft: int,
+    bedrooms: int,
+    bathrooms: float,
+    lot_size: float,
+    year_built: int,
+    condition: str,
+    k: int = 10,
+    search_radius: Optional[float] = None,
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
+    similarity_weights: Optional[Dict[str, float]] = None,
+) -> Dict[str, Any]:
+    """
+    Rank comparable sales by weighted distance to the subject and keep the top k.
+    
+    Args:
+        property_address: Address of the subject property
+        property_sqft: Square footage of the property
+        bedrooms: Number of bedrooms
+        bathrooms: Number of bathrooms
+        lot_size: Lot size in acres
+        year_built: Year the property was built
+        condition: Property condition (Excellent/Good/Fair/Poor)
+        k: Number of comparables to keep
+        search_radius: Only consider sales within this many miles (optional)
+        latitude: Subject latitude (looked up from the address when omitted)
+        longitude: Subject longitude (looked up from the address when omitted)
+        similarity_weights: Per-field weights (sqft, bedrooms, bathrooms, lot_size, age, condition, distance, recency)
+        
+    Returns:
+        Dictionary containing the selected comparables, each with similarity_score and
+        similarity_weight (pass them unchanged to avm_engine for similarity-weighted valuation)
+    """
+    comps = get_mls_store()
+    if latitude is not None and longitude is not None:
+        center = {"latitude": latitude, "longitude": longitude}
+    else:
+        center = locate_subject(comps, property_address)
+    
+    candidates = None
+    if center and search_radius:
+        candidates = get_geo_index(comps).query(comps, center["latitude"], center["longitude"], search_radius)["rows"]
+    # The subject's own sales are not comparables for it
+    subject_rows = get_address_index(comps).rows(property_address)
+    if len(subject_rows):
+        candidates = np.setdiff1d(np.arange(len(comps)) if candidates is None else candidates, subject_rows)
+    
+    subject = {
+        "sqft": property_sqft,
+        "bedrooms": bedrooms,
+        "bathrooms": bathrooms,
+        "lot_size": lot_size,
+        "year_built": year_built,
+        "condition": condition,
+        **(center or {})
+    }
+    selection = top_k_similar(comps, subject, k=k, weights=similarity_weights, candidates=candidates)
+    
+    selected_comps = [
+        {**comp, "similarity_score": round(float(similarity), 4), "similarity_weight": round(float(weight), 4)}
+        for comp, similarity, weight in zip(
+            comps.take(selection["rows"]).to_records(), selection["similarity"], selection["weight"]
+        )
+    ]
+    
+    return {
+        "subject_property": {"address": property_address, **subject},
+        "comparable_sales": selected_comps,
+        "selection": {
+            "k": k,
+            "candidates_considered": len(comps) if candidates is None else len(candidates),
+            "search_radius": search_radius if candidates is not None else None,
+            "weights": {**DEFAULT_SIMILARITY_WEIGHTS, **(similarity_weights or {})}
+        },
+        "analysis_date": datetime.now().isoformat()
+    }
+
+
 @tool(
     name="avm_engine",
     description="Automated Valuation Model for property pricing using multiple methodologies",
@@ -143,7 +356,11 @@ def avm_engine(
     year_built: int,
     condition: str,
     comparable_sales: List[Dict[str, Any]],
-    market_trend: float = 0.02,
+    market_trend: Optional[float] = None,
+    market_segment: Optional[str] = None,
+    bootstrap_resamples: int = 0,
+    seed: Optional[int] = None,
+    bootstrap_workers: Optional[int] = None,
 ) -> Dict[str, Any]:
     """
     Automated Valuation Model for property pricing using multiple methodologies.
@@ -156,8 +373,14 @@ def avm_engine(
         lot_size: Lot size in acres
         year_built: Year the property was built
         condition: Property condition (Excellent/Good/Fair/Poor)
-        comparable_sales: List of comparable sales data
-        market_trend: Market appreciation rate (decimal)
+        comparable_sales: List of comparable sales data (similarity_weight fields, if present on every comp, weight the averages)
+        market_trend: Market appreciation rate (decimal); defaults to the last 12 months of the
+            repeat-sales index of the subject's ZIP code, else 0.02
+        market_segment: Market segment key (e.g. zip + property type) for the cached regression fit
+        bootstrap_resamples: If > 0, resample the comps this many times for P10/P50/P90 valuation bands
+        seed: Random seed of the bootstrap (for reproducible bands)
+        bootstrap_workers: Worker processes of the bootstrap (1 in-process; default: a process pool
+            for large comps x resamples, same bands for a given seed)
         
     Returns:
         Dictionary containing AVM valuation results
@@ -165,42 +388,23 @@ def avm_engine(
     if not comparable_sales:
         return {"error": "No comparable sales data provided"}
     
-    # Extract comparable data with error handling
+    # Read comparable data as columns (parsed once when given a list of dicts)
     try:
-        comp_prices = [comp.get("sale_price", 0) for comp in comparable_sales]
-        comp_sqft = [comp.get("sqft", 0) for comp in comparable_sales]
-        
-        # Handle sale dates with different formats
-        comp_dates = []
-        for comp in comparable_sales:
-            sale_date = comp.get("sale_date")
-            if sale_date:
-                try:
-                    if isinstance(sale_date, str):
-                        comp_dates.append(datetime.strptime(sale_date, "%Y-%m-%d"))
-                    else:
-                        comp_dates.append(sale_date)
-                except ValueError:
-                    # Try alternative date format
-                    try:
-                        comp_dates.append(datetime.strptime(sale_date, "%m/%d/%Y"))
-                    except ValueError:
-                        comp_dates.append(datetime.now())  # Default to current date
-            else:
-                comp_dates.append(datetime.now())  # Default to current date
+        comps = as_comps_store(comparable_sales)
+        # Similarity weights from similar_comps_selector (equal weighting otherwise)
+        comp_weights = comps.comp_weights()
         
         # Method 1: Price per Square Foot
-        price_per_sqft_values = []
-        for comp in comparable_sales:
-            if comp.get("price_per_sqft"):
-                price_per_sqft_values.append(comp["price_per_sqft"])
-            elif comp.get("sale_price") and comp.get("sqft"):
-                price_per_sqft_values.append(comp["sale_price"] / comp["sqft"])
+        price_per_sqft = np.asarray(comps["price_per_sqft"])
+        has_price_per_sqft = ~np.isnan(price_per_sqft)
         
-        if not price_per_sqft_values:
+        if not has_price_per_sqft.any():
             return {"error": "No valid price per square foot data available"}
             
-        avg_price_per_sqft = sum(price_per_sqft_values) / len(price_per_sqft_values)
+        avg_price_per_sqft = float(np.average(
+            price_per_sqft[has_price_per_sqft],
+            weights=None if comp_weights is None else comp_weights[has_price_per_sqft]
+        ))
         
     except Exception as e:
         return {"error": f"Error processing comparable sales data: {str(e)}"}
@@ -215,66 +419,46 @@ def avm_engine(
     condition_adj = condition_multipliers.get(condition, 1.0)
     
     # Adjust for age
-    current_year = datetime.now().year
+    now = datetime.now()
+    current_year = now.year
     age = current_year - year_built
     age_adj = max(0.85, 1.0 - (age * 0.005))  # 0.5% depreciation per year, minimum 85%
     
-    # Adjust for market trend with error handling
-    if comp_dates:
-        days_since_sale = [(datetime.now() - date).days for date in comp_dates]
-        avg_days_since_sale = sum(days_since_sale) / len(days_since_sale)
-        market_adj = (1 + market_trend) ** (avg_days_since_sale / 365)
-    else:
-        market_adj = 1.0  # No adjustment if no date data
+    # Adjust for market trend (missing sale dates count as today)
+    # The repeat-sales indexes are only brought up to date when they are used
+    trend_index = repeat_sales_index() if market_trend is None else None
+    market_trend, trend_source = resolve_market_trend(market_trend, property_address, trend_index)
+    avg_days_since_sale = float(np.average(comps.days_since_sale(now), weights=comp_weights))
+    market_adj = (1 + market_trend) ** (avg_days_since_sale / 365)
     
     # Calculate price per sqft valuation
     price_per_sqft_valuation = property_sqft * avg_price_per_sqft * condition_adj * age_adj * market_adj
     
-    # Method 2: Regression Analysis (simplified)
-    # Create features matrix with error handling
-    features = []
-    for comp in comparable_sales:
-        features.append([
-            comp.get("sqft", 0),
-            comp.get("bedrooms", 0),
-            comp.get("bathrooms", 0),
-            comp.get("lot_size", 0),
-            current_year - comp.get("year_built", current_year)
-        ])
-    
-    # Simple linear regression coefficients (in production, use sklearn)
-    coefficients = [150, 5000, 10000, 20000, -500]  # [sqft, bedrooms, bathrooms, lot_size, age]
-    intercept = 50000
+    # Method 2: Regression Analysis
+    # Least-squares hedonic fit on the comps, cached by segment + comps fingerprint
+    regression_fit = hedonic_cache.get(comps, segment_key=market_segment, current_year=current_year)
+    coefficients = regression_fit["coefficients"]  # [sqft, bedrooms, bathrooms, lot_size, age]
+    intercept = regression_fit["intercept"]
     
     # Calculate regression valuation
     subject_features = [property_sqft, bedrooms, bathrooms, lot_size, age]
     regression_valuation = intercept + sum(coef * feature for coef, feature in zip(coefficients, subject_features))
     
-    # Method 3: Comparable Sales Adjustment
-    adjusted_comps = []
-    for comp in comparable_sales:
-        # Adjust for differences with error handling
-        comp_sqft = comp.get("sqft", 0)
-        comp_bedrooms = comp.get("bedrooms", 0)
-        comp_bathrooms = comp.get("bathrooms", 0)
-        comp_lot_size = comp.get("lot_size", 0)
-        comp_year_built = comp.get("year_built", current_year)
-        comp_sale_price = comp.get("sale_price", 0)
-        
-        sqft_diff = (property_sqft - comp_sqft) * avg_price_per_sqft
-        bedroom_diff = (bedrooms - comp_bedrooms) * 5000
-        bathroom_diff = (bathrooms - comp_bathrooms) * 10000
-        lot_diff = (lot_size - comp_lot_size) * 20000
-        age_diff = (age - (current_year - comp_year_built)) * -500
-        
-        adjusted_price = comp_sale_price + sqft_diff + bedroom_diff + bathroom_diff + lot_diff + age_diff
-        adjusted_comps.append(adjusted_price)
+    # Method 3: Comparable Sales Adjustment (one array op per feature; missing fields count as 0)
+    comp_sqft = comps.filled("sqft")
+    comp_bedrooms = comps.filled("bedrooms")
+    comp_age = current_year - comps.filled("year_built", current_year)
+    adjusted_comps = (
+        comps.filled("sale_price")
+        + (property_sqft - comp_sqft) * avg_price_per_sqft
+        + (bedrooms - comp_bedrooms) * 5000
+        + (bathrooms - comps.filled("bathrooms")) * 10000
+        + (lot_size - comps.filled("lot_size")) * 20000
+        + (age - comp_age) * -500
+    )
     
-    # Calculate adjusted sales valuation with error handling
-    if adjusted_comps:
-        adjusted_sales_valuation = sum(adjusted_comps) / len(adjusted_comps)
-    else:
-        adjusted_sales_valuation = price_per_sqft_valuation  # Fallback to price per sqft
+    # Calculate adjusted sales valuation
+    adjusted_sales_valuation = float(np.average(adjusted_comps, weights=comp_weights))
     
     # Final valuation (weighted average)
     final_valuation = (
@@ -285,17 +469,46 @@ def avm_engine(
     
     # Confidence score based on data quality
     confidence_factors = []
-    if len(comparable_sales) >= 3:
+    if len(comps) >= 3:
         confidence_factors.append(0.3)
     if avg_days_since_sale < 180:
         confidence_factors.append(0.2)
-    if len([comp for comp in comparable_sales if abs(comp["sqft"] - property_sqft) / property_sqft < 0.2]) >= 2:
+    if np.count_nonzero(np.abs(comp_sqft - property_sqft) / property_sqft < 0.2) >= 2:
         confidence_factors.append(0.3)
-    if len([comp for comp in comparable_sales if comp["bedrooms"] == bedrooms]) >= 1:
+    if np.count_nonzero(comp_bedrooms == bedrooms) >= 1:
         confidence_factors.append(0.2)
     
     confidence_score = sum(confidence_factors)
     
+    final = {
+        "value": round(final_valuation, 2),
+        "confidence_score": round(confidence_score, 2),
+        "valuation_date": datetime.now().isoformat(),
+        "methodology": "Weighted average of three methods"
+    }
+    
+    # Optional resampling of the comparable set for valuation bands
+    if bootstrap_resamples > 0:
+        subject = {
+            "property_sqft": property_sqft,
+            "bedrooms": bedrooms,
+            "bathrooms": bathrooms,
+            "lot_size": lot_size,
+            "year_built": year_built,
+            "condition": condition
+        }
+        bands = bootstrap_valuation_bands(
+            subject, comps, bootstrap_resamples, market_trend, seed=seed, max_workers=bootstrap_workers, now=now
+        )
+        if "error" not in bands:
+            final["confidence_interval"] = {
+                "p10": round(float(bands["p10"][0]), 2),
+                "p50": round(float(bands["p50"][0]), 2),
+                "p90": round(float(bands["p90"][0]), 2),
+                "resamples": bands["resamples"],
+                "seed": seed
+            }
+    
     return {
         "subject_property": {
             "address": property_address,
@@ -318,33 +531,124 @@ def avm_engine(
             },
             "regression_analysis": {
                 "value": round(regression_valuation, 2),
-                "coefficients": coefficients,
-                "intercept": intercept
+                "coefficients": [round(coef, 4) for coef in coefficients],
+                "intercept": round(intercept, 2),
+                "sample_size": regression_fit["sample_size"],
+                "segment": market_segment
             },
             "adjusted_comparables": {
                 "value": round(adjusted_sales_valuation, 2),
-                "adjusted_prices": [round(price, 2) for price in adjusted_comps]
+                "adjusted_prices": [round(price, 2) for price in adjusted_comps.tolist()]
             }
         },
-        "final_valuation": {
-            "value": round(final_valuation, 2),
-            "confidence_score": round(confidence_score, 2),
-            "valuation_date": datetime.now().isoformat(),
-            "methodology": "Weighted average of three methods"
-        },
+        "final_valuation": final,
         "market_conditions": {
             "trend": market_trend,
+            "trend_source": trend_source,
             "avg_days_since_sale": round(avg_days_since_sale, 1),
-            "comparable_count": len(comparable_sales)
+            "comparable_count": len(comps),
+            "comparable_weighting": "equal" if comp_weights is None else "similarity"
         }
     }
 
 
+@tool(
+    name="avm_sensitivity_sweep",
+    description="What-if sweep of avm_engine over condition, market trend and method weights in a single call",
+    show_result=True,
+)
+def avm_sensitivity_sweep(
+    property_address: str,
+    property_sqft: int,
+    bedrooms: int,
+    bathrooms: float,
+    lot_size: float,
+    year_built: int,
+    condition: str,
+    comparable_sales: List[Dict[str, Any]],
+    conditions: Optional[List[str]] = None,
+    market_trends: Optional[List[float]] = None,
+    method_weights: Optional[List[List[float]]] = None,
+    market_segment: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Evaluate the avm_engine valuation over a grid of what-if parameters in one call.
+    
+    Args:
+        property_address: Address of the subject property
+        property_sqft: Square footage of the property
+        bedrooms: Number of bedrooms
+        bathrooms: Number of bathrooms
+        lot_size: Lot size in acres
+        year_built: Year the property was built
+        condition: Property condition (Excellent/Good/Fair/Poor)
+        comparable_sales: List of comparable sales data
+        conditions: Conditions to test (defaults to the current condition)
+        market_trends: Market appreciation rates to test (omitted or empty: the trend avm_engine would use,
+            i.e. repeat-sales appreciation of the address, else 0.02)
+        method_weights: [price_per_sqft, regression, adjusted_comparables] weight triples to test (defaults to [0.4, 0.3, 0.3])
+        market_segment: Market segment key for the cached regression fit
+        
+    Returns:
+        Dictionary containing one row per grid point plus the value range across the grid
+    """
+    if not comparable_sales:
+        return {"error": "No comparable sales data provided"}
+    
+    subject = {
+        "property_sqft": property_sqft,
+        "bedrooms": bedrooms,
+        "bathrooms": bathrooms,
+        "lot_size": lot_size,
+        "year_built": year_built,
+        "condition": condition
+    }
+    sweep = avm_engine_sweep(
+        {**subject, "property_address": property_address}, comparable_sales, conditions, market_trends,
+        method_weights, market_segment, trend_index=None if market_trends else repeat_sales_index(),
+    )
+    if "error" in sweep:
+        return sweep
+    
+    axes = sweep["axes"]
+    surface = sweep["final_value_surface"]
+    grid = []
+    for i, grid_condition in enumerate(axes["condition"]):
+        for j, trend in enumerate(axes["market_trend"].tolist()):
+            for w, weights in enumerate(axes["method_weights"].tolist()):
+                grid.append({
+                    "condition": grid_condition,
+                    "market_trend": trend,
+                    "method_weights": weights,
+                    "price_per_sqft_value": round(float(sweep["price_per_sqft_surface"][i, j]), 2),
+                    "final_value": round(float(surface[i, j, w]), 2)
+                })
+    
+    return {
+        "subject_property": {"address": property_address, **subject},
+        "fixed_components": {
+            "price_per_sqft": round(sweep["price_per_sqft"], 2),
+            "regression_value": round(sweep["regression_value"], 2),
+            "adjusted_comparables_value": round(sweep["adjusted_comparables_value"], 2),
+            "confidence_score": round(sweep["confidence_score"], 2)
+        },
+        "trend_source": sweep["trend_source"],
+        "grid": grid,
+        "value_range": {
+            "min": round(float(surface.min()), 2),
+            "max": round(float(surface.max()), 2),
+            "spread_pct": round(float((surface.max() - surface.min()) / surface.mean() * 100), 2)
+        },
+        "valuation_date": sweep["valuation_date"]
+    }
+
+
 @tool(
     name="market_trend_analyzer",
     description="Analyze market trends and seasonal patterns for property valuation",
     show_result=True,
 )
+@tool_response_cache.cached("market_trend_analyzer")
 def market_trend_analyzer(
     location: str,
     property_type: str = "residential",
@@ -357,111 +661,216 @@ def market_trend_analyzer(
     Args:
         location: Geographic location (city, state, zip code)
         property_type: Type of property (residential/commercial/land)
-        analysis_period: Analysis period in months
+        analysis_period: Analysis period in months (most recent months of the series)
         include_seasonal: Whether to include seasonal analysis
         
     Returns:
         Dictionary containing market trend analysis
     """
-    # Simulated market data - in production, this would connect to market data APIs
-    months_back = analysis_period
     current_date = datetime.now()
     
-    # Generate simulated price data
-    base_price = 400000
-    price_data = []
-    seasonal_factors = [0.95, 0.92, 0.98, 1.05, 1.08, 1.10, 1.12, 1.08, 1.05, 1.02, 0.98, 0.95]  # Monthly seasonal factors
-    
-    for i in range(months_back):
-        month_date = current_date - timedelta(days=30 * i)
-        month = month_date.month - 1
-        
-        # Base trend (2% annual appreciation)
-        trend_factor = (1.02) ** (i / 12)
-        
-        # Seasonal factor
-        seasonal_factor = seasonal_factors[month] if include_seasonal else 1.0
-        
-        # Random variation
-        random_factor = np.random.normal(1.0, 0.02)
-        
-        price = base_price * trend_factor * seasonal_factor * random_factor
-        
-        price_data.append({
-            "date": month_date.strftime("%Y-%m"),
-            "price": round(price, 2),
-            "price_index": round((price / base_price) * 100, 2)
-        })
-    
-    # Calculate trends
-    prices = [data["price"] for data in price_data]
-    price_indices = [data["price_index"] for data in price_data]
-    
-    # Linear regression for trend
-    x = np.arange(len(prices))
-    y = np.array(prices)
-    slope, intercept = np.polyfit(x, y, 1)
-    
-    # Calculate growth rates
-    monthly_growth = slope / np.mean(prices)
-    annual_growth = monthly_growth * 12
-    
-    # Volatility calculation
-    returns = [(prices[i] - prices[i-1]) / prices[i-1] for i in range(1, len(prices))]
-    volatility = np.std(returns) * np.sqrt(12)  # Annualized volatility
-    
-    # Seasonal analysis
-    seasonal_analysis = {}
-    if include_seasonal:
-        monthly_avg = {}
-        for data in price_data:
-            month = datetime.strptime(data["date"], "%Y-%m").month
-            if month not in monthly_avg:
-                monthly_avg[month] = []
-            monthly_avg[month].append(data["price_index"])
-        
-        for month, indices in monthly_avg.items():
-            seasonal_analysis[month] = {
-                "month_name": datetime(2024, month, 1).strftime("%B"),
-                "avg_index": round(np.mean(indices), 2),
-                "volatility": round(np.std(indices), 2)
-            }
-    
-    # Market cycle analysis
-    cycle_phase = "Expansion" if annual_growth > 0.03 else "Stable" if annual_growth > 0 else "Contraction"
+    # Monthly series from the local market data file (MARKET_SERIES_PATH), else the repeat-sales
+    # index of the MLS sales history, simulated if neither covers the location
+    # (file series are a zero-copy window of the per-location price index store, which the file feeds)
+    history = max(analysis_period, FIT_WINDOW)
+    series = get_price_series(location, property_type, history)
+    key = series_key(location, property_type)
+    data_source = "market_series"
+    if series is None:
+        series = repeat_sales_index().series(location, property_type)
+        key = ("repeat_sales",) + key
+        data_source = "repeat_sales_index"
+    if series is not None:
+        # Incremental per-location state: only months added since the last call are processed
+        months, prices = series[0][-history:], series[1][-history:]
+        stats = trend_states.sync(key, months, prices, analysis_period).statistics(include_seasonal)
+        # Holt-Winters forecast on recent history; smoothing parameters cached per location
+        forecast = holt_winters_cache.forecast([key], prices, [int(months[-1])])["forecast"][0]
+    else:
+        months, prices = simulated_series(analysis_period, include_seasonal, now=current_date)
+        stats = TrendState.from_series(months, prices, analysis_period).statistics(include_seasonal, base_price=400000)
+        forecast = holt_winters_forecast(prices)["forecast"][0]
+        data_source = "simulated"
+    
+    months = stats["months"]
+    annual_growth = stats["annual_growth"]
+    volatility = stats["volatility"]
+    
+    recent = slice(-12, None)
+    price_data = [
+        {"date": label, "price": round(price, 2), "price_index": round(index, 2)}
+        for label, price, index in zip(
+            month_labels(months[recent]), stats["prices"][recent].tolist(), stats["price_index"][recent].tolist()
+        )
+    ]
     
     return {
         "location": location,
         "property_type": property_type,
         "analysis_period": f"{analysis_period} months",
         "analysis_date": current_date.isoformat(),
+        "data_source": data_source,
         "price_trend": {
-            "slope": round(slope, 2),
-            "intercept": round(intercept, 2),
-            "monthly_growth_rate": round(monthly_growth * 100, 3),
+            "slope": round(stats["slope"], 2),
+            "intercept": round(stats["intercept"], 2),
+            "monthly_growth_rate": round(stats["monthly_growth"] * 100, 3),
             "annual_growth_rate": round(annual_growth * 100, 2),
             "volatility": round(volatility * 100, 2)
         },
         "market_cycle": {
-            "phase": cycle_phase,
+            "phase": cycle_phase(annual_growth),
             "growth_rate": round(annual_growth * 100, 2),
-            "volatility_level": "High" if volatility > 0.15 else "Medium" if volatility > 0.10 else "Low"
+            "volatility_level": volatility_level(volatility)
         },
-        "price_data": price_data[-12:],  # Last 12 months
-        "seasonal_analysis": seasonal_analysis,
+        "price_data": price_data,  # Last 12 months
+        "seasonal_analysis": stats["seasonal"],
         "forecast": {
-            "next_3_months": round(prices[-1] * (1 + monthly_growth * 3), 2),
-            "next_6_months": round(prices[-1] * (1 + monthly_growth * 6), 2),
-            "next_12_months": round(prices[-1] * (1 + annual_growth), 2)
+            **{horizon: round(value, 2) for horizon, value in zip(FORECAST_HORIZONS, forecast.tolist())},
+            "method": "Holt-Winters (level, trend, monthly seasonality)"
         }
     }
 
 
+@tool(
+    name="market_trend_batch",
+    description="Trend, growth, volatility and cycle phase for many locations at once, as a compact table",
+    show_result=True,
+)
+def market_trend_batch(
+    locations: List[str],
+    property_type: str = "residential",
+    analysis_period: int = 24,
+    include_forecast: bool = False,
+) -> Dict[str, Any]:
+    """
+    Analyze market trends for many locations (e.g. ZIP codes) in one locations x months computation.
+    
+    Args:
+        locations: Geographic locations (city, state, zip code) present in the market series data
+        property_type: Type of property (residential/commercial/land)
+        analysis_period: Analysis period in months, aligned on the latest month available
+        include_forecast: Add a 12-month Holt-Winters forecast column (all locations fitted together)
+        
+    Returns:
+        Dictionary with one table row per location with a trend, the locations without
+        data and those skipped for too short a series
+    """
+    if not locations:
+        return {"error": "No locations provided"}
+    
+    aligned = price_matrix(locations, property_type, analysis_period)
+    stats = matrix_statistics(aligned["matrix"])
+    months = aligned["months"]
+    # Shorter series are reported in skipped_locations instead of NaN rows
+    usable = stats["months_observed"] >= MIN_TREND_MONTHS
+    skipped = [
+        {"location": location, "months_observed": observed, "reason": f"fewer than {MIN_TREND_MONTHS} months in the analysis period"}
+        for location, observed in zip(aligned["locations"], stats["months_observed"].tolist())
+        if observed < MIN_TREND_MONTHS
+    ]
+    trended = [location for location, keep in zip(aligned["locations"], usable.tolist()) if keep]
+    
+    rows = [
+        [
+            location,
+            round(slope, 2),
+            round(monthly * 100, 3),
+            round(annual * 100, 2),
+            round(volatility * 100, 2),
+            phase,
+            observed,
+            round(last_price, 2)
+        ]
+        for location, slope, monthly, annual, volatility, phase, observed, last_price in zip(
+            trended,
+            stats["slope"][usable].tolist(),
+            stats["monthly_growth"][usable].tolist(),
+            stats["annual_growth"][usable].tolist(),
+            stats["volatility"][usable].tolist(),
+            stats["phase"][usable].tolist(),
+            stats["months_observed"][usable].tolist(),
+            stats["last_price"][usable].tolist(),
+        )
+    ]
+    columns = [
+        "location", "slope", "monthly_growth_rate", "annual_growth_rate",
+        "volatility", "phase", "months_observed", "last_price"
+    ]
+    
+    if include_forecast and rows:
+        # Same history length as market_trend_analyzer so both share the cached parameters
+        history = price_matrix(trended, property_type, max(analysis_period, FIT_WINDOW))
+        keys = [series_key(location, property_type) for location in history["locations"]]
+        forecast = holt_winters_cache.forecast(
+            keys, history["matrix"], [int(history["months"][-1])] * len(keys), horizons=[FORECAST_HORIZONS["next_12_months"]]
+        )["forecast"][:, 0]
+        for row, value in zip(rows, forecast.tolist()):
+            # No forecast (None) when the fit fails on a short history
+            row.append(round(value, 2) if np.isfinite(value) else None)
+        columns.append("forecast_next_12_months")
+    
+    return {
+        "property_type": property_type,
+        "analysis_period": f"{analysis_period} months",
+        "period": month_labels(months[[0, -1]]) if len(aligned["locations"]) else [],
+        "columns": columns,
+        "rows": rows,
+        "missing_locations": aligned["missing"],
+        "skipped_locations": skipped,
+        "analysis_date": datetime.now().isoformat()
+    }
+
+
+@tool(
+    name="neighborhood_ppsf_quartiles",
+    description="Price per sqft quartiles (p25/p50/p75) of a neighborhood and the subject's delta to market",
+    show_result=True,
+)
+def neighborhood_ppsf_quartiles(
+    neighborhood: str,
+    property_type: str = "residential",
+    subject_ppsf: Optional[float] = None,
+) -> Dict[str, Any]:
+    """
+    Neighborhood price-per-sqft quartiles from incrementally updated quantile sketches.
+    
+    Args:
+        neighborhood: Neighborhood key (ZIP code of the sales addresses, or neighborhood name)
+        property_type: Type of property (residential/commercial/land)
+        subject_ppsf: Subject price per sqft to position against the neighborhood (optional)
+        
+    Returns:
+        Dictionary containing the quartiles, sale count and, with subject_ppsf, delta_to_market_pct
+    """
+    seed_ppsf_quantiles(get_mls_store())
+    quartiles = ppsf_quantiles.quartiles(neighborhood, property_type)
+    if quartiles is None:
+        return {"error": f"No sales with price per sqft for {neighborhood} ({property_type})"}
+    
+    result = {
+        "neighborhood": neighborhood,
+        "property_type": property_type,
+        "ppsf_quartiles": {
+            "p25": round(quartiles["p25"], 2),
+            "p50": round(quartiles["p50"], 2),
+            "p75": round(quartiles["p75"], 2)
+        },
+        "sales_count": quartiles["count"],
+        "analysis_date": datetime.now().isoformat()
+    }
+    if subject_ppsf is not None:
+        result["subject_ppsf"] = subject_ppsf
+        result["delta_to_market_pct"] = round(delta_to_market_pct(subject_ppsf, quartiles["p50"]), 2)
+        result["market_position"] = market_position(subject_ppsf, quartiles)
+    return result
+
+
 @tool(
     name="market_monitor",
     description="Monitor real-time market developments and risk signals",
     show_result=True,
 )
+@tool_response_cache.cached("market_monitor")
 def market_monitor(
     location: str,
     monitor_types: List[str] = ["economic", "development", "regulatory"],
@@ -473,10 +882,11 @@ def market_monitor(
     Args:
         location: Geographic location to monitor
         monitor_types: Types of monitoring (economic, development, regulatory, demographic)
-        alert_threshold: Threshold for generating alerts (5% change)
+        alert_threshold: Relative change that fires the change alert rules (0.05 = 5% change);
+            change rules only run for locations with a previous period in the indicator file
         
     Returns:
-        Dictionary containing market monitoring results and alerts
+        Dictionary containing market monitoring results and alerts (with the rule that fired)
     """
     current_date = datetime.now()
     
@@ -524,37 +934,42 @@ def market_monitor(
         }
     }
     
-    # Risk assessment
-    risk_factors = []
-    risk_score = 0
-    
-    # Economic risks
-    if monitoring_results["economic"]["unemployment_rate"] > 5.0:
-        risk_factors.append("High unemployment rate")
-        risk_score += 0.3
-    if monitoring_results["economic"]["interest_rates"] > 6.0:
-        risk_factors.append("High interest rates")
-        risk_score += 0.2
-    
-    # Development risks
-    if monitoring_results["development"]["new_construction_permits"] > 50:
-        risk_factors.append("High construction activity - potential oversupply")
-        risk_score += 0.2
-    
-    # Regulatory risks
-    if monitoring_results["regulatory"]["property_tax_changes"] > 0.05:
-        risk_factors.append("Significant property tax increase")
-        risk_score += 0.3
-    
-    # Market signals
-    market_signals = {
-        "inventory_levels": "Low",  # Low/Medium/High
-        "days_on_market": 28,
-        "price_reductions": 15,
-        "new_listings": 120,
-        "pending_sales": 95,
-        "absorption_rate": 0.79  # Pending/New listings
-    }
+    # Previous period, for the relative-change rules compared against alert_threshold:
+    # only the indicator file has one, otherwise those rules are skipped
+    previous = None
+    
+    # Indicator file values override the simulated ones for known locations
+    indicator_data = load_indicator_matrix()
+    if indicator_data is not None and location.strip().lower() in indicator_data[0]:
+        row = indicator_data[0].index(location.strip().lower())
+        for column, indicator in enumerate(INDICATORS):
+            value = indicator_data[1][row, column]
+            if not np.isnan(value):
+                monitoring_results[INDICATOR_CATEGORY[indicator]][indicator] = value.item()
+        previous = [indicator_data[2][row].tolist()]
+    
+    # Risk assessment: every compiled alert rule evaluated in one pass
+    rules = load_rules()
+    current = [monitoring_results[INDICATOR_CATEGORY[name]].get(name, np.nan) for name in INDICATORS]
+    evaluation = rules.evaluate([current], previous, alert_threshold)
+    fired_alerts = rules.alerts(evaluation, 0)
+    risk_score = float(evaluation["risk_score"][0])
+    risk_factors = [
+        rule["message"] for rule, fired in zip(rules.rules, evaluation["fired"][0].tolist())
+        if fired and rule.get("risk_weight", 0.0) > 0
+    ]
+    
+    # Market signals: 30/90-day windows of the listing event log, else simulated
+    market_signals = listing_signals.signals(location)
+    if market_signals is None:
+        market_signals = {
+            "inventory_levels": "Low",  # Low/Medium/High
+            "days_on_market": 28,
+            "price_reductions": 15,
+            "new_listings": 120,
+            "pending_sales": 95,
+            "absorption_rate": 0.79  # Pending/New listings
+        }
     
     # Generate alerts based on threshold
     alerts = []
@@ -569,6 +984,14 @@ def market_monitor(
                     "date": alert["date"],
                     "severity": "High" if alert["impact"] == "Negative" else "Medium"
                 })
+    for alert in fired_alerts:
+        if alert["category"].lower() in monitor_types:
+            alerts.append({
+                "type": "Threshold Alert",
+                "impact": "Negative",
+                "date": current_date.date().isoformat(),
+                **alert
+            })
     
     # Overall market health
     health_score = 100 - (risk_score * 100)
@@ -589,7 +1012,7 @@ def market_monitor(
         "risk_assessment": {
             "risk_score": round(risk_score, 2),
             "risk_factors": risk_factors,
-            "overall_risk": "Low" if risk_score < 0.3 else "Medium" if risk_score < 0.6 else "High"
+            "overall_risk": overall_risk(risk_score)
         },
         "market_signals": market_signals,
         "alerts": alerts,
@@ -601,6 +1024,73 @@ def market_monitor(
     }
 
 
+@tool(
+    name="market_alert_scan",
+    description="Scan many monitored locations against the market alert rules in one pass",
+    show_result=True,
+)
+def market_alert_scan(
+    locations: Optional[List[str]] = None,
+    alert_threshold: float = 0.05,
+    min_severity: str = "Low",
+) -> Dict[str, Any]:
+    """
+    Evaluate the compiled alert rules over the locations x indicators matrix of the indicator file.
+
+    Args:
+        locations: Locations to scan (all locations of the indicator file when omitted)
+        alert_threshold: Relative change that fires the change alert rules (0.05 = 5% change)
+        min_severity: Lowest severity reported (Low/Medium/High)
+
+    Returns:
+        Dictionary with one row per fired alert, ordered by location risk
+    """
+    indicator_data = load_indicator_matrix()
+    if indicator_data is None:
+        return {"error": "No market indicator data available"}
+    if min_severity not in SEVERITIES:
+        return {"error": f"Unknown severity: {min_severity}"}
+
+    known, current, previous = indicator_data
+    if locations:
+        wanted = [location.strip().lower() for location in locations]
+        positions = {location: row for row, location in enumerate(known)}
+        selected = [positions[location] for location in wanted if location in positions]
+        missing = [location for location in wanted if location not in positions]
+    else:
+        selected = list(range(len(known)))
+        missing = []
+
+    rules = load_rules()
+    evaluation = rules.evaluate(current[selected], previous[selected], alert_threshold)
+    fired = evaluation["fired"] & (rules.severity >= SEVERITIES.index(min_severity))
+
+    # Riskiest locations first, then most severe rule
+    location_rows, rule_columns = np.nonzero(fired)
+    order = np.lexsort((-rules.severity[rule_columns], location_rows, -evaluation["risk_score"][location_rows]))
+    rows = [
+        [
+            known[selected[row]],
+            rules.rules[column]["name"],
+            SEVERITIES[rules.severity[column]],
+            rules.rules[column]["indicator"],
+            round(float(evaluation["values"][row, column]), 4),
+            round(float(evaluation["thresholds"][column]), 4),
+            round(float(evaluation["risk_score"][row]), 2)
+        ]
+        for row, column in zip(location_rows[order].tolist(), rule_columns[order].tolist())
+    ]
+
+    return {
+        "scan_date": datetime.now().isoformat(),
+        "locations_scanned": len(selected),
+        "locations_alerted": int(np.count_nonzero(fired.any(axis=1))),
+        "columns": ["location", "rule", "severity", "indicator", "value", "threshold", "risk_score"],
+        "rows": rows,
+        "missing_locations": missing
+    }
+
+
 @tool(
     name="comps_analyzer",
     description="Analyze comparable sales and generate adjustment factors",
@@ -625,136 +1115,117 @@ def comps_analyzer(
     if not comparable_sales:
         return {"error": "No comparable sales provided"}
     
-    # Default adjustment factors
-    default_factors = {
-        "sqft": 150,  # per sqft
-        "bedroom": 5000,  # per bedroom
-        "bathroom": 10000,  # per bathroom
-        "lot_size": 20000,  # per acre
-        "age": -500,  # per year
-        "condition": {"Excellent": 0.1, "Good": 0.0, "Fair": -0.1, "Poor": -0.2},
-        "garage": 5000,  # per garage space
-        "pool": 15000,  # pool presence
-        "view": 10000,  # view premium
-    }
+    factors = adjustment_factors or DEFAULT_ADJUSTMENT_FACTORS
     
-    factors = adjustment_factors or default_factors
+    # Adjustment grid (comps x factors) computed in one array op; NaN = not applicable
+    grid = adjustment_tensor(subject_property, comparable_sales, factors)
+    summary = summarize_adjustments(grid)
+    matrix = grid["adjustments"][0]
+    comp_records = grid["comps"].to_records()
     
     # Analyze each comparable
     analyzed_comps = []
-    for comp in comparable_sales:
-        # Calculate adjustments
-        adjustments = {}
-        total_adjustment = 0
-        
-        # Square footage adjustment
-        if "sqft" in subject_property and "sqft" in comp:
-            sqft_diff = subject_property["sqft"] - comp["sqft"]
-            sqft_factor = factors.get("sqft", 150)  # Fallback to 150
-            sqft_adj = sqft_diff * sqft_factor
-            adjustments["sqft"] = sqft_adj
-            total_adjustment += sqft_adj
-        
-        # Bedroom adjustment
-        if "bedrooms" in subject_property and "bedrooms" in comp:
-            bedroom_diff = subject_property["bedrooms"] - comp["bedrooms"]
-            bedroom_factor = factors.get("bedroom", factors.get("bedrooms", 5000))  # Fallback to 5000
-            bedroom_adj = bedroom_diff * bedroom_factor
-            adjustments["bedrooms"] = bedroom_adj
-            total_adjustment += bedroom_adj
-        
-        # Bathroom adjustment
-        if "bathrooms" in subject_property and "bathrooms" in comp:
-            bathroom_diff = subject_property["bathrooms"] - comp["bathrooms"]
-            bathroom_factor = factors.get("bathroom", 10000)  # Fallback to 10000
-            bathroom_adj = bathroom_diff * bathroom_factor
-            adjustments["bathrooms"] = bathroom_adj
-            total_adjustment += bathroom_adj
-        
-        # Lot size adjustment
-        if "lot_size" in subject_property and "lot_size" in comp:
-            lot_diff = subject_property["lot_size"] - comp["lot_size"]
-            lot_factor = factors.get("lot_size", 20000)  # Fallback to 20000
-            lot_adj = lot_diff * lot_factor
-            adjustments["lot_size"] = lot_adj
-            total_adjustment += lot_adj
-        
-        # Age adjustment
-        if "year_built" in subject_property and "year_built" in comp:
-            current_year = datetime.now().year
-            subject_age = current_year - subject_property["year_built"]
-            comp_age = current_year - comp["year_built"]
-            age_diff = subject_age - comp_age
-            age_factor = factors.get("age", -500)  # Fallback to -500
-            age_adj = age_diff * age_factor
-            adjustments["age"] = age_adj
-            total_adjustment += age_adj
-        
-        # Condition adjustment
-        if "condition" in subject_property and "condition" in comp:
-            subject_cond = subject_property["condition"]
-            comp_cond = comp["condition"]
-            condition_factors = factors.get("condition", {"Excellent": 0.1, "Good": 0.0, "Fair": -0.1, "Poor": -0.2})
-            if subject_cond in condition_factors and comp_cond in condition_factors:
-                cond_adj = (condition_factors[subject_cond] - condition_factors[comp_cond]) * comp.get("sale_price", 0)
-                adjustments["condition"] = cond_adj
-                total_adjustment += cond_adj
-        
-        # Calculate adjusted sale price
-        sale_price = comp.get("sale_price", 0)
-        adjusted_price = sale_price + total_adjustment
-        
+    for i, comp in enumerate(comp_records):
+        adjustments = {
+            key: float(value) for key, value in zip(grid["keys"], matrix[i].tolist()) if not np.isnan(value)
+        }
         analyzed_comp = {
             "original_data": comp,
             "adjustments": adjustments,
-            "total_adjustment": round(total_adjustment, 2),
-            "adjusted_sale_price": round(adjusted_price, 2),
-            "adjustment_percentage": round((total_adjustment / comp["sale_price"]) * 100, 2)
+            "total_adjustment": round(float(summary["total_adjustment"][0, i]), 2),
+            "adjusted_sale_price": round(float(summary["adjusted_prices"][0, i]), 2),
+            "adjustment_percentage": round(float(summary["adjustment_percentage"][0, i]), 2)
         }
-        
         analyzed_comps.append(analyzed_comp)
     
-    # Calculate final valuation
-    adjusted_prices = [comp["adjusted_sale_price"] for comp in analyzed_comps]
-    final_valuation = sum(adjusted_prices) / len(adjusted_prices)
-    
-    # Calculate confidence metrics
-    price_variance = np.var(adjusted_prices)
-    price_std = np.std(adjusted_prices)
-    coefficient_of_variation = price_std / final_valuation
-    
     # Quality assessment
-    quality_factors = []
-    if len(comparable_sales) >= 3:
-        quality_factors.append("Sufficient comparables")
-    if coefficient_of_variation < 0.1:
-        quality_factors.append("Low price variance")
-    if all(abs(comp["adjustment_percentage"]) < 20 for comp in analyzed_comps):
-        quality_factors.append("Reasonable adjustments")
-    
-    confidence_score = len(quality_factors) / 3
+    quality_factors = [name for name, passed in summary["quality"].items() if passed[0]]
+    confidence_score = float(summary["confidence_score"][0])
     
     return {
         "subject_property": subject_property,
         "adjustment_factors": factors,
         "analyzed_comparables": analyzed_comps,
         "valuation_summary": {
-            "final_valuation": round(final_valuation, 2),
+            "final_valuation": round(float(summary["final_valuation"][0]), 2),
             "price_range": {
-                "min": round(min(adjusted_prices), 2),
-                "max": round(max(adjusted_prices), 2),
-                "median": round(np.median(adjusted_prices), 2)
+                "min": round(float(summary["min"][0]), 2),
+                "max": round(float(summary["max"][0]), 2),
+                "median": round(float(summary["median"][0]), 2)
             },
             "statistics": {
-                "mean": round(np.mean(adjusted_prices), 2),
-                "std_deviation": round(price_std, 2),
-                "coefficient_of_variation": round(coefficient_of_variation, 3)
+                "mean": round(float(summary["final_valuation"][0]), 2),
+                "std_deviation": round(float(summary["std_deviation"][0]), 2),
+                "coefficient_of_variation": round(float(summary["coefficient_of_variation"][0]), 3)
             }
         },
         "quality_assessment": {
             "confidence_score": round(confidence_score, 2),
             "quality_factors": quality_factors,
-            "recommendation": "High confidence" if confidence_score > 0.7 else "Medium confidence" if confidence_score > 0.4 else "Low confidence"
+            "recommendation": confidence_label(confidence_score)
+        },
+        "analysis_date": datetime.now().isoformat()
+    }
+
+
+@tool(
+    name="comps_analyzer_batch",
+    description="Analyze the same comparable sales against many subject properties at once (neighborhood calibration)",
+    show_result=True,
+)
+def comps_analyzer_batch(
+    subject_properties: List[Dict[str, Any]],
+    comparable_sales: List[Dict[str, Any]],
+    adjustment_factors: Optional[Dict[str, float]] = None,
+) -> Dict[str, Any]:
+    """
+    Analyze comparable sales for many subjects in one subjects x comps x factors computation.
+    
+    Args:
+        subject_properties: List of subject property characteristics
+        comparable_sales: List of comparable sales data shared by all subjects
+        adjustment_factors: Custom adjustment factors (optional)
+        
+    Returns:
+        Dictionary containing per-subject valuation summaries and average adjustment per factor
+    """
+    if not comparable_sales:
+        return {"error": "No comparable sales provided"}
+    if not subject_properties:
+        return {"error": "No subject properties provided"}
+    
+    factors = adjustment_factors or DEFAULT_ADJUSTMENT_FACTORS
+    grid = adjustment_tensor(subject_properties, comparable_sales, factors)
+    summary = summarize_adjustments(grid)
+    
+    # Mean adjustment per factor over every subject/comp pair where it applies
+    applied = (~np.isnan(grid["adjustments"])).sum(axis=(0, 1))
+    factor_means = np.where(applied > 0, np.nansum(grid["adjustments"], axis=(0, 1)) / np.maximum(applied, 1), np.nan)
+    
+    subjects = []
+    for i, subject in enumerate(subject_properties):
+        confidence_score = float(summary["confidence_score"][i])
+        subjects.append({
+            "subject_property": subject,
+            "final_valuation": round(float(summary["final_valuation"][i]), 2),
+            "price_range": {
+                "min": round(float(summary["min"][i]), 2),
+                "max": round(float(summary["max"][i]), 2),
+                "median": round(float(summary["median"][i]), 2)
+            },
+            "std_deviation": round(float(summary["std_deviation"][i]), 2),
+            "coefficient_of_variation": round(float(summary["coefficient_of_variation"][i]), 3),
+            "confidence_score": round(confidence_score, 2),
+            "recommendation": confidence_label(confidence_score)
+        })
+    
+    return {
+        "adjustment_factors": factors,
+        "comparable_count": len(grid["comps"]),
+        "subjects": subjects,
+        "average_adjustment_by_factor": {
+            key: (round(float(value), 2) if not np.isnan(value) else None)
+            for key, value in zip(grid["keys"], factor_means.tolist())
         },
         "analysis_date": datetime.now().isoformat()
     }
@@ -1,8 +1,24 @@
 from agno.tools import tool
 from typing import Dict, Any, List, Optional
 from datetime import datetime
+import os
 import re
 
+try:
+    from .document_scanner import (
+        ATTRIBUTE_PATTERNS, DEFAULT_DOCUMENTS_DIR, TEXT_EXTENSIONS, LISTING_BLOCK_START, STREAM_THRESHOLD,
+        decode_text, parse_property_file, parse_directory, parse_property_stream,
+    )
+    from .document_sections import AVM_SUBJECT_FIELDS, SECTIONS_KIND, KB_CHUNKS_KIND, parse_property_sections, markdown_chunks
+    from .document_manifest import get_document_manifest, content_hash, scan_files
+except ImportError:
+    from document_scanner import (
+        ATTRIBUTE_PATTERNS, DEFAULT_DOCUMENTS_DIR, TEXT_EXTENSIONS, LISTING_BLOCK_START, STREAM_THRESHOLD,
+        decode_text, parse_property_file, parse_directory, parse_property_stream,
+    )
+    from document_sections import AVM_SUBJECT_FIELDS, SECTIONS_KIND, KB_CHUNKS_KIND, parse_property_sections, markdown_chunks
+    from document_manifest import get_document_manifest, content_hash, scan_files
+
 
 @tool(
     name="web_property_scraper",
@@ -78,12 +94,15 @@ def web_property_scraper(
 
 @tool(
     name="document_property_parser",
-    description="Extrait des attributs structurés d'un bien depuis des documents texte (listing/inspection)",
+    description="Extrait des attributs structurés d'un bien depuis des documents texte (listing/inspection), y compris des exports MLS volumineux lus bloc par bloc",
     show_result=True,
 )
 def document_property_parser(
     file_path: str,
     doc_type: Optional[str] = None,
+    stream: Optional[bool] = None,
+    block_pattern: Optional[str] = None,
+    output_path: Optional[str] = None,
 ) -> Dict[str, Any]:
     """
     Parseur minimaliste de documents texte: détecte adresse, surface, chambres/sdb, année, et autres motifs simples.
@@ -91,68 +110,120 @@ def document_property_parser(
     Args:
         file_path: Chemin vers un fichier texte lisible
         doc_type: Type de document (listing, inspection, autre)
+        stream: Lecture par blocs d'annonce, un enregistrement par bloc (défaut: automatique
+            au-delà de 256 Mo)
+        block_pattern: Expression régulière de la première ligne d'un bloc en mode flux
+            (défaut: titre "# ", ligne ---/===, saut de page ou "MLS#")
+        output_path: Fichier JSONL des enregistrements en mode flux
 
     Returns:
-        Dictionnaire des champs extraits + résumé des lignes correspondantes
+        Dictionnaire des champs extraits + résumé des lignes correspondantes; en mode flux,
+        résumé de l'export (blocs, enregistrements, couverture par attribut, aperçu, fichier de sortie)
     """
-    extracted: Dict[str, Any] = {
-        "address": None,
-        "sqft": None,
-        "bedrooms": None,
-        "bathrooms": None,
-        "lot_size": None,
-        "year_built": None,
-        "amenities": [],
-    }
+    if stream is None:
+        stream = os.path.isfile(file_path) and os.path.getsize(file_path) >= STREAM_THRESHOLD
+    if stream:
+        block_start = LISTING_BLOCK_START
+        if block_pattern:
+            block_start = block_pattern.encode("utf-8")
+            try:
+                re.compile(block_start)
+            except re.error as e:
+                return {"error": f"Motif de bloc invalide: {str(e)}", "file_path": file_path, "doc_type": doc_type}
+        # Mémoire constante: seul le bloc en cours est en mémoire, les enregistrements sont écrits au fil de l'eau
+        return parse_property_stream(file_path, doc_type, output_path, block_start, get_document_manifest())
 
-    matched_lines: List[str] = []
+    # Un seul passage de l'automate précompilé (attributs + équipements), résultat servi
+    # depuis le manifeste si le fichier n'a pas changé
+    return parse_property_file(file_path, doc_type, get_document_manifest())
 
-    try:
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-            content = f.read()
-    except Exception as e:
-        return {"error": f"Lecture impossible: {str(e)}", "file_path": file_path, "doc_type": doc_type}
-
-    # Motifs simples (robustes aux variations de casse)
-    patterns = {
-        "address": r"address\s*[:\-]?\s*(.+)$",
-        "sqft": r"(sqft|square\s*feet)\s*[:\-]?\s*(\d{3,6})",
-        "bedrooms": r"bed(room)?s?\s*[:\-]?\s*(\d{1,2})",
-        "bathrooms": r"bath(room)?s?\s*[:\-]?\s*(\d{1,2}(?:\.\d)?)",
-        "lot_size": r"lot\s*size\s*[:\-]?\s*(\d{1,2}(?:\.\d{1,2})?)",
-        "year_built": r"year\s*built\s*[:\-]?\s*(\d{4})",
+
+@tool(
+    name="document_directory_parser",
+    description="Extrait en lot les attributs des biens de tous les documents texte d'un dossier (pool de processus)",
+    show_result=True,
+)
+def document_directory_parser(
+    directory: str = DEFAULT_DOCUMENTS_DIR,
+    doc_type: Optional[str] = None,
+    max_workers: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Parse tous les documents d'un dossier (documents2 par défaut) et renvoie un tableau compact.
+
+    Args:
+        directory: Dossier contenant les documents texte (.md, .txt, .csv)
+        doc_type: Type de document appliqué à tous les fichiers (listing, inspection, autre)
+        max_workers: Nombre de processus (défaut: nombre de CPU)
+
+    Returns:
+        Dictionnaire avec une ligne par fichier parsé, la liste des fichiers illisibles et le nombre
+        de fichiers reparsés (les fichiers inchangés sont servis depuis le manifeste)
+    """
+    if not os.path.isdir(directory):
+        return {"error": f"Dossier introuvable: {directory}", "directory": directory}
+
+    parsed = parse_directory(directory, doc_type, max_workers, manifest=get_document_manifest())
+    results = parsed["results"]
+    columns = ["file_path"] + list(ATTRIBUTE_PATTERNS) + ["amenities"]
+    rows = [
+        [result["file_path"]] + [result["extracted"][key] for key in columns[1:]]
+        for result in results if "error" not in result
+    ]
+    return {
+        "directory": directory,
+        "doc_type": doc_type,
+        "files_parsed": len(rows),
+        "reparsed": parsed["reparsed"],
+        "from_manifest": parsed["cached"],
+        "columns": columns,
+        "rows": rows,
+        "errors": [{"file_path": result["file_path"], "error": result["error"]} for result in results if "error" in result],
+        "parsed_at": datetime.now().isoformat(),
     }
 
-    for key, pat in patterns.items():
-        m = re.search(pat, content, re.IGNORECASE | re.MULTILINE)
-        if m:
-            val = m.group(1) if key == "address" else m.group(2) if m.lastindex and m.lastindex >= 2 else m.group(1)
-            matched_lines.append(m.group(0))
-            try:
-                if key in ["sqft"]:
-                    extracted[key] = int(val)
-                elif key in ["bedrooms"]:
-                    extracted[key] = int(float(val))
-                elif key in ["bathrooms", "lot_size"]:
-                    extracted[key] = float(val)
-                elif key in ["year_built"]:
-                    extracted[key] = int(val)
-                else:
-                    extracted[key] = val.strip()
-            except Exception:
-                extracted[key] = val
 
-    # Amenities basées sur mots-clés simples
-    amenities_map = ["garage", "pool", "garden", "balcony", "fireplace"]
-    for amenity in amenities_map:
-        if re.search(rf"\b{amenity}\b", content, re.IGNORECASE):
-            extracted["amenities"].append(amenity)
+@tool(
+    name="document_comparables_extractor",
+    description="Extrait sans LLM le bien, les ventes comparables, le contexte marché et les métadonnées d'un document de bien",
+    show_result=True,
+)
+def document_comparables_extractor(
+    file_path: str,
+) -> Dict[str, Any]:
+    """
+    Parse déterministe des sections "Subject Property", "Comparable Sales (Recent)", "Market Context"
+    et "Source Metadata" d'un document markdown (ex. documents2/Property_Test_1.md).
+
+    Args:
+        file_path: Chemin vers le document markdown
+
+    Returns:
+        Dictionnaire avec subject (arguments de avm_engine), subject_property (format comps_analyzer),
+        comparable_sales (prêts pour avm_engine et comps_analyzer), market_context (format market_signals)
+        et source_metadata
+    """
+    manifest = get_document_manifest()
+    try:
+        sections, cached = manifest.process(file_path, SECTIONS_KIND, lambda data: parse_property_sections(decode_text(data)))
+    except Exception as e:
+        return {"error": f"Lecture impossible: {str(e)}", "file_path": file_path}
+    manifest.save()
 
+    if not sections:
+        return {"error": "Aucune section structurée reconnue", "file_path": file_path}
+    subject = sections.get("subject", {})
     return {
         "file_path": file_path,
-        "doc_type": doc_type,
-        "extracted": extracted,
-        "matched_examples": matched_lines[:5],
+        **sections,
+        # Même bien au format subject_property de comps_analyzer
+        "subject_property": {
+            ("sqft" if key == "property_sqft" else "address" if key == "property_address" else key): value
+            for key, value in subject.items() if key in AVM_SUBJECT_FIELDS
+        },
+        "comparable_count": len(sections.get("comparable_sales", [])),
+        "missing_avm_fields": [field for field in AVM_SUBJECT_FIELDS if field not in subject],
+        "cached": cached,
         "parsed_at": datetime.now().isoformat(),
     }
 
@@ -172,19 +243,64 @@ def kb_ingest_indexer(
     recreate: bool = False,
 ) -> Dict[str, Any]:
     """
-    Simule une pipeline d'ingestion: lecture, split, embeddings, et upsert dans un index vecteur.
+    Pipeline d'ingestion incrémentale: lecture et découpage en sections des seuls fichiers nouveaux
+    ou modifiés (manifeste taille/mtime/empreinte), puis upsert simulé dans un index vecteur.
 
     Args:
         paths: Liste de chemins de fichiers/dossiers à ingérer
         collection: Nom de la collection cible
-        recreate: Si True, recrée la collection (destructive)
+        recreate: Si True, recrée la collection (destructive) et réingère tous les fichiers
 
     Returns:
-        Détails d'ingestion: nombre d'éléments, collection, recréation, horodatage
+        Détails d'ingestion: fichiers ingérés/inchangés, sections, chemins absents, fichiers illisibles,
+        entrées retirées du manifeste, collection, recréation, horodatage
     """
+    manifest = get_document_manifest()
+    files = []
+    missing = []
+    removed = 0
+    for path in paths:
+        if os.path.isdir(path):
+            scanned = scan_files(path, TEXT_EXTENSIONS)
+            files.extend(scanned)
+            # Les fichiers supprimés du dossier sortent du manifeste
+            removed += manifest.prune(path, [file_path for file_path, _ in scanned])
+        elif os.path.isfile(path):
+            try:
+                files.append((path, os.stat(path)))
+            except OSError:
+                missing.append(path)
+        else:
+            missing.append(path)
+
+    kind = f"{KB_CHUNKS_KIND}:{collection}"
+    ingested, unchanged, chunks, errors = [], 0, 0, []
+    for path, stat in files:
+        cached = None if recreate else manifest.get(path, kind, stat)
+        if cached is None:
+            # Fichier supprimé ou illisible depuis le parcours: signalé, les autres sont ingérés
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except OSError as e:
+                errors.append({"file_path": path, "error": f"Lecture impossible: {str(e)}"})
+                continue
+            cached = manifest.put(path, kind, stat, content_hash(data), markdown_chunks(decode_text(data)))
+            ingested.append(path)
+        else:
+            unchanged += 1
+        chunks += len(cached)
+    manifest.save()
+
     return {
         "collection": collection,
-        "ingested_items": len(paths),
+        "ingested_items": len(ingested),
+        "unchanged_items": unchanged,
+        "ingested_files": ingested,
+        "chunks": chunks,
+        "missing_paths": missing,
+        "errors": errors,
+        "removed_items": removed,
         "recreated": recreate,
         "indexed_at": datetime.now().isoformat(),
     }